@@ -10,19 +10,45 @@ try:
     import sys
     sys.path.insert(0, str(Path(__file__).resolve().parent))
     from ml_pipeline.inference import InvoiceCategorizer
-    from ml_pipeline.utils.ocr_extract import extract_text_from_invoice, extract_text_with_details_from_invoice
+    from ml_pipeline.utils.ocr_extract import extract_text_from_invoice, extract_text_with_details_from_invoice, extract_fields_from_invoice, get_ocr_quality, OCR_PROFILES
     from ml_pipeline.utils.receipt_parser import parse_receipt
-    from ml_pipeline.utils.expense_tracker import save_expense, get_expenses, get_expense_summary
+    from ml_pipeline.utils.image_context import ImageContext
+    from ml_pipeline.utils.expense_tracker import save_expense, get_expenses, get_expense_summary, migrate_expense_file
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
     InvoiceCategorizer = None
     extract_text_from_invoice = None
     extract_text_with_details_from_invoice = None
+    extract_fields_from_invoice = None
+    get_ocr_quality = None
+    OCR_PROFILES = {}
     parse_receipt = None
+    ImageContext = None
     save_expense = None
     get_expenses = None
     get_expense_summary = None
+    migrate_expense_file = None
+
+try:
+    from ml_pipeline.utils.tools import tool_diagnostics, refresh_tools
+except ImportError:
+    tool_diagnostics = None
+    refresh_tools = None
+
+try:
+    from ml_pipeline.utils.vendor_gazetteer import get_gazetteer, record_expense_vendor, record_vendor_correction
+except ImportError:
+    get_gazetteer = None
+    record_expense_vendor = None
+    record_vendor_correction = None
+
+try:
+    from ml_pipeline.utils.receipt_schema import ClassificationResult, ReceiptData, json_schema
+except ImportError:
+    ClassificationResult = None
+    ReceiptData = None
+    json_schema = None
 
 APP_ROOT = Path(__file__).resolve().parent
 WORKDIR = Path(os.environ.get("SCANS_DIR", str(APP_ROOT / "scans")))
@@ -94,6 +120,9 @@ def scan():
         return jsonify({"ok": False, "error": "unauthorized"}), 401
     data = request.get_json(force=True, silent=True) or {}
     zoom = max(0.2, min(2.0, float(data.get("zoom", 0.3))))
+    ocr_profile = data.get("ocr_profile")
+    if ocr_profile and ML_AVAILABLE and ocr_profile not in OCR_PROFILES:
+        return jsonify({"ok": False, "error": f"unknown ocr_profile: {ocr_profile}"}), 400
     ts = time.strftime("%Y%m%d_%H%M%S")
     base = f"scan_{ts}"
     scan_script = APP_ROOT / "scan_once.py"
@@ -109,9 +138,9 @@ def scan():
         return jsonify({"ok": False, "error": f"Scan failed: {e.stderr[:200]}"}), 500
     result = {"ok": True, "saved": [f"{base}.jpg"], "workdir": str(WORKDIR)}  # PDF removed - JPG is better for OCR
     if data.get("classify", True) and ML_AVAILABLE:
-        classification = classify_invoice_file(f"{base}.jpg", None)  # PDF not needed - JPG is better for OCR
+        classification = classify_invoice_file(f"{base}.jpg", None, ocr_profile)  # PDF not needed - JPG is better for OCR
         if classification:
-            result["classification"] = classification
+            result["classification"] = classification.to_dict()
     if SYNC_ENABLED and (data.get("auto_sync", False) or os.environ.get("AUTO_SYNC", "false").lower() == "true"):
         subprocess.run(["ssh", "-o", "ConnectTimeout=5", "-o", "BatchMode=yes", f"{SERVER_USER}@{SERVER_HOST}", "mkdir", "-p", SERVER_DIR], capture_output=True, timeout=10)
         synced_files = []
@@ -165,9 +194,13 @@ def classify():
         return jsonify({"ok": False, "error": "unauthorized"}), 401
     if not ML_AVAILABLE:
         return jsonify({"ok": False, "error": "ML not available"}), 503
-    filename = (request.get_json(force=True, silent=True) or {}).get("filename")
+    data = request.get_json(force=True, silent=True) or {}
+    filename = data.get("filename")
     if not filename:
         return jsonify({"ok": False, "error": "missing filename"}), 400
+    ocr_profile = data.get("ocr_profile")
+    if ocr_profile and ocr_profile not in OCR_PROFILES:
+        return jsonify({"ok": False, "error": f"unknown ocr_profile: {ocr_profile}"}), 400
     base_name = Path(filename).stem
     jpg_path = WORKDIR / f"{base_name}.jpg"
     if not jpg_path.exists():
@@ -179,42 +212,61 @@ def classify():
     if not jpg_path.exists():
         return jsonify({"ok": False, "error": "file not found"}), 404
     # PDF not needed - JPG is better for OCR
-    classification = classify_invoice_file(jpg_path.name, None)  # Always use JPG for OCR
-    return jsonify({"ok": True, **classification}) if classification else jsonify({"ok": False, "error": "classification failed"}), 500
+    classification = classify_invoice_file(jpg_path.name, None, ocr_profile)  # Always use JPG for OCR
+    if not classification:
+        return jsonify({"ok": False, "error": "classification failed"}), 500
+    return jsonify({"ok": True, **classification.to_dict()})
 
-def classify_invoice_file(jpg_filename: str, pdf_filename: str = None) -> dict:
+def classify_invoice_file(jpg_filename: str, pdf_filename: str = None, ocr_profile: str = None) -> ClassificationResult:
     categorizer = get_categorizer()
     if not categorizer:
         return None
     jpg_path = WORKDIR / jpg_filename
     pdf_path = WORKDIR / pdf_filename if pdf_filename else None
+    # Decode the scan once; OCR and the image model share the decoded image
+    scan = ImageContext(jpg_path)
+    # Image-only models don't need the body text: OCR just the header/footer bands for receipt fields
+    if categorizer.model_type == "image" and extract_fields_from_invoice and jpg_path.exists():
+        text, word_data = extract_fields_from_invoice(scan, pdf_path)
     # Use enhanced OCR with bounding box data for better vendor extraction
-    if extract_text_with_details_from_invoice and jpg_path.exists():
-        text, word_data = extract_text_with_details_from_invoice(jpg_path, pdf_path) if extract_text_with_details_from_invoice else ("", [])
+    elif extract_text_with_details_from_invoice and jpg_path.exists():
+        text, word_data = extract_text_with_details_from_invoice(scan, pdf_path, ocr_profile) if extract_text_with_details_from_invoice else ("", [])
     else:
-        text = extract_text_from_invoice(jpg_path, pdf_path) if extract_text_from_invoice else ""
+        text = extract_text_from_invoice(scan, pdf_path, ocr_profile) if extract_text_from_invoice else ""
         word_data = []
     if categorizer.model_type == "image":
-        category, probs = categorizer.predict_image(str(jpg_path), return_probs=True)
+        category, probs = categorizer.predict_image(scan, return_probs=True)
     elif categorizer.model_type == "hybrid":
-        category, probs = categorizer.predict_hybrid(text, str(jpg_path), return_probs=True) if text else categorizer.predict_image(str(jpg_path), return_probs=True)
+        category, probs = categorizer.predict_hybrid(text, scan, return_probs=True) if text else categorizer.predict_image(scan, return_probs=True)
     else:
         if not text:
             return None
         category, probs = categorizer.predict_text(text, return_probs=True)
     sorted_probs = sorted(probs.items(), key=lambda x: x[1], reverse=True)[:3]
-    receipt_data = parse_receipt(text, word_data) if text and parse_receipt else {}
-    classification_result = {
-        "category": category,
-        "confidence": round(probs[category], 4),
-        "top_predictions": [{"category": cat, "confidence": round(prob, 4)} for cat, prob in sorted_probs],
-        "text_extracted": len(text) > 0,
-        "text_length": len(text),
-        "receipt_data": receipt_data
-    }
+    receipt_data = ReceiptData.from_dict(parse_receipt(text, word_data) if text and parse_receipt else None)
+    # Canonical vendor name from the gazetteer of known vendors, so rollups don't split on OCR spellings
+    vendor_match = get_gazetteer(WORKDIR).match(text, receipt_data.vendor) if text and get_gazetteer else None
+    # A header hit only fills in a missing vendor; it never replaces the parsed one
+    if vendor_match and (vendor_match["source"] == "hint" or not receipt_data.vendor):
+        receipt_data.vendor = vendor_match["name"]
+        receipt_data.vendor_id = vendor_match["vendor_id"]
+    classification_result = ClassificationResult(
+        category=category,
+        confidence=round(probs[category], 4),
+        top_predictions=[{"category": cat, "confidence": round(prob, 4)} for cat, prob in sorted_probs],
+        text_extracted=len(text) > 0,
+        text_length=len(text),
+        receipt_data=receipt_data
+    )
+    # OCR quality score (0-1) and the strategy that produced the text; absent for PDF text layers
+    ocr_quality = get_ocr_quality(scan) if get_ocr_quality else None
+    if ocr_quality:
+        classification_result.ocr_score = ocr_quality["score"]
+        classification_result.ocr_strategy = ocr_quality["strategy"]
     
     if save_expense:
-        save_expense(WORKDIR, jpg_filename, classification_result, receipt_data)
+        if save_expense(WORKDIR, jpg_filename, classification_result) and record_expense_vendor:
+            record_expense_vendor(WORKDIR, receipt_data.vendor)
         
         # Move classified files to subdirectory to avoid reclassification
         classified_dir = WORKDIR / "classified"
@@ -297,6 +349,40 @@ def ml_status():
         status["model_type"] = categorizer.model_type
     return jsonify(status)
 
+@app.get("/api/tools")
+def tools_status():
+    """External tools found on this host (tesseract, poppler, ImageMagick, cameras) with versions"""
+    if not require_auth(request):
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    if not tool_diagnostics:
+        return jsonify({"ok": False, "error": "tool diagnostics not available"}), 500
+    if request.args.get("refresh"):
+        refresh_tools()
+    return jsonify({"ok": True, "tools": tool_diagnostics()})
+
+@app.get("/api/vendors")
+def vendors():
+    if not require_auth(request):
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    if not get_gazetteer:
+        return jsonify({"ok": False, "error": "vendor gazetteer not available"}), 500
+    known = get_gazetteer(WORKDIR).to_dict()
+    return jsonify({"ok": True, "vendors": known, "count": len(known)})
+
+@app.post("/api/vendors/correct")
+def correct_vendor():
+    """Record that an OCR'd vendor string belongs to a (new or known) canonical vendor"""
+    if not require_auth(request):
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    if not record_vendor_correction:
+        return jsonify({"ok": False, "error": "vendor gazetteer not available"}), 500
+    data = request.get_json(force=True, silent=True) or {}
+    vendor = (data.get("vendor") or "").strip()
+    if not vendor:
+        return jsonify({"ok": False, "error": "vendor required"}), 400
+    vid = record_vendor_correction(WORKDIR, (data.get("ocr_vendor") or "").strip(), vendor)
+    return jsonify({"ok": True, "vendor_id": vid})
+
 @app.get("/api/expenses")
 def expenses():
     if not require_auth(request):
@@ -312,6 +398,15 @@ def expenses_summary():
     summary = get_expense_summary(WORKDIR) if get_expense_summary else {}
     return jsonify({"ok": True, **summary})
 
+@app.get("/api/schema")
+def schema():
+    """JSON Schema of the classification results returned by /api/scan and /api/classify"""
+    if not require_auth(request):
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    if not json_schema:
+        return jsonify({"ok": False, "error": "schema not available"}), 503
+    return jsonify(json_schema())
+
 @app.get("/api/expenses/download")
 def download_expenses():
     if not require_auth(request):
@@ -319,6 +414,8 @@ def download_expenses():
     expense_file = WORKDIR / "expenses.csv"
     if not expense_file.exists():
         return jsonify({"ok": False, "error": "No expenses file found"}), 404
+    if migrate_expense_file:
+        migrate_expense_file(WORKDIR)
     return send_from_directory(str(WORKDIR), "expenses.csv", as_attachment=True)
 
 @app.get("/api/files/list")
@@ -8,15 +8,128 @@ from typing import Dict, List, Optional, Tuple
 import torch
 from torch.utils.data import Dataset
 from PIL import Image
+import numpy as np
 import pandas as pd
 from transformers import AutoTokenizer
 
+from .token_cache import TOKEN_CACHE, load_token_cache
+from .image_cache import IMAGE_CACHE, IMAGE_CACHE_SIZE, load_image_cache
+
+# Columns tried, in order, for a row's text
+TEXT_COLUMNS = ['text', 'description', 'content', 'invoice_text', 'extracted_text']
+IMAGE_COLUMNS = ['image_path', 'image', 'file_path', 'path', 'filename']
+
+
+def row_text(row: Dict, exclude: List[str], placeholder: str = "") -> str:
+    """
+    Text of a dataset row: the first non-empty TEXT_COLUMNS value, else all
+    other columns (except `exclude`) joined, else `placeholder`.
+    """
+    text = ""
+    for col in TEXT_COLUMNS:
+        if col in row and pd.notna(row[col]):
+            text = str(row[col])
+            break
+    
+    if not text:
+        # Try to get text from other columns
+        text = " ".join([str(value) for col, value in row.items() 
+                        if col not in exclude and pd.notna(value)])
+    
+    if placeholder and (not text or text.strip() == ""):
+        text = placeholder
+    return text
+
+
+def _token_arrays(dataset, labels_path: Optional[str], use_cache: bool, text_rules: str) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-mapped token cache for a dataset (see token_cache.py), or None to tokenize per sample."""
+    if not (use_cache and TOKEN_CACHE):
+        return None
+    source = Path(labels_path) if labels_path else dataset.data_path
+    try:
+        return load_token_cache(source, lambda: dataset.texts, lambda: dataset.labels,
+                                dataset.tokenizer, dataset.max_length, text_rules)
+    except Exception as e:
+        print(f"Token cache unavailable ({e}); tokenizing per sample")
+        return None
+
+
+def _encode(dataset, idx: int, text: str) -> Tuple[torch.Tensor, torch.Tensor]:
+    """(input_ids, attention_mask) of one sample: a slice of the token cache, or the tokenizer."""
+    if dataset.tokens is not None:
+        input_ids = torch.from_numpy(dataset.tokens['input_ids'][idx].astype(np.int64))
+        length = int(dataset.tokens['lengths'][idx])
+        positions = torch.arange(dataset.max_length)
+        if dataset.tokenizer.padding_side == 'left':
+            positions = positions.flip(0)
+        return input_ids, (positions < length).long()
+    encoding = dataset.tokenizer(
+        text,
+        truncation=True,
+        padding='max_length',
+        max_length=dataset.max_length,
+        return_tensors='pt'
+    )
+    return encoding['input_ids'].flatten(), encoding['attention_mask'].flatten()
+
+
+def row_image_path(row: Dict, image_dir: Path) -> Optional[Path]:
+    """Image of a dataset row (first IMAGE_COLUMNS value), relative paths resolved against image_dir."""
+    for col in IMAGE_COLUMNS:
+        if col in row and pd.notna(row[col]):
+            image_path = Path(row[col])
+            if not image_path.is_absolute():
+                image_path = image_dir / image_path
+            return image_path
+    return None
+
+
+def tensor_transform_for(transform, size: int = IMAGE_CACHE_SIZE):
+    """
+    The steps of `transform` to run on cached (already resized) image
+    tensors, or None if it cannot use the cache. That is the case unless
+    it starts with Resize((size, size)) (bilinear), then ToTensor: random
+    crops and other PIL steps need the full-resolution image. Steps after
+    ToTensor (Normalize, tensor augmentations) are kept.
+    """
+    try:
+        from torchvision import transforms
+    except ImportError:
+        return None
+    steps = transform.transforms if isinstance(transform, transforms.Compose) else [transform]
+    if len(steps) < 2 or not isinstance(steps[1], transforms.ToTensor):
+        return None
+    resize = steps[0]
+    if not (isinstance(resize, transforms.Resize) and list(np.atleast_1d(resize.size)) == [size, size]
+            and resize.interpolation == transforms.InterpolationMode.BILINEAR):
+        return None
+    return transforms.Compose(steps[2:])
+
+
+def _image_arrays(dataset, labels_path: Optional[str], use_cache: bool) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-mapped image cache for a dataset (see image_cache.py), or None to decode per sample."""
+    if not (use_cache and IMAGE_CACHE) or dataset.tensor_transform is None:
+        return None
+    source = Path(labels_path) if labels_path else dataset.data_path
+    try:
+        return load_image_cache(source, dataset.image_paths)
+    except Exception as e:
+        print(f"Image cache unavailable ({e}); decoding per sample")
+        return None
+
+
+def _cached_image(dataset, idx: int) -> torch.Tensor:
+    """Image of one sample from the image cache, as the dataset's transform would return it."""
+    image = torch.from_numpy(np.array(dataset.images['images'][idx])).float().div_(255)
+    return dataset.tensor_transform(image)
+
 
 class InvoiceTextDataset(Dataset):
     """Dataset for text-based invoice classification."""
     
     def __init__(self, data_path: str, labels_path: Optional[str] = None,
-                 max_length: int = 512, model_name: str = "distilbert-base-uncased"):
+                 max_length: int = 512, model_name: str = "distilbert-base-uncased",
+                 use_cache: bool = True):
         self.data_path = Path(data_path)
         self.max_length = max_length
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
@@ -43,44 +156,23 @@ class InvoiceTextDataset(Dataset):
         
         self.num_classes = len(self.categories)
         
+        # Row texts and labels, extracted once instead of per sample
+        # (placeholder text for empty rows; for image-only models this is OK)
+        self.texts = [row_text(row, ['category'], "invoice document") for row in self.df.to_dict('records')]
+        self.labels = [self.label_to_idx[cat] for cat in self.df['category']]
+        self.tokens = _token_arrays(self, labels_path, use_cache, "text-v1")
+        
     def __len__(self):
         return len(self.df)
     
     def __getitem__(self, idx):
-        row = self.df.iloc[idx]
-        
-        # Get text (could be from 'text', 'description', 'content', etc.)
-        text = ""
-        for col in ['text', 'description', 'content', 'invoice_text', 'extracted_text']:
-            if col in row and pd.notna(row[col]):
-                text = str(row[col])
-                break
-        
-        if not text:
-            # Try to get text from other columns
-            text = " ".join([str(row[col]) for col in row.index 
-                           if col != 'category' and pd.notna(row[col])])
-        
-        # If still no text, use a placeholder (for image-only models this is OK)
-        if not text or text.strip() == "":
-            text = "invoice document"  # Minimal placeholder text
-        
-        # Tokenize
-        encoding = self.tokenizer(
-            text,
-            truncation=True,
-            padding='max_length',
-            max_length=self.max_length,
-            return_tensors='pt'
-        )
-        
-        # Get label
-        label = self.label_to_idx[row['category']]
+        text = self.texts[idx]
+        input_ids, attention_mask = _encode(self, idx, text)
         
         return {
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
-            'label': torch.tensor(label, dtype=torch.long),
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'label': torch.tensor(self.labels[idx], dtype=torch.long),
             'text': text
         }
 
@@ -89,7 +181,7 @@ class InvoiceImageDataset(Dataset):
     """Dataset for image-based invoice classification."""
     
     def __init__(self, data_path: str, labels_path: Optional[str] = None,
-                 image_dir: Optional[str] = None, transform=None):
+                 image_dir: Optional[str] = None, transform=None, use_cache: bool = True):
         self.data_path = Path(data_path)
         self.transform = transform
         
@@ -121,36 +213,35 @@ class InvoiceImageDataset(Dataset):
         
         self.num_classes = len(self.categories)
         
+        # Image paths and labels, resolved once; images pre-decoded when the transform allows it
+        self.image_paths = [row_image_path(row, self.image_dir) for row in self.df.to_dict('records')]
+        self.labels = [self.label_to_idx[cat] for cat in self.df['category']]
+        self.tensor_transform = tensor_transform_for(transform)
+        self.images = _image_arrays(self, labels_path, use_cache)
+        
     def __len__(self):
         return len(self.df)
     
     def __getitem__(self, idx):
-        row = self.df.iloc[idx]
-        
-        # Get image path
-        image_path = None
-        for col in ['image_path', 'image', 'file_path', 'path', 'filename']:
-            if col in row and pd.notna(row[col]):
-                image_path = Path(row[col])
-                if not image_path.is_absolute():
-                    image_path = self.image_dir / image_path
-                break
-        
-        if not image_path or not image_path.exists():
-            raise FileNotFoundError(f"Image not found: {image_path}")
-        
-        # Load image
-        image = Image.open(image_path).convert('RGB')
-        
-        if self.transform:
-            image = self.transform(image)
+        image_path = self.image_paths[idx]
         
-        # Get label
-        label = self.label_to_idx[row['category']]
+        if self.images is not None:
+            if not self.images['present'][idx]:
+                raise FileNotFoundError(f"Image not found: {image_path}")
+            image = _cached_image(self, idx)
+        else:
+            if not image_path or not image_path.exists():
+                raise FileNotFoundError(f"Image not found: {image_path}")
+            
+            # Load image
+            image = Image.open(image_path).convert('RGB')
+            
+            if self.transform:
+                image = self.transform(image)
         
         return {
             'image': image,
-            'label': torch.tensor(label, dtype=torch.long),
+            'label': torch.tensor(self.labels[idx], dtype=torch.long),
             'path': str(image_path)
         }
 
@@ -160,7 +251,8 @@ class HybridInvoiceDataset(Dataset):
     
     def __init__(self, data_path: str, labels_path: Optional[str] = None,
                  image_dir: Optional[str] = None, transform=None,
-                 max_length: int = 512, model_name: str = "distilbert-base-uncased"):
+                 max_length: int = 512, model_name: str = "distilbert-base-uncased",
+                 use_cache: bool = True):
         self.data_path = Path(data_path)
         self.transform = transform
         self.max_length = max_length
@@ -194,43 +286,27 @@ class HybridInvoiceDataset(Dataset):
         
         self.num_classes = len(self.categories)
         
+        # Row texts and labels, extracted once instead of per sample
+        self.texts = [row_text(row, ['category'] + IMAGE_COLUMNS) for row in self.df.to_dict('records')]
+        self.labels = [self.label_to_idx[cat] for cat in self.df['category']]
+        self.tokens = _token_arrays(self, labels_path, use_cache, "hybrid-v1")
+        self.image_paths = [row_image_path(row, self.image_dir) for row in self.df.to_dict('records')]
+        self.tensor_transform = tensor_transform_for(transform)
+        self.images = _image_arrays(self, labels_path, use_cache)
+        
     def __len__(self):
         return len(self.df)
     
     def __getitem__(self, idx):
-        row = self.df.iloc[idx]
-        
         # Get text
-        text = ""
-        for col in ['text', 'description', 'content', 'invoice_text', 'extracted_text']:
-            if col in row and pd.notna(row[col]):
-                text = str(row[col])
-                break
-        
-        if not text:
-            text = " ".join([str(row[col]) for col in row.index 
-                           if col not in ['category', 'image_path', 'image', 'file_path', 'path', 'filename'] 
-                           and pd.notna(row[col])])
-        
-        # Tokenize text
-        text_encoding = self.tokenizer(
-            text,
-            truncation=True,
-            padding='max_length',
-            max_length=self.max_length,
-            return_tensors='pt'
-        )
-        
-        # Get image
-        image_path = None
-        for col in ['image_path', 'image', 'file_path', 'path', 'filename']:
-            if col in row and pd.notna(row[col]):
-                image_path = Path(row[col])
-                if not image_path.is_absolute():
-                    image_path = self.image_dir / image_path
-                break
-        
-        if image_path and image_path.exists():
+        text = self.texts[idx]
+        input_ids, attention_mask = _encode(self, idx, text)
+        
+        # Get image (missing images are cached as blank white ones)
+        image_path = self.image_paths[idx]
+        if self.images is not None:
+            image = _cached_image(self, idx)
+        elif image_path and image_path.exists():
             image = Image.open(image_path).convert('RGB')
             if self.transform:
                 image = self.transform(image)
@@ -240,14 +316,11 @@ class HybridInvoiceDataset(Dataset):
             if self.transform:
                 image = self.transform(image)
         
-        # Get label
-        label = self.label_to_idx[row['category']]
-        
         return {
-            'input_ids': text_encoding['input_ids'].flatten(),
-            'attention_mask': text_encoding['attention_mask'].flatten(),
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
             'image': image,
-            'label': torch.tensor(label, dtype=torch.long),
+            'label': torch.tensor(self.labels[idx], dtype=torch.long),
             'text': text,
             'path': str(image_path) if image_path else None
         }
@@ -0,0 +1,119 @@
+"""
+Pre-decoded, memory-mapped image cache for the image and hybrid datasets.
+
+Decoding full-resolution scans and resizing them in __getitem__ repeats the
+same work every epoch. The cache decodes every image once, in parallel
+worker processes, resizes it to IMAGE_CACHE_SIZE the way
+transforms.Resize does (PIL bilinear) and stores the dataset as one uint8
+array of shape N x 3 x size x size, plus a mask of the images that were
+found. The array is memory-mapped on load, so fetching a sample is a slice;
+the dataset's transform (normalization, augmentation) then runs on the small
+tensor. The cache directory is named by a hash of the image size, then a
+hash of the dataset file and the image paths with their sizes and
+modification times, so changing any of them builds a fresh cache (stale
+ones of the same size are removed).
+"""
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from .token_cache import cache_key, file_digest, publish_cache_dir
+
+IMAGE_CACHE = os.environ.get("IMAGE_CACHE", "true").lower() == "true"  # false: decode per sample
+IMAGE_CACHE_VERSION = 1    # Bump when the cache layout or resizing changes
+IMAGE_CACHE_SIZE = 224     # Side of the cached images (the models' input size)
+IMAGE_CACHE_WORKERS = int(os.environ.get("IMAGE_CACHE_WORKERS", "0")) or os.cpu_count() or 1
+DECODE_CHUNK = 64          # Images per worker task
+CACHE_DIR_SUFFIX = ".image_cache"
+
+
+def images_fingerprint(image_paths: List[Optional[Path]]) -> str:
+    """Hash of the image paths with their sizes and modification times (missing images included)."""
+    digest = hashlib.sha256()
+    for path in image_paths:
+        try:
+            stat = path.stat()
+            digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        except (AttributeError, OSError):
+            digest.update(f"{path}\0missing\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def cache_dir_for(source: Path, image_paths: List[Optional[Path]], size: int) -> Path:
+    """<dataset dir>/<dataset name>.image_cache/<key>, keyed by size, then dataset and images."""
+    key = cache_key([str(size)],
+                    [str(IMAGE_CACHE_VERSION), file_digest(source), images_fingerprint(image_paths)])
+    return source.parent / (source.name + CACHE_DIR_SUFFIX) / key
+
+
+def _decode_chunk(array_path: str, start: int, paths: List[Optional[str]], size: int) -> List[bool]:
+    """Decode and resize images into rows start.. of the cache array; which of them were found."""
+    images = np.load(array_path, mmap_mode='r+')
+    found = []
+    for offset, path in enumerate(paths):
+        try:
+            with Image.open(path) as image:
+                # Same result as transforms.Resize((size, size)) on the PIL image
+                image = image.convert('RGB').resize((size, size), Image.BILINEAR)
+            images[start + offset] = np.asarray(image).transpose(2, 0, 1)
+            found.append(True)
+        except Exception:
+            found.append(False)  # Row keeps the white fill
+    images.flush()
+    return found
+
+
+def build_image_cache(cache_dir: Path, image_paths: List[Optional[Path]], size: int,
+                      workers: int = IMAGE_CACHE_WORKERS) -> None:
+    """Decode all images in parallel into cache_dir (atomically, via a temp dir)."""
+    temp_dir = cache_dir.with_name(cache_dir.name + f".tmp{os.getpid()}")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    temp_dir.mkdir(parents=True)
+
+    # Written in place by the workers; missing images stay white, like the hybrid dataset's blank image
+    array_path = temp_dir / "images.npy"
+    images = np.lib.format.open_memmap(array_path, mode='w+', dtype=np.uint8,
+                                       shape=(len(image_paths), 3, size, size))
+    images[:] = 255
+    images.flush()
+    del images
+
+    paths = [str(path) if path else None for path in image_paths]
+    starts = range(0, len(paths), DECODE_CHUNK)
+    present = []
+    if workers > 1 and len(paths) > DECODE_CHUNK:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for found in pool.map(_decode_chunk, [str(array_path)] * len(starts), starts,
+                                  [paths[start:start + DECODE_CHUNK] for start in starts],
+                                  [size] * len(starts)):
+                present.extend(found)
+    else:
+        for start in starts:
+            present.extend(_decode_chunk(str(array_path), start, paths[start:start + DECODE_CHUNK], size))
+
+    np.save(temp_dir / "present.npy", np.asarray(present, dtype=bool))
+    (temp_dir / "meta.json").write_text(json.dumps({
+        'version': IMAGE_CACHE_VERSION, 'rows': len(paths), 'size': size, 'found': int(sum(present)),
+    }, indent=2))
+    publish_cache_dir(temp_dir, cache_dir)
+
+
+def load_image_cache(source: Path, image_paths: List[Optional[Path]],
+                     size: int = IMAGE_CACHE_SIZE) -> Dict[str, np.ndarray]:
+    """
+    Memory-mapped {'images': uint8 N x 3 x size x size, 'present': bool N}
+    for the dataset file `source`, building the cache first if it is
+    missing or stale.
+    """
+    cache_dir = cache_dir_for(Path(source), image_paths, size)
+    if not (cache_dir / "meta.json").exists():
+        print(f"Decoding {len(image_paths)} images of {source} into {cache_dir}...")
+        build_image_cache(cache_dir, image_paths, size)
+    return {name: np.load(cache_dir / f"{name}.npy", mmap_mode='r') for name in ("images", "present")}
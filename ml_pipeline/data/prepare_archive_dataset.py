@@ -5,11 +5,28 @@ Processes JPG images and CSV metadata to create a training dataset.
 import argparse
 import json
 import csv
+import io
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
 import re
+import string
 from collections import Counter
+from concurrent.futures import as_completed
 
+from tqdm import tqdm
+
+try:
+    from ml_pipeline.utils.ocr_extract import extract_text_tesseract, ocr_worker_pool
+    OCR_AVAILABLE = True
+except ImportError:
+    extract_text_tesseract = None
+    ocr_worker_pool = None
+    OCR_AVAILABLE = False
+
+# Columns of the prepared dataset CSV
+DATASET_FIELDS = ["image_path", "category", "text", "filename",
+                  "seller_name", "client_name", "invoice_date", "invoice_number"]
 
 # Category inference keywords
 CATEGORY_KEYWORDS = {
@@ -65,10 +82,63 @@ CATEGORY_KEYWORDS = {
 }
 
 
+# Seller-name keywords, checked in priority order (the first rule with a hit wins)
+SELLER_KEYWORDS = [
+    ("Travel", ["hotel", "inn", "lodge", "resort"]),
+    ("Meals & Entertainment", ["restaurant", "cafe", "dining", "grill"]),
+    ("Office Supplies", ["office", "supply", "stationery"]),
+    ("Software & Subscriptions", ["software", "tech", "cloud", "saas"]),
+    ("Legal & Compliance", ["legal", "law", "attorney"]),
+    ("Professional Services", ["consulting", "advisory", "services"]),
+]
+
+# ASCII punctuation splits words like whitespace does ("pens," -> "pens")
+_PUNCTUATION_TO_SPACE = str.maketrans({char: " " for char in string.punctuation})
+
+
+def _keyword_index(keywords_by_label) -> Tuple[Dict[str, str], Dict[str, List]]:
+    """
+    (word form -> keyword, keyword -> labels). Forms are the keyword and its
+    plurals ("pen" -> pen, pens); labels repeat if a keyword is listed twice.
+    """
+    forms, labels = {}, {}
+    for label, keywords in keywords_by_label:
+        for keyword in keywords:
+            keyword = " ".join(keyword.split())
+            labels.setdefault(keyword, []).append(label)
+            for form in (keyword, keyword + "s", keyword + "es"):
+                forms.setdefault(form, keyword)
+    return forms, labels
+
+
+# Built once: the text is tokenized in one pass and every token (and two-token
+# phrase) is a dict lookup, instead of a substring scan per keyword per category
+_CATEGORY_FORMS, _KEYWORD_CATEGORIES = _keyword_index(CATEGORY_KEYWORDS.items())
+_SELLER_FORMS, _SELLER_RANKS = _keyword_index((rank, keywords) for rank, (_, keywords) in enumerate(SELLER_KEYWORDS))
+_PHRASE_HEADS = {form.split()[0] for form in [*_CATEGORY_FORMS, *_SELLER_FORMS] if " " in form}
+
+
+def _keywords_in(text: str, forms: Dict[str, str]) -> set:
+    """Keywords that occur in `text` as whole words (or two-word phrases)."""
+    tokens = text.lower().translate(_PUNCTUATION_TO_SPACE).split()
+    # keys() & list builds a set of the hits only, not of every token
+    hits = forms.keys() & tokens
+    # Two-word keywords: only walk the tokens when one of their first words occurs
+    if not _PHRASE_HEADS.isdisjoint(tokens):
+        for first, second in zip(tokens, tokens[1:]):
+            if first in _PHRASE_HEADS and f"{first} {second}" in forms:
+                hits.add(f"{first} {second}")
+    return {forms[form] for form in hits}
+
+
 def infer_category_from_text(text: str, items: List[Dict] = None) -> str:
     """
     Infer expense category from invoice text and items.
     
+    Every keyword of a category found as a whole word (plurals included)
+    adds one to its score; the highest score wins, ties going to the
+    category listed first in CATEGORY_KEYWORDS.
+    
     Args:
         text: OCR text or invoice description
         items: List of invoice items with descriptions
@@ -80,48 +150,31 @@ def infer_category_from_text(text: str, items: List[Dict] = None) -> str:
         text = ""
     
     # Combine all text
-    all_text = text.lower()
+    all_text = text
     if items:
         for item in items:
             if isinstance(item, dict) and "description" in item:
-                all_text += " " + str(item["description"]).lower()
+                all_text += " " + str(item["description"])
     
     # Count matches for each category
-    category_scores = {}
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        score = sum(1 for keyword in keywords if keyword in all_text)
-        if score > 0:
-            category_scores[category] = score
+    category_scores = Counter()
+    for keyword in _keywords_in(all_text, _CATEGORY_FORMS):
+        category_scores.update(_KEYWORD_CATEGORIES[keyword])
     
-    if category_scores:
-        # Return category with highest score
-        return max(category_scores.items(), key=lambda x: x[1])[0]
-    
-    return "Other"
+    best, best_score = "Other", 0
+    for category in CATEGORY_KEYWORDS:
+        if category_scores[category] > best_score:
+            best, best_score = category, category_scores[category]
+    return best
 
 
 def infer_category_from_seller(seller_name: str) -> Optional[str]:
-    """Infer category from seller/vendor name."""
+    """Infer category from seller/vendor name: the first SELLER_KEYWORDS rule with a whole-word hit."""
     if not seller_name:
         return None
     
-    seller_lower = seller_name.lower()
-    
-    # Check for known vendor patterns
-    if any(kw in seller_lower for kw in ["hotel", "inn", "lodge", "resort"]):
-        return "Travel"
-    if any(kw in seller_lower for kw in ["restaurant", "cafe", "dining", "grill"]):
-        return "Meals & Entertainment"
-    if any(kw in seller_lower for kw in ["office", "supply", "stationery"]):
-        return "Office Supplies"
-    if any(kw in seller_lower for kw in ["software", "tech", "cloud", "saas"]):
-        return "Software & Subscriptions"
-    if any(kw in seller_lower for kw in ["legal", "law", "attorney"]):
-        return "Legal & Compliance"
-    if any(kw in seller_lower for kw in ["consulting", "advisory", "services"]):
-        return "Professional Services"
-    
-    return None
+    ranks = [rank for keyword in _keywords_in(seller_name, _SELLER_FORMS) for rank in _SELLER_RANKS[keyword]]
+    return SELLER_KEYWORDS[min(ranks)][0] if ranks else None
 
 
 def parse_json_data(json_str: str) -> Optional[Dict]:
@@ -151,6 +204,24 @@ def parse_json_data(json_str: str) -> Optional[Dict]:
         return None
 
 
+def invoice_from_row(row: Dict[str, str]) -> Optional[Dict]:
+    """Invoice data of one metadata CSV row (None without a file name)."""
+    filename = (row.get("File Name") or "").strip()
+    if not filename:
+        return None
+    
+    # Parse JSON data
+    json_data = None
+    if "Json Data" in row and row["Json Data"]:
+        json_data = parse_json_data(row["Json Data"])
+    
+    return {
+        "json_data": json_data,
+        "ocr_text": (row.get("OCRed Text") or "").strip(),
+        "filename": filename
+    }
+
+
 def process_csv_file(csv_path: Path) -> Dict[str, Dict]:
     """
     Process a CSV file and extract invoice data.
@@ -164,29 +235,95 @@ def process_csv_file(csv_path: Path) -> Dict[str, Dict]:
         with open(csv_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             for row in reader:
-                filename = row.get("File Name", "").strip()
-                if not filename:
-                    continue
-                
-                # Parse JSON data
-                json_data = None
-                if "Json Data" in row and row["Json Data"]:
-                    json_data = parse_json_data(row["Json Data"])
-                
-                # Get OCR text
-                ocr_text = row.get("OCRed Text", "").strip()
-                
-                invoices[filename] = {
-                    "json_data": json_data,
-                    "ocr_text": ocr_text,
-                    "filename": filename
-                }
+                invoice = invoice_from_row(row)
+                if invoice:
+                    invoices[invoice["filename"]] = invoice
     except Exception as e:
         print(f"Error processing CSV {csv_path}: {e}")
     
     return invoices
 
 
+def iter_csv_records(csv_path: Path, offset: int = 0, complete_only: bool = False) -> Iterator[Tuple[int, bytes]]:
+    """
+    (byte offset, raw bytes) of each CSV record from `offset` on, header
+    included. A record ends at a newline outside quotes (an even number of
+    quote characters so far), so quoted fields may span lines. The last
+    record may lack a final newline; with complete_only it is treated as
+    torn (cut short by an interrupted write) and not yielded.
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        lines, quotes = [], 0
+        for line in f:
+            lines.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2 == 0 and line.endswith(b'\n'):
+                record = b''.join(lines)
+                yield offset, record
+                offset += len(record)
+                lines, quotes = [], 0
+        if lines and not complete_only:
+            yield offset, b''.join(lines)
+
+
+def parse_csv_record(record: bytes) -> List[str]:
+    """Fields of one raw CSV record."""
+    return next(csv.reader(io.StringIO(record.decode('utf-8'), newline='')), [])
+
+
+class CsvMetadataIndex:
+    """
+    Invoice metadata of the archive CSVs, read lazily. Indexing keeps only
+    filename -> (CSV, byte offset); a row is re-read and its JSON parsed
+    when get() asks for it, so memory does not grow with the size of the
+    Json Data / OCRed Text columns. Later rows win, as with dict.update.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, Tuple[Path, int]] = {}
+        self._headers: Dict[Path, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self._rows
+
+    def add_csv(self, csv_path: Path) -> int:
+        """Index the rows of one CSV; returns the number of rows with a file name."""
+        count = 0
+        try:
+            records = iter_csv_records(csv_path)
+            header = parse_csv_record(next(records, (0, b''))[1])
+            if "File Name" not in header:
+                return 0
+            self._headers[csv_path] = header
+            column = header.index("File Name")
+            for offset, record in records:
+                fields = parse_csv_record(record)
+                filename = fields[column].strip() if column < len(fields) else ""
+                if filename:
+                    self._rows[filename] = (csv_path, offset)
+                    count += 1
+        except Exception as e:
+            print(f"Error processing CSV {csv_path}: {e}")
+        return count
+
+    def get(self, filename: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Invoice data for an image file name (see invoice_from_row), read from its CSV row."""
+        location = self._rows.get(filename)
+        if location is None:
+            return default
+        csv_path, offset = location
+        try:
+            _, record = next(iter_csv_records(csv_path, offset))
+            return invoice_from_row(dict(zip(self._headers[csv_path], parse_csv_record(record)))) or default
+        except Exception as e:
+            print(f"Error reading {filename} from {csv_path}: {e}")
+            return default
+
+
 def find_all_images(archive_dir: Path) -> List[Path]:
     """Find all JPG images in the archive."""
     images = []
@@ -205,14 +342,98 @@ def find_all_csvs(archive_dir: Path) -> List[Path]:
     return sorted(csvs)
 
 
-def prepare_dataset(archive_dir: Path, output_csv: Path, extract_ocr: bool = False):
+def relative_image_path(img_path: Path, archive_dir: Path) -> str:
+    """Image path as stored in the dataset: relative to the ml_pipeline/data/ directory."""
+    try:
+        # Try relative to archive_dir.parent (ml_pipeline/data/)
+        return str(img_path.relative_to(archive_dir.parent))
+    except ValueError:
+        # Fallback: relative to archive_dir, with the archive directory name prepended
+        return str(archive_dir.name / img_path.relative_to(archive_dir))
+
+
+def dataset_row(img_path: Path, archive_dir: Path, invoice_data: Dict, ocr_text: str) -> Dict:
+    """Training row for one image: path, inferred category, text and invoice fields."""
+    json_data = invoice_data.get("json_data")
+    
+    # Infer category
+    category = None
+    
+    # Try to infer from seller name first
+    if json_data and "invoice" in json_data:
+        seller_name = json_data["invoice"].get("seller_name", "")
+        category = infer_category_from_seller(seller_name)
+    
+    # If no category from seller, infer from text/items
+    if not category:
+        items = None
+        if json_data and "items" in json_data:
+            items = json_data["items"]
+        category = infer_category_from_text(ocr_text, items)
+    
+    row = {
+        "image_path": relative_image_path(img_path, archive_dir),
+        "category": category,
+        "text": ocr_text if ocr_text else "",  # Ensure non-empty string
+        "filename": img_path.name
+    }
+    
+    # Add JSON fields if available
+    if json_data and "invoice" in json_data:
+        inv = json_data["invoice"]
+        row["seller_name"] = inv.get("seller_name", "")
+        row["client_name"] = inv.get("client_name", "")
+        row["invoice_date"] = inv.get("invoice_date", "")
+        row["invoice_number"] = inv.get("invoice_number", "")
+    
+    return row
+
+
+def resume_output(output_csv: Path) -> Optional[set]:
+    """
+    image_path of every row already written to a (possibly interrupted)
+    output CSV, or None if there is no dataset CSV to resume. A last row
+    cut short by the interruption is truncated away, so new rows can be
+    appended after the complete ones.
+    """
+    if not output_csv.exists():
+        return None
+    done = set()
+    try:
+        records = iter_csv_records(output_csv, complete_only=True)
+        _, header_record = next(records, (0, b''))
+        if parse_csv_record(header_record) != DATASET_FIELDS:
+            print(f"{output_csv} is not a dataset CSV; starting over")
+            return None
+        column = DATASET_FIELDS.index("image_path")
+        end = len(header_record)
+        for offset, record in records:
+            done.add(parse_csv_record(record)[column])
+            end = offset + len(record)
+        with open(output_csv, 'r+b') as f:
+            f.truncate(end)
+    except Exception as e:
+        print(f"Error reading {output_csv} for --resume: {e}")
+        return None
+    return done
+
+
+def prepare_dataset(archive_dir: Path, output_csv: Path, extract_ocr: bool = False,
+                    ocr_profile: str = "thorough", workers: Optional[int] = None, resume: bool = False):
     """
     Prepare training dataset from archive.
     
+    Rows are appended to output_csv as they are finished, so an interrupted
+    run keeps its work; with resume=True, images already in output_csv are
+    skipped. The file is rewritten in image order at the end.
+    
     Args:
         archive_dir: Path to archive (4) directory
         output_csv: Output CSV path for training dataset
         extract_ocr: Whether to extract OCR from images (requires pytesseract)
+        ocr_profile: OCR quality/latency profile (fast, balanced, thorough)
+        workers: OCR worker processes (default: OCR_WORKERS or one per core)
+        resume: Keep the rows already in output_csv and only process the rest
     """
     print(f"Processing archive: {archive_dir}")
     
@@ -226,94 +447,111 @@ def prepare_dataset(archive_dir: Path, output_csv: Path, extract_ocr: bool = Fal
     csv_files = find_all_csvs(archive_dir)
     print(f"Found {len(csv_files)} CSV files")
     
-    # Process CSV files
-    all_invoice_data = {}
+    # Index the CSV files: file name -> row offset; rows are parsed when their image is processed
+    metadata = CsvMetadataIndex()
     for csv_file in csv_files:
-        print(f"Processing CSV: {csv_file.name}")
-        invoice_data = process_csv_file(csv_file)
-        all_invoice_data.update(invoice_data)
-        valid_count = sum(1 for v in invoice_data.values() if v.get("json_data") or v.get("ocr_text"))
-        print(f"  Loaded {len(invoice_data)} invoices from CSV ({valid_count} with valid data)")
+        print(f"Indexing CSV: {csv_file.name}")
+        print(f"  Indexed {metadata.add_csv(csv_file)} invoices")
     
-    print(f"Total invoices with metadata: {len(all_invoice_data)}")
+    print(f"Total invoices with metadata: {len(metadata)}")
     
-    # Prepare dataset rows
-    dataset_rows = []
-    missing_metadata = 0
-    missing_images = 0
+    if extract_ocr and not OCR_AVAILABLE:
+        print("⚠ OCR not available (install pytesseract and tesseract); continuing without --extract_ocr")
+        extract_ocr = False
     
-    # Process images
+    # Rows finished by an earlier, interrupted run
+    done = resume_output(output_csv) if resume else None
+    if done is not None:
+        print(f"Resuming: {len(done)} rows already in {output_csv}")
+    
+    # Process images, appending each row as soon as it is finished
     print("\nProcessing images and creating dataset...")
-    for img_path in images:
-        filename = img_path.name
-        
-        # Get invoice data from CSV if available
-        invoice_data = all_invoice_data.get(filename, {})
-        json_data = invoice_data.get("json_data")
-        ocr_text = invoice_data.get("ocr_text", "")
-        
-        # If no OCR text in CSV and extract_ocr is True, extract from image
-        if not ocr_text and extract_ocr:
-            try:
-                from ml_pipeline.utils.ocr_extract import extract_text_tesseract
-                ocr_text = extract_text_tesseract(img_path)
-            except Exception as e:
-                print(f"  OCR extraction failed for {filename}: {e}")
-        
-        # Infer category
-        category = None
-        
-        # Try to infer from seller name first
-        if json_data and "invoice" in json_data:
-            seller_name = json_data["invoice"].get("seller_name", "")
-            category = infer_category_from_seller(seller_name)
-        
-        # If no category from seller, infer from text/items
-        if not category:
-            items = None
-            if json_data and "items" in json_data:
-                items = json_data["items"]
-            category = infer_category_from_text(ocr_text, items)
-        
-        # Create dataset row
-        # Use relative path from ml_pipeline/data/ directory
-        try:
-            # Try relative to archive_dir.parent (ml_pipeline/data/)
-            rel_path = img_path.relative_to(archive_dir.parent)
-        except ValueError:
-            # Fallback: use relative to archive_dir
-            rel_path = img_path.relative_to(archive_dir)
-            # Prepend archive directory name
-            rel_path = archive_dir.name / rel_path
-        
-        row = {
-            "image_path": str(rel_path),
-            "category": category,
-            "text": ocr_text if ocr_text else "",  # Ensure non-empty string
-            "filename": filename
-        }
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_csv, 'a' if done is not None else 'w', newline='', encoding='utf-8') as f, \
+            tqdm(total=len(images), initial=len(done or ()), desc="Images", unit="img") as progress:
+        writer = csv.DictWriter(f, fieldnames=DATASET_FIELDS, extrasaction='ignore')
+        if done is None:
+            writer.writeheader()
+        written = len(done or ())
         
-        # Add JSON fields if available
-        if json_data and "invoice" in json_data:
-            inv = json_data["invoice"]
-            row["seller_name"] = inv.get("seller_name", "")
-            row["client_name"] = inv.get("client_name", "")
-            row["invoice_date"] = inv.get("invoice_date", "")
-            row["invoice_number"] = inv.get("invoice_number", "")
+        def save(row: Dict) -> None:
+            nonlocal written
+            writer.writerow(row)
+            f.flush()
+            written += 1
+            progress.update()
         
-        dataset_rows.append(row)
+        # Rows with text from the CSV are written right away; the rest need OCR
+        needs_ocr = []
+        for img_path in images:
+            if done and relative_image_path(img_path, archive_dir) in done:
+                continue
+            invoice_data = metadata.get(img_path.name, {})
+            ocr_text = invoice_data.get("ocr_text", "")
+            if not ocr_text and extract_ocr:
+                needs_ocr.append(img_path)
+            else:
+                save(dataset_row(img_path, archive_dir, invoice_data, ocr_text))
         
-        if not json_data and not ocr_text:
-            missing_metadata += 1
-        if not img_path.exists():
-            missing_images += 1
+        # If no OCR text in CSV and extract_ocr is True, extract from the images in parallel
+        if needs_ocr:
+            pool = ocr_worker_pool(workers)
+            try:
+                futures = {pool.submit(extract_text_tesseract, img_path, ocr_profile): img_path for img_path in needs_ocr}
+                for future in as_completed(futures):
+                    img_path = futures[future]
+                    try:
+                        ocr_text = future.result()
+                    except Exception as e:
+                        tqdm.write(f"  OCR extraction failed for {img_path.name}: {e}")
+                        ocr_text = ""
+                    save(dataset_row(img_path, archive_dir, metadata.get(img_path.name, {}), ocr_text))
+            except KeyboardInterrupt:
+                tqdm.write(f"\nInterrupted: {written} rows saved to {output_csv}; rerun with --resume to continue")
+                raise
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Rewrite in image order (OCR finishes out of order, and resumed runs append), one row at a time
+    spans = {}
+    records = iter_csv_records(output_csv)
+    _, header_record = next(records, (0, b''))
+    column = DATASET_FIELDS.index("image_path")
+    for offset, record in records:
+        spans[parse_csv_record(record)[column]] = (offset, len(record))
+    
+    total_rows = 0
+    rows_with_text = 0
+    missing_metadata = 0
+    missing_images = 0
+    categories = Counter()
+    temp_csv = output_csv.with_name(output_csv.name + ".tmp")
+    with open(output_csv, 'rb') as src, open(temp_csv, 'wb') as out:
+        out.write(header_record)
+        for img_path in images:
+            span = spans.get(relative_image_path(img_path, archive_dir))
+            if span is None:
+                continue
+            offset, length = span
+            src.seek(offset)
+            record = src.read(length)
+            out.write(record)
+            row = dict(zip(DATASET_FIELDS, parse_csv_record(record)))
+            total_rows += 1
+            categories[row["category"]] += 1
+            if row["text"].strip():
+                rows_with_text += 1
+            elif not metadata.get(img_path.name, {}).get("json_data"):
+                # Neither text nor invoice JSON (the row may still have a CSV entry)
+                missing_metadata += 1
+            if not img_path.exists():
+                missing_images += 1
     
     # Count rows with/without text
-    rows_with_text = sum(1 for row in dataset_rows if row.get("text", "").strip())
-    rows_without_text = len(dataset_rows) - rows_with_text
+    rows_without_text = total_rows - rows_with_text
     
     print(f"\nDataset preparation complete!")
-    print(f"  Total rows: {len(dataset_rows)}")
+    print(f"  Total rows: {total_rows}")
     print(f"  Rows with text: {rows_with_text}")
     print(f"  Rows without text: {rows_without_text}")
     print(f"  Missing metadata: {missing_metadata}")
@@ -327,25 +565,17 @@ def prepare_dataset(archive_dir: Path, output_csv: Path, extract_ocr: bool = Fal
         print(f"  3. Filter dataset to only rows with text")
     
     # Count categories
-    categories = Counter(row["category"] for row in dataset_rows)
     print(f"\nCategory distribution:")
     for cat, count in categories.most_common():
         print(f"  {cat}: {count}")
     
-    # Write CSV
-    if dataset_rows:
-        fieldnames = ["image_path", "category", "text", "filename", 
-                     "seller_name", "client_name", "invoice_date", "invoice_number"]
-        
-        output_csv.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-            writer.writeheader()
-            writer.writerows(dataset_rows)
-        
+    if total_rows:
+        os.replace(temp_csv, output_csv)
         print(f"\nDataset saved to: {output_csv}")
-        print(f"  Rows: {len(dataset_rows)}")
+        print(f"  Rows: {total_rows}")
     else:
+        temp_csv.unlink()
+        output_csv.unlink()
         print("No data to save!")
 
 
@@ -368,6 +598,24 @@ def main():
         action="store_true",
         help="Extract OCR text from images (slower, requires pytesseract)"
     )
+    parser.add_argument(
+        "--ocr_profile",
+        type=str,
+        choices=["fast", "balanced", "thorough"],
+        default="thorough",
+        help="OCR quality/latency profile for --extract_ocr (see docs/OCR_PROFILES.md)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="OCR worker processes for --extract_ocr (default: OCR_WORKERS or one per core)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Keep rows already in the output CSV (from an interrupted run) and process only the rest"
+    )
     
     args = parser.parse_args()
     
@@ -382,7 +630,7 @@ def main():
     
     output_csv = Path(args.output)
     
-    prepare_dataset(archive_dir, output_csv, args.extract_ocr)
+    prepare_dataset(archive_dir, output_csv, args.extract_ocr, args.ocr_profile, args.workers, args.resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""
+Pre-tokenized, memory-mapped training cache for the text datasets.
+
+Tokenizing every sample in __getitem__, every epoch, keeps the DataLoader
+CPU-bound. The cache tokenizes the whole dataset once, in batches, and
+stores input_ids (padded to max_length), token lengths and labels as .npy
+files next to the dataset; they are memory-mapped on load, so fetching a
+sample is an array slice. The cache directory is named
+<settings>-<content>: a hash of the tokenizer, max_length and the text rules,
+then a hash of the dataset file and the cache layout version. Changing any
+of them builds a fresh cache; only stale caches with the same settings are
+removed, so e.g. the text and hybrid caches of one CSV live side by side.
+"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+TOKEN_CACHE = os.environ.get("TOKEN_CACHE", "true").lower() == "true"  # false: tokenize per sample
+TOKEN_CACHE_VERSION = 1   # Bump when the cache layout changes
+TOKENIZE_BATCH = 1024     # Texts per tokenizer call while building
+CACHE_DIR_SUFFIX = ".token_cache"
+ARRAYS = ("input_ids", "lengths", "labels")
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Hash of everything that decides a tokenizer's output (vocab, normalizer, padding side)."""
+    backend = getattr(tokenizer, 'backend_tokenizer', None)
+    spec = backend.to_str() if backend is not None else json.dumps(sorted(tokenizer.get_vocab().items()))
+    identity = f"{type(tokenizer).__name__}\0{spec}\0{tokenizer.padding_side}\0{tokenizer.truncation_side}"
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def cache_key(settings: List[str], content: List[str]) -> str:
+    """Cache directory name "<settings hash>-<content hash>" (see publish_cache_dir)."""
+    def digest(parts: List[str]) -> str:
+        return hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()[:12]
+    return f"{digest(settings)}-{digest(content)}"
+
+
+def cache_dir_for(source: Path, tokenizer, max_length: int, text_rules: str) -> Path:
+    """<dataset dir>/<dataset name>.token_cache/<key>, keyed by tokenizer and settings, then content."""
+    key = cache_key([tokenizer_fingerprint(tokenizer), str(max_length), text_rules],
+                    [str(TOKEN_CACHE_VERSION), file_digest(source)])
+    return source.parent / (source.name + CACHE_DIR_SUFFIX) / key
+
+
+def build_token_cache(cache_dir: Path, texts: List[str], labels: List[int], tokenizer, max_length: int) -> None:
+    """Tokenize all texts in batches and write the arrays to cache_dir (atomically, via a temp dir)."""
+    # uint16 covers BERT-sized vocabularies at a quarter of the size of int64
+    dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.int32
+    input_ids = np.full((len(texts), max_length), tokenizer.pad_token_id or 0, dtype=dtype)
+    lengths = np.zeros(len(texts), dtype=np.int32)
+    for start in range(0, len(texts), TOKENIZE_BATCH):
+        encoding = tokenizer(texts[start:start + TOKENIZE_BATCH], truncation=True, padding='max_length',
+                             max_length=max_length, return_tensors='np')
+        stop = start + len(encoding['input_ids'])
+        input_ids[start:stop] = encoding['input_ids']
+        lengths[start:stop] = encoding['attention_mask'].sum(axis=1)
+
+    temp_dir = cache_dir.with_name(cache_dir.name + f".tmp{os.getpid()}")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    temp_dir.mkdir(parents=True)
+    np.save(temp_dir / "input_ids.npy", input_ids)
+    np.save(temp_dir / "lengths.npy", lengths)
+    np.save(temp_dir / "labels.npy", np.asarray(labels, dtype=np.int64))
+    (temp_dir / "meta.json").write_text(json.dumps({
+        'version': TOKEN_CACHE_VERSION, 'rows': len(texts), 'max_length': max_length,
+        'padding_side': tokenizer.padding_side, 'tokenizer': getattr(tokenizer, 'name_or_path', ''),
+    }, indent=2))
+    publish_cache_dir(temp_dir, cache_dir)
+
+
+def publish_cache_dir(temp_dir: Path, cache_dir: Path) -> None:
+    """
+    Move a finished cache into place and drop stale caches it replaces:
+    those with the same settings hash (cache_key) but other content or
+    layout version. Caches built with other settings and temp directories
+    of builds still in progress are left alone.
+    """
+    settings = cache_dir.name.split('-')[0] + '-'
+    for stale in cache_dir.parent.iterdir():
+        if (stale.is_dir() and stale.name.startswith(settings) and stale.name != cache_dir.name
+                and '.tmp' not in stale.name):
+            shutil.rmtree(stale, ignore_errors=True)
+    os.replace(temp_dir, cache_dir)
+
+
+def load_token_cache(source: Path, texts: Callable[[], List[str]], labels: Callable[[], List[int]],
+                     tokenizer, max_length: int, text_rules: str) -> Dict[str, np.ndarray]:
+    """
+    Memory-mapped {'input_ids', 'lengths', 'labels'} for the dataset file
+    `source`, building the cache first if it is missing or stale. `texts`
+    and `labels` are only called to build it.
+    """
+    cache_dir = cache_dir_for(Path(source), tokenizer, max_length, text_rules)
+    if not (cache_dir / "meta.json").exists():
+        print(f"Tokenizing {source} into {cache_dir}...")
+        build_token_cache(cache_dir, texts(), labels(), tokenizer, max_length)
+    return {name: np.load(cache_dir / f"{name}.npy", mmap_mode='r') for name in ARRAYS}
@@ -9,6 +9,24 @@ from transformers import AutoTokenizer
 from torchvision import transforms
 
 from .models.invoice_classifier import InvoiceTextClassifier, InvoiceImageClassifier, HybridInvoiceClassifier
+from .utils.image_context import ImageContext, cached_thumbnail, reduce_image
+
+# Input size of the image models
+MODEL_IMAGE_SIZE = (224, 224)
+
+
+def load_model_image(image, size=MODEL_IMAGE_SIZE) -> Image.Image:
+    """
+    Load an image (path, PIL image or ImageContext) for the image model.
+    The model only sees 224x224, so JPEGs are decoded with libjpeg DCT
+    scaling (PIL draft) to the smallest size still covering the target
+    instead of decoding the full 5MP scan; the result is cached per file.
+    """
+    if isinstance(image, ImageContext):
+        return image.reduced(size)
+    if isinstance(image, Image.Image):
+        return reduce_image(image if image.mode == 'RGB' else image.convert('RGB'), size)
+    return cached_thumbnail(image, size)
 
 
 class InvoiceCategorizer:
@@ -91,13 +109,13 @@ class InvoiceCategorizer:
             return pred_category, prob_dict
         return pred_category
     
-    def predict_image(self, image_path: str, return_probs: bool = False):
-        """Predict category from image."""
+    def predict_image(self, image_path, return_probs: bool = False):
+        """Predict category from image (path, PIL image or ImageContext)."""
         if self.model_type not in ["image", "hybrid"]:
             raise ValueError(f"Model type {self.model_type} does not support image input")
         
         # Load and transform image
-        image = Image.open(image_path).convert('RGB')
+        image = load_model_image(image_path)
         if hasattr(self, 'image_transform'):
             image = self.image_transform(image)
         else:
@@ -130,8 +148,8 @@ class InvoiceCategorizer:
             return pred_category, prob_dict
         return pred_category
     
-    def predict_hybrid(self, text: str, image_path: str, return_probs: bool = False):
-        """Predict category from both text and image."""
+    def predict_hybrid(self, text: str, image_path, return_probs: bool = False):
+        """Predict category from both text and image (path, PIL image or ImageContext)."""
         if self.model_type != "hybrid":
             raise ValueError(f"Model type {self.model_type} is not hybrid")
         
@@ -147,7 +165,7 @@ class InvoiceCategorizer:
         attention_mask = encoding['attention_mask'].to(self.device)
         
         # Load and transform image
-        image = Image.open(image_path).convert('RGB')
+        image = load_model_image(image_path)
         image = self.image_transform(image).unsqueeze(0).to(self.device)
         
         # Predict
@@ -1,8 +1,8 @@
 """
 Utility functions for invoice processing
 """
+from .image_context import ImageContext
 from .ocr_extract import extract_text_from_invoice, extract_text_tesseract
 from .receipt_parser import parse_receipt
 
-__all__ = ['extract_text_from_invoice', 'extract_text_tesseract', 'parse_receipt']
-
+__all__ = ['ImageContext', 'extract_text_from_invoice', 'extract_text_tesseract', 'parse_receipt']
@@ -1,37 +1,63 @@
 from __future__ import annotations
 import csv
-from pathlib import Path
-from datetime import datetime
-from typing import Dict, Optional, List
 import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, List, Union
+
+from .receipt_schema import EXPENSE_COLUMNS, ClassificationResult, expense_from_row, migrate_expense_row
+
+_migrated = set()  # expenses.csv files already checked for old-format rows by this process
+_migrate_lock = threading.Lock()
 
 def get_expense_file(workdir: Path) -> Path:
     return workdir / "expenses.csv"
 
-def save_expense(workdir: Path, filename: str, classification: Dict, receipt_data: Dict) -> bool:
+def migrate_expense_file(workdir: Path) -> int:
+    """
+    Rewrite expenses.csv rows still in the old "$12.40" / "85.00%" format with
+    plain numbers, so the file has one format throughout. Checked once per
+    process; returns the number of rows rewritten.
+    """
     expense_file = get_expense_file(workdir)
+    with _migrate_lock:
+        if expense_file in _migrated or not expense_file.exists():
+            return 0
+        try:
+            with open(expense_file, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                fieldnames = reader.fieldnames or EXPENSE_COLUMNS
+                rows = list(reader)
+            migrated = [migrate_expense_row(row) for row in rows]
+            changed = sum(1 for old, new in zip(rows, migrated) if any(str(new[k]) != old[k] for k in old if k))
+            if changed:
+                temp_file = expense_file.with_suffix('.csv.tmp')
+                with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer.writeheader()
+                    writer.writerows(migrated)
+                os.replace(temp_file, expense_file)
+                print(f"Migrated {changed} expense rows to plain numbers")
+            _migrated.add(expense_file)
+            return changed
+        except Exception as e:
+            print(f"Error migrating expenses: {e}")
+            return 0
+
+def save_expense(workdir: Path, filename: str, classification: Union[ClassificationResult, Dict],
+                 receipt_data: Optional[Dict] = None) -> bool:
+    """Append one scan to expenses.csv. Accepts a ClassificationResult or the equivalent dicts."""
+    expense_file = get_expense_file(workdir)
+    migrate_expense_file(workdir)
     file_exists = expense_file.exists()
     
-    amounts = receipt_data.get('amounts', {})
-    total = amounts.get('total')
-    
-    row = {
-        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'scan_date': receipt_data.get('date') or datetime.now().strftime('%Y-%m-%d'),
-        'filename': filename,
-        'category': classification.get('category', 'Unknown'),
-        'confidence': f"{classification.get('confidence', 0):.2%}",
-        'amount': f"${total:.2f}" if total else '',
-        'amount_value': total if total else '',
-        'vendor': receipt_data.get('vendor', ''),
-        'invoice_number': receipt_data.get('invoice_number', ''),
-        'subtotal': f"${amounts.get('subtotal', 0):.2f}" if amounts.get('subtotal') else '',
-        'tax': f"${amounts.get('tax', 0):.2f}" if amounts.get('tax') else '',
-    }
+    if not isinstance(classification, ClassificationResult):
+        classification = ClassificationResult.from_dict(classification, receipt_data)
+    row = classification.expense_row(filename)
     
     try:
         with open(expense_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=row.keys())
+            writer = csv.DictWriter(f, fieldnames=EXPENSE_COLUMNS)
             if not file_exists:
                 writer.writeheader()
             writer.writerow(row)
@@ -49,7 +75,7 @@ def get_expenses(workdir: Path, limit: Optional[int] = None) -> List[Dict]:
     try:
         with open(expense_file, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            expenses = list(reader)
+            expenses = [expense_from_row(row) for row in reader]
             if limit:
                 expenses = expenses[-limit:]
         return expenses[::-1]
@@ -71,18 +97,14 @@ def get_expense_summary(workdir: Path) -> Dict:
             reader = csv.DictReader(f)
             for row in reader:
                 total_expenses += 1
-                amount_str = row.get('amount_value', '').replace('$', '').strip()
-                if amount_str:
-                    try:
-                        amount = float(amount_str)
-                        total_amount += amount
-                        category = row.get('category', 'Unknown')
-                        if category not in by_category:
-                            by_category[category] = {'count': 0, 'total': 0.0}
-                        by_category[category]['count'] += 1
-                        by_category[category]['total'] += amount
-                    except:
-                        pass
+                amount = expense_from_row(row)['amount_value']
+                if amount is not None:
+                    total_amount += amount
+                    category = row.get('category', 'Unknown')
+                    if category not in by_category:
+                        by_category[category] = {'count': 0, 'total': 0.0}
+                    by_category[category]['count'] += 1
+                    by_category[category]['total'] += amount
     except Exception as e:
         print(f"Error calculating summary: {e}")
     
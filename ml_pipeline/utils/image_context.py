@@ -0,0 +1,106 @@
+"""
+Decoded-image context shared by OCR, receipt parsing and inference.
+
+One classification used to decode the same 5MP JPEG several times (each OCR
+strategy, the word-box pass and the image model all called Image.open).
+An ImageContext decodes the file once and caches derived images (receipt
+crop, reduced copies) so every stage works from memory.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from PIL import Image
+
+
+class ImageContext:
+    """A scan decoded once and shared through the pipeline."""
+
+    def __init__(self, path: Union[str, Path], draft_size: Optional[Tuple[int, int]] = None):
+        """
+        Args:
+            path: Image file
+            draft_size: If set, JPEGs are decoded with PIL draft() at the smallest
+                DCT scale (1/2, 1/4, 1/8) that still covers this size
+        """
+        self.path = Path(path)
+        self.draft_size = draft_size
+        self.cache: Dict[str, object] = {}  # Derived images/results keyed by stage
+        self._image: Optional[Image.Image] = None
+
+    @classmethod
+    def from_image(cls, image: Image.Image, path: Union[str, Path] = "") -> "ImageContext":
+        """Wrap an already decoded image."""
+        ctx = cls(path)
+        ctx._image = image if image.mode == 'RGB' else image.convert('RGB')
+        return ctx
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def exists(self) -> bool:
+        return self._image is not None or self.path.exists()
+
+    @property
+    def image(self) -> Image.Image:
+        """The decoded RGB image (decoded on first access)."""
+        if self._image is None:
+            image = Image.open(self.path)
+            if self.draft_size and image.format == 'JPEG':
+                image.draft('RGB', self.draft_size)
+            self._image = image.convert('RGB') if image.mode != 'RGB' else image
+            self._image.load()
+        return self._image
+
+    def reduced(self, size: Tuple[int, int]) -> Image.Image:
+        """
+        A copy at least `size` large in both dimensions, cheaply decoded.
+        Uses the already decoded image if there is one, otherwise a draft-mode
+        JPEG decode (libjpeg DCT scaling) so the full image is never built.
+        """
+        key = f"reduced:{size[0]}x{size[1]}"
+        if key not in self.cache:
+            self.cache[key] = open_reduced(self.path, size) if self._image is None else reduce_image(self._image, size)
+        return self.cache[key]
+
+    def __repr__(self) -> str:
+        return f"ImageContext({str(self.path)!r})"
+
+
+def reduce_image(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Shrink by the largest integer factor that keeps the image at least `size` large."""
+    factor = max(1, min(image.width // size[0], image.height // size[1]))
+    return image.reduce(factor) if factor > 1 else image
+
+
+def open_reduced(path: Union[str, Path], size: Tuple[int, int]) -> Image.Image:
+    """Decode an image file at reduced size (DCT-domain scaling for JPEGs)."""
+    image = Image.open(path)
+    if image.format == 'JPEG':
+        image.draft('RGB', size)
+    image = image.convert('RGB') if image.mode != 'RGB' else image
+    image.load()
+    return reduce_image(image, size)
+
+
+@lru_cache(maxsize=64)
+def _cached_reduced(path: str, mtime_ns: int, size: Tuple[int, int]) -> Image.Image:
+    return open_reduced(path, size)
+
+
+def cached_thumbnail(path: Union[str, Path], size: Tuple[int, int]) -> Image.Image:
+    """
+    Reduced decode of an image file, cached per process (keyed on the file's
+    mtime so a rewritten scan is decoded again). Callers must not modify it.
+    """
+    path = Path(path)
+    return _cached_reduced(str(path), path.stat().st_mtime_ns, tuple(size))
+
+
+def as_image_context(source: Union[str, Path, Image.Image, ImageContext]) -> ImageContext:
+    """Return `source` as an ImageContext (paths and PIL images are wrapped)."""
+    if isinstance(source, ImageContext):
+        return source
+    if isinstance(source, Image.Image):
+        return ImageContext.from_image(source)
+    return ImageContext(source)
@@ -0,0 +1,335 @@
+"""
+Locale-aware normalization of receipt amounts and dates.
+
+Each locale in LOCALES fixes the decimal separator, the numeric date order
+and the currencies; each language in MONTHS / LABELS lists month names and
+the receipt labels (Summe, TVA, IVA, ...) that map onto the English labels
+the receipt parser understands. Everything is compiled once at import.
+
+detect_locale() scans the text once, voting on currency symbols, month
+names, labels, the decimal separator ("1.234,56" vs "1,234.56") and
+unambiguous numeric dates (31/01 vs 01/31). Another locale only replaces
+en_US with its currency on the receipt or a clear lead in the votes, so a
+stray word ("Family Mart": Turkish for March) does not flip a US receipt. normalize_text() then rewrites
+amounts to US format (12,50 -> 12.50), currency symbols to "$" and labels to
+English in a single substitution pass, so the US regex cascade in
+receipt_parser works unchanged. parse_date() reads numeric dates in the
+locale's order and dates with month names ("3. März 2024", "March 3, 2024").
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_LOCALE = "en_US"
+
+LOCALES = {
+    'en_US': {'language': 'en', 'decimal': '.', 'thousands': ',', 'date_order': 'MDY', 'currency': 'USD'},
+    'en_GB': {'language': 'en', 'decimal': '.', 'thousands': ',', 'date_order': 'DMY', 'currency': 'GBP'},
+    'de_DE': {'language': 'de', 'decimal': ',', 'thousands': '.', 'date_order': 'DMY', 'currency': 'EUR'},
+    'fr_FR': {'language': 'fr', 'decimal': ',', 'thousands': ' .\u00a0\u202f', 'date_order': 'DMY', 'currency': 'EUR'},
+    'es_ES': {'language': 'es', 'decimal': ',', 'thousands': '.', 'date_order': 'DMY', 'currency': 'EUR'},
+    'it_IT': {'language': 'it', 'decimal': ',', 'thousands': '.', 'date_order': 'DMY', 'currency': 'EUR'},
+    'nl_NL': {'language': 'nl', 'decimal': ',', 'thousands': '.', 'date_order': 'DMY', 'currency': 'EUR'},
+    'pt_BR': {'language': 'pt', 'decimal': ',', 'thousands': '.', 'date_order': 'DMY', 'currency': 'BRL'},
+    'tr_TR': {'language': 'tr', 'decimal': ',', 'thousands': '.', 'date_order': 'DMY', 'currency': 'TRY'},
+}
+
+# Symbols and codes as printed on receipts -> ISO currency
+CURRENCIES = {
+    '$': 'USD', 'USD': 'USD', '£': 'GBP', 'GBP': 'GBP', '€': 'EUR', 'EUR': 'EUR',
+    'R$': 'BRL', 'BRL': 'BRL', '₺': 'TRY', 'TL': 'TRY', 'TRY': 'TRY',
+}
+
+MONTHS = {
+    'en': ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october',
+           'november', 'december'],
+    'de': ['januar', 'februar', 'märz', 'april', 'mai', 'juni', 'juli', 'august', 'september', 'oktober',
+           'november', 'dezember'],
+    'fr': ['janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août', 'septembre', 'octobre',
+           'novembre', 'décembre'],
+    'es': ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto', 'septiembre', 'octubre',
+           'noviembre', 'diciembre'],
+    'it': ['gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno', 'luglio', 'agosto', 'settembre', 'ottobre',
+           'novembre', 'dicembre'],
+    'nl': ['januari', 'februari', 'maart', 'april', 'mei', 'juni', 'juli', 'augustus', 'september', 'oktober',
+           'november', 'december'],
+    'pt': ['janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho', 'julho', 'agosto', 'setembro', 'outubro',
+           'novembro', 'dezembro'],
+    'tr': ['ocak', 'şubat', 'mart', 'nisan', 'mayıs', 'haziran', 'temmuz', 'ağustos', 'eylül', 'ekim', 'kasım',
+           'aralık'],
+}
+# Abbreviations beyond the first three letters of each month
+MONTH_ABBREVIATIONS = {
+    'en': {'sept': 9},
+    'de': {'mrz': 3},
+    'fr': {'févr': 2, 'juil': 7, 'sept': 9},
+}
+
+# Receipt labels per language -> the English label receipt_parser matches
+# (None: only evidence of the language, e.g. the word for "invoice")
+LABELS = {
+    'en': {'receipt': None, 'invoice': None, 'thank you': None},
+    'de': {'summe': 'total', 'gesamt': 'total', 'gesamtbetrag': 'total', 'endbetrag': 'total',
+           'zwischensumme': 'subtotal', 'mwst': 'tax', 'ust': 'tax', 'rabatt': 'discount', 'betrag': 'amount',
+           'rechnung': None, 'quittung': None, 'kassenbon': None},
+    'fr': {'total ttc': 'total', 'net à payer': 'total', 'total ht': 'subtotal', 'sous-total': 'subtotal',
+           'sous total': 'subtotal', 'tva': 'tax', 'remise': 'discount', 'montant': 'amount', 'facture': None},
+    'es': {'total a pagar': 'total', 'importe': 'amount', 'base imponible': 'subtotal', 'iva': 'tax',
+           'descuento': 'discount', 'factura': None},
+    'it': {'totale': 'total', 'importo': 'amount', 'imponibile': 'subtotal', 'iva': 'tax', 'sconto': 'discount',
+           'fattura': None, 'scontrino': None},
+    'nl': {'totaal': 'total', 'subtotaal': 'subtotal', 'btw': 'tax', 'korting': 'discount', 'bedrag': 'amount',
+           'factuur': None, 'kassabon': None},
+    'pt': {'valor total': 'total', 'valor': 'amount', 'desconto': 'discount', 'imposto': 'tax', 'icms': 'tax',
+           'nota fiscal': None, 'fatura': None},
+    'tr': {'genel toplam': 'total', 'toplam': 'total', 'ara toplam': 'subtotal', 'kdv': 'tax', 'indirim': 'discount',
+           'tutar': 'amount', 'fatura': None, 'fiş': None},
+}
+
+# Vote weights for detect_locale
+_CURRENCY_WEIGHT = 3
+_LABEL_WEIGHT = 2
+_MONTH_WEIGHT = 1    # Month names double as ordinary words ("mart", "mei", "valor" is a label)
+_DETECT_MARGIN = 2   # Lead over en_US a locale needs without its currency on the receipt
+
+
+def _strip_accents(word: str) -> str:
+    """'märz' -> 'marz' (OCR often drops diacritics); dotless i -> i."""
+    return ''.join(c for c in unicodedata.normalize('NFKD', word.replace('ı', 'i')) if not unicodedata.combining(c))
+
+
+def _with_variants(words: Dict[str, object]) -> Dict[str, object]:
+    """Table plus accent-stripped spellings of its keys."""
+    table = dict(words)
+    for word, value in words.items():
+        table.setdefault(_strip_accents(word), value)
+    return table
+
+
+def _month_table(language: str) -> Dict[str, int]:
+    """Month names and unambiguous 3-letter abbreviations -> month number."""
+    names = MONTHS[language]
+    table = {name: number for number, name in enumerate(names, start=1)}
+    prefixes = Counter(name[:3] for name in names)
+    table.update({name[:3]: number for number, name in enumerate(names, start=1) if prefixes[name[:3]] == 1})
+    table.update(MONTH_ABBREVIATIONS.get(language, {}))
+    return _with_variants(table)
+
+
+def _alternation(words) -> str:
+    """Regex alternation, longest first so 'total ttc' wins over 'total'."""
+    return '|'.join(re.escape(w).replace(r'\ ', r'\s+') for w in sorted(words, key=len, reverse=True))
+
+
+_MONTH_TABLES = {language: _month_table(language) for language in MONTHS}
+_LABEL_TABLES = {language: _with_variants(labels) for language, labels in LABELS.items()}
+
+# Full month names and one-word labels -> languages they belong to (evidence for detection)
+_MONTH_LANGUAGES: Dict[str, List[str]] = {}
+_LABEL_LANGUAGES: Dict[str, List[str]] = {}
+for _language in MONTHS:
+    for _table, _words in ((_MONTH_LANGUAGES, _with_variants({m: 0 for m in MONTHS[_language]})),
+                           (_LABEL_LANGUAGES, _LABEL_TABLES[_language])):
+        for _word in _words:
+            if ' ' not in _word and _language not in _table.setdefault(_word, []):
+                _table[_word].append(_language)
+_WORD_LANGUAGES = _MONTH_LANGUAGES.keys() | _LABEL_LANGUAGES.keys()
+
+_CURRENCY_PATTERN = r'R\$|[$£€₺]|(?-i:\b(?:USD|GBP|EUR|BRL|TRY|TL)\b)'
+# Numeric evidence: dates (first, so "12.03.2024" is not read as amounts), amounts and
+# currency symbols. The lookahead skips positions that cannot start any of them.
+_DETECT_NUMBERS_RE = re.compile(
+    r'(?=[\dR$£€₺])(?:'
+    r'(?<![\d.,/-])(\d{1,2})([./-])(\d{1,2})\2\d{2,4}(?!\d)'
+    r'|(?<![\w.,])(\d+(?:[.,\u00a0\u202f ]\d{3})*[.,]\d{2})(?![\w]|[.,]\d)'
+    r'|(R?[$£€₺]))'
+)
+_WORD_RE = re.compile(r'[^\W\d_]{2,}')
+_EVIDENCE_WORDS = _WORD_LANGUAGES | CURRENCIES.keys()
+_SPACES_RE = re.compile(r'\s+')
+
+
+def _locale_votes(text: str) -> Tuple[Counter, Counter, Counter, Counter, Counter]:
+    """(decimal, date order, currency, label language, month language) vote counters for a text."""
+    decimal, order, currency, labels, months = Counter(), Counter(), Counter(), Counter(), Counter()
+    for first, sep, second, amount, symbol in _DETECT_NUMBERS_RE.findall(text):
+        if amount:
+            separator = amount[-3]
+            # "1.234,56" (both separators) is decisive, "12,50" less so
+            decimal[separator] += 2 if ('.' if separator == ',' else ',') in amount else 1
+        elif symbol:
+            currency[CURRENCIES[symbol]] += 1
+        else:
+            first, second = int(first), int(second)
+            if first > 12 >= second:
+                order['DMY'] += 2
+            elif second > 12 >= first:
+                order['MDY'] += 2
+            elif sep == '.':
+                order['DMY'] += 1  # Dotted dates are a European convention
+    # Words are counted in C and only the distinct words found in the tables are visited
+    words = Counter(_WORD_RE.findall(text))
+    for word in words.keys() & _EVIDENCE_WORDS:
+        if word in CURRENCIES:  # Codes are matched case-sensitively (EUR, not "eur")
+            currency[CURRENCIES[word]] += words[word]
+    lowered = Counter()
+    for word, count in words.items():
+        lowered[word.lower()] += count
+    for word in lowered.keys() & _WORD_LANGUAGES:
+        for table, votes in ((_LABEL_LANGUAGES, labels), (_MONTH_LANGUAGES, months)):
+            for lang in table.get(word, ()):
+                votes[lang] += lowered[word]
+    return decimal, order, currency, labels, months
+
+
+# Per locale: (currency, language, decimal, other decimal, date order, other date order)
+_DETECT_KEYS = {name: (spec['currency'], spec['language'], spec['decimal'], ',' if spec['decimal'] == '.' else '.',
+                       spec['date_order'], 'MDY' if spec['date_order'] == 'DMY' else 'DMY')
+                for name, spec in LOCALES.items()}
+
+
+def detect_locale(text: str) -> str:
+    """
+    Most likely locale of a receipt. Each locale scores its currency, its
+    language's labels and month names, and its decimal separator and date
+    order (evidence for the other separator or order counts against it).
+    A locale other than DEFAULT_LOCALE needs its currency on the receipt or
+    a lead of _DETECT_MARGIN over DEFAULT_LOCALE; ties go to DEFAULT_LOCALE.
+    """
+    if not text:
+        return DEFAULT_LOCALE
+    decimal, order, currency, labels, months = _locale_votes(text)
+    # Counter.get skips Counter.__missing__, which dominates the cost here
+    scores = {name: _CURRENCY_WEIGHT * currency.get(cur, 0) + _LABEL_WEIGHT * labels.get(lang, 0)
+              + _MONTH_WEIGHT * months.get(lang, 0) + decimal.get(dec, 0) - decimal.get(other_dec, 0)
+              + order.get(date_order, 0) - order.get(other_order, 0)
+              for name, (cur, lang, dec, other_dec, date_order, other_order) in _DETECT_KEYS.items()}
+    default_score = scores[DEFAULT_LOCALE]
+    best, best_score = DEFAULT_LOCALE, default_score
+    for name, value in scores.items():
+        if value > best_score and (currency.get(LOCALES[name]['currency']) or value - default_score >= _DETECT_MARGIN):
+            best, best_score = name, value
+    return best
+
+
+def _compile_locale(spec: Dict) -> Dict:
+    """Regexes for one locale, built once."""
+    thousands = re.escape(spec['thousands'])
+    decimal = re.escape(spec['decimal'])
+    months = dict(_MONTH_TABLES['en'], **_MONTH_TABLES[spec['language']])
+    month_names = _alternation(months)
+    labels = {word: english for word, english in _LABEL_TABLES[spec['language']].items() if english}
+    parts = [
+        rf'(?P<amount>(?<![\w.,])(?P<units>\d{{1,3}}(?:[{thousands}]\d{{3}})+|\d+)(?:{decimal}(?P<cents>\d{{1,2}}))?'
+        rf'(?![\w]|[.,]\d))',
+        # Currency before an amount collapses into "$" ("EUR 12,50" -> "$12.50")
+        r'(?P<currency>(?:' + _CURRENCY_PATTERN + r')[ \t]?)',
+    ]
+    if labels:
+        parts.append(r'(?P<label>\b(?:' + _alternation(labels) + r')\b)')
+    numeric = [r'(\d{1,2})[./-](\d{1,2})[./-](\d{2,4})'] if spec['date_order'] == 'DMY' else \
+        [r'(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})']
+    numeric.append(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})')
+    return {
+        'normalize': re.compile('|'.join(parts), re.IGNORECASE),
+        'labels': labels,
+        'months': months,
+        'numeric_dates': [re.compile(p) for p in numeric],
+        'named_dates': [
+            # 3. März 2024, 3 de marzo de 2024, 3rd March 2024
+            re.compile(rf'\b(?P<day>\d{{1,2}})(?:st|nd|rd|th|er|º)?\.?\s+(?:de\s+)?(?P<month>{month_names})\.?,?\s+'
+                       rf'(?:de\s+)?(?P<year>\d{{4}})\b', re.IGNORECASE),
+            # March 3, 2024
+            re.compile(rf'\b(?P<month>{month_names})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<year>\d{{4}})\b',
+                       re.IGNORECASE),
+        ],
+    }
+
+
+_COMPILED = {name: _compile_locale(spec) for name, spec in LOCALES.items()}
+
+
+def _spec(locale: Optional[str]) -> Tuple[Dict, Dict]:
+    name = locale if locale in LOCALES else DEFAULT_LOCALE
+    return LOCALES[name], _COMPILED[name]
+
+
+def parse_amount(token: str, locale: str = DEFAULT_LOCALE) -> Optional[float]:
+    """Value of one amount token in the locale's format ("1.234,56 €" -> 1234.56), or None."""
+    spec, _ = _spec(locale)
+    digits = re.sub(r'[^\d.,]', '', token)
+    if not digits or not any(c.isdigit() for c in digits):
+        return None
+    units, _, cents = digits.rpartition(spec['decimal'])
+    if not units or len(cents) > 2:
+        # No decimal separator of this locale: a trailing ".50" / ",50" is still cents
+        units, cents = (digits[:-3], digits[-2:]) if re.search(r'[.,]\d{2}$', digits) else (digits, '')
+    units = re.sub(r'[^\d]', '', units)
+    try:
+        return float(f"{units or 0}.{cents or 0}")
+    except ValueError:
+        return None
+
+
+def normalize_text(text: str, locale: str) -> str:
+    """
+    Text with amounts in US format, currency symbols as "$" and receipt
+    labels in English, in one substitution pass. US text is returned as is.
+    """
+    spec, compiled = _spec(locale)
+    if locale == DEFAULT_LOCALE or not text:
+        return text
+    labels = compiled['labels']
+    comma_decimal = spec['decimal'] == ','
+
+    def replace(match: re.Match) -> str:
+        kind = match.lastgroup
+        if kind == 'currency':
+            return '$'
+        if kind == 'label':
+            return labels.get(_SPACES_RE.sub(' ', match.group(0).lower()), match.group(0))
+        if not comma_decimal:
+            return match.group(0)
+        units = re.sub(r'\D', '', match.group('units'))
+        cents = match.group('cents')
+        return f"{units}.{cents}" if cents else units
+
+    return compiled['normalize'].sub(replace, text)
+
+
+def _valid_date(year: int, month: int, day: int) -> Optional[str]:
+    if year < 100:
+        year += 2000 if year < 50 else 1900
+    if 1 <= month <= 12 and 1 <= day <= 31:
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    return None
+
+
+def parse_date(text: str, locale: str = DEFAULT_LOCALE) -> Optional[str]:
+    """
+    First valid date as YYYY-MM-DD: numeric dates in the locale's order
+    (then ISO), else dates with a month name in the locale's language or English.
+    """
+    spec, compiled = _spec(locale)
+    day_first = spec['date_order'] == 'DMY'
+    for pattern in compiled['numeric_dates']:
+        for match in pattern.finditer(text):
+            groups = match.groups()
+            if len(groups[0]) == 4:
+                year, month, day = groups
+            elif day_first:
+                day, month, year = groups
+            else:
+                month, day, year = groups
+            date = _valid_date(int(year), int(month), int(day))
+            if date:
+                return date
+    months = compiled['months']
+    found = [match for pattern in compiled['named_dates'] for match in [pattern.search(text)] if match]
+    for match in sorted(found, key=lambda m: m.start()):
+        month = months.get(match.group('month').lower()) or months.get(_strip_accents(match.group('month').lower()))
+        date = _valid_date(int(match.group('year')), month or 0, int(match.group('day')))
+        if date:
+            return date
+    return None
@@ -1,11 +1,17 @@
-import subprocess
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, Union
 import pytesseract
 from PIL import Image, ImageEnhance, ImageFilter
 import numpy as np
 import re
 
+from .image_context import ImageContext, as_image_context
+from .tools import have_command
+
 try:
     import cv2
     CV2_AVAILABLE = True
@@ -85,273 +91,768 @@ def detect_and_crop_receipt_pil(image: Image.Image) -> Image.Image:
     except Exception:
         return image
 
-def have_command(cmd: str) -> bool:
-    return subprocess.call(["which", cmd], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+# Receipt boundary detection runs on a downsampled copy of the image; the
+# paper edge is a large low-frequency feature, so 1/4 scale is plenty.
+RECEIPT_DETECT_SCALE = 0.25
+
+# Paper segmentation mode: "otsu" picks one threshold per image from its
+# histogram, "sweep" tries the fixed 200/180/160 thresholds.
+RECEIPT_SEGMENTATION = os.environ.get("RECEIPT_SEGMENTATION", "otsu")
+
+# Warp receipts photographed at an angle to a flat rectangle before OCR
+RECEIPT_PERSPECTIVE = os.environ.get("RECEIPT_PERSPECTIVE", "false").lower() == "true"
+
+def _largest_contour(binary: np.ndarray, min_area: float):
+    """Clean up a binary paper mask and return its largest contour and area."""
+    kernel = np.ones((3, 3), np.uint8)
+    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None, 0
+    largest = max(contours, key=cv2.contourArea)
+    area = cv2.contourArea(largest)
+    if area <= min_area:
+        return None, 0
+    return largest, area
+
+def find_receipt_contour(gray: np.ndarray, segmentation: Optional[str] = None):
+    """
+    Find the contour of the paper in a grayscale array.
+    segmentation="otsu" thresholds once at the Otsu level (falling back to the
+    sweep if that finds nothing paper-sized); "sweep" tries 200/180/160.
+    Returns None if no paper-sized region is found.
+    """
+    segmentation = segmentation or RECEIPT_SEGMENTATION
+    min_area = gray.shape[0] * gray.shape[1] * 0.05  # Paper should be at least 5% of image
+    
+    if segmentation == "otsu":
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contour, _ = _largest_contour(thresh, min_area)
+        if contour is not None:
+            return contour
+    
+    # Find white paper: threshold to get bright areas (white paper is typically > 200)
+    # Try multiple thresholds to find the paper
+    best_contour = None
+    best_area = 0
+    for thresh_val in [200, 180, 160]:
+        _, thresh = cv2.threshold(gray, thresh_val, 255, cv2.THRESH_BINARY)
+        contour, area = _largest_contour(thresh, min_area)
+        if contour is not None and area > best_area:
+            best_contour = contour
+            best_area = area
+    return best_contour
+
+def _downscale(gray: np.ndarray, scale: float) -> Tuple[np.ndarray, float]:
+    if scale < 1.0:
+        return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA), scale
+    return gray, 1.0
 
-def detect_and_crop_receipt(image: Image.Image) -> Image.Image:
+def find_receipt_box(gray: np.ndarray, scale: float = RECEIPT_DETECT_SCALE,
+                     segmentation: Optional[str] = None) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the bounding box (x, y, w, h) of the paper in a full-resolution
+    grayscale array. Detection runs on a copy downsampled by `scale` and the
+    box is mapped back to full-resolution coordinates (padding included).
+    Returns None if no paper-sized region is found.
+    """
+    full_h, full_w = gray.shape[:2]
+    small, scale = _downscale(gray, scale)
+    contour = find_receipt_contour(small, segmentation)
+    if contour is None:
+        return None
+    
+    # Get bounding rectangle and map it back to full resolution
+    x, y, w, h = cv2.boundingRect(contour)
+    x = int(x / scale)
+    y = int(y / scale)
+    w = min(full_w - x, int(np.ceil(w / scale)))
+    h = min(full_h - y, int(np.ceil(h / scale)))
+    
+    # Add small padding (2% on each side)
+    padding_x = max(5, int(w * 0.02))
+    padding_y = max(5, int(h * 0.02))
+    x = max(0, x - padding_x)
+    y = max(0, y - padding_y)
+    w = min(full_w - x, w + 2 * padding_x)
+    h = min(full_h - y, h + 2 * padding_y)
+    return x, y, w, h
+
+def find_receipt_quad(gray: np.ndarray, scale: float = RECEIPT_DETECT_SCALE,
+                      segmentation: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Find the four paper corners (full-resolution, ordered top-left, top-right,
+    bottom-right, bottom-left) using approxPolyDP on the paper contour.
+    Returns None if the paper outline is not a convex quadrilateral.
+    """
+    small, scale = _downscale(gray, scale)
+    contour = find_receipt_contour(small, segmentation)
+    if contour is None:
+        return None
+    approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+    if len(approx) != 4 or not cv2.isContourConvex(approx):
+        return None
+    
+    pts = approx.reshape(4, 2).astype(np.float32) / scale
+    # Order corners: top-left has the smallest x+y, bottom-right the largest,
+    # top-right the smallest y-x, bottom-left the largest
+    sums = pts.sum(axis=1)
+    diffs = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(sums)], pts[np.argmin(diffs)],
+                     pts[np.argmax(sums)], pts[np.argmax(diffs)]], dtype=np.float32)
+
+def warp_receipt_quad(gray: np.ndarray, quad: np.ndarray) -> np.ndarray:
+    """Perspective-warp the quadrilateral `quad` of `gray` to an upright rectangle."""
+    tl, tr, br, bl = quad
+    width = int(max(np.linalg.norm(br - bl), np.linalg.norm(tr - tl)))
+    height = int(max(np.linalg.norm(tr - br), np.linalg.norm(tl - bl)))
+    dst = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(quad, dst)
+    return cv2.warpPerspective(gray, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+def enhance_receipt_crop(cropped_gray: np.ndarray) -> Image.Image:
+    """Contrast-enhance a grayscale receipt crop and size it for Tesseract."""
+    # Apply CLAHE for better contrast
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    enhanced = clahe.apply(cropped_gray)
+    
+    # Increase contrast more
+    enhanced = cv2.convertScaleAbs(enhanced, alpha=1.2, beta=10)
+    
+    # Resize if too small (Tesseract works better on larger images, but not too large).
+    # Resizing the single-channel array is ~3x cheaper than resizing the RGB image.
+    height, width = enhanced.shape[:2]
+    target_size = 2000  # Target size for better OCR
+    if width < target_size or height < target_size:
+        scale = min(target_size / width, target_size / height)
+        # Don't scale up too much (max 2x)
+        scale = min(scale, 2.0)
+        new_width = int(width * scale)
+        new_height = int(height * scale)
+        enhanced = cv2.resize(enhanced, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
+    
+    # Convert back to RGB for PIL
+    cropped_pil = Image.fromarray(cv2.cvtColor(enhanced, cv2.COLOR_GRAY2RGB))
+    
+    return cropped_pil
+
+def detect_and_crop_receipt(image: Image.Image, detect_scale: float = RECEIPT_DETECT_SCALE,
+                            segmentation: Optional[str] = None,
+                            perspective: Optional[bool] = None) -> Image.Image:
     """
     Detect the receipt/paper area in the image and crop to just that area.
     Finds the largest white/bright area (the paper) and crops to it.
     Uses OpenCV if available, otherwise falls back to PIL-only method.
+    
+    The paper boundary is searched on a copy downsampled by `detect_scale`
+    (1.0 = full resolution); enhancement only runs on the cropped region.
+    With `perspective`, a quadrilateral paper outline is warped flat instead
+    of cropped to its bounding box.
     """
     if not CV2_AVAILABLE:
         # Use PIL-only method if OpenCV not available
         return detect_and_crop_receipt_pil(image)
     
+    if perspective is None:
+        perspective = RECEIPT_PERSPECTIVE
+    
     try:
-        # Convert PIL to OpenCV format
-        img_array = np.array(image.convert('RGB'))
-        img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        original = img_cv.copy()
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+        # Convert PIL to a grayscale OpenCV array
+        gray = np.array(image.convert('L'))
         
-        # Find white paper: threshold to get bright areas (white paper is typically > 200)
-        # Try multiple thresholds to find the paper
-        thresholds = [200, 180, 160]
-        best_contour = None
-        best_area = 0
+        if perspective:
+            quad = find_receipt_quad(gray, detect_scale, segmentation)
+            if quad is not None:
+                return enhance_receipt_crop(warp_receipt_quad(gray, quad))
         
-        for thresh_val in thresholds:
-            _, thresh = cv2.threshold(gray, thresh_val, 255, cv2.THRESH_BINARY)
-            
-            # Apply morphological operations to clean up
-            kernel = np.ones((3, 3), np.uint8)
-            thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-            thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-            
-            # Find contours
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            if contours:
-                # Find largest contour
-                largest = max(contours, key=cv2.contourArea)
-                area = cv2.contourArea(largest)
-                # Paper should be at least 5% of image
-                if area > img_cv.shape[0] * img_cv.shape[1] * 0.05 and area > best_area:
-                    best_contour = largest
-                    best_area = area
-        
-        if best_contour is None:
+        box = find_receipt_box(gray, detect_scale, segmentation)
+        if box is None:
             return image  # No paper found, return original
         
-        # Get bounding rectangle
-        x, y, w, h = cv2.boundingRect(best_contour)
-        
-        # Add small padding (2% on each side)
-        padding_x = max(5, int(w * 0.02))
-        padding_y = max(5, int(h * 0.02))
-        x = max(0, x - padding_x)
-        y = max(0, y - padding_y)
-        w = min(img_cv.shape[1] - x, w + 2 * padding_x)
-        h = min(img_cv.shape[0] - y, h + 2 * padding_y)
-        
-        # Crop the image
-        cropped = original[y:y+h, x:x+w]
-        
-        # Enhance the cropped image for better OCR
-        cropped_gray = cv2.cvtColor(cropped, cv2.COLOR_BGR2GRAY)
-        
-        # Apply CLAHE for better contrast
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(cropped_gray)
-        
-        # Increase contrast more
-        enhanced = cv2.convertScaleAbs(enhanced, alpha=1.2, beta=10)
-        
-        # Convert back to RGB for PIL
-        enhanced_rgb = cv2.cvtColor(enhanced, cv2.COLOR_GRAY2RGB)
-        cropped_pil = Image.fromarray(enhanced_rgb)
-        
-        # Resize if too small (Tesseract works better on larger images, but not too large)
-        width, height = cropped_pil.size
-        target_size = 2000  # Target size for better OCR
-        if width < target_size or height < target_size:
-            scale = min(target_size / width, target_size / height)
-            # Don't scale up too much (max 2x)
-            scale = min(scale, 2.0)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            cropped_pil = cropped_pil.resize((new_width, new_height), Image.LANCZOS)
-        
-        return cropped_pil
+        # Crop the image and enhance only the cropped region for better OCR
+        x, y, w, h = box
+        return enhance_receipt_crop(gray[y:y+h, x:x+w])
     except Exception as e:
         # If anything fails, return original image
         return image
 
-def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
+# Straighten receipts before OCR so the first Tesseract strategy succeeds
+OCR_DESKEW = os.environ.get("OCR_DESKEW", "true").lower() == "true"
+# Always ask Tesseract OSD for 0/90/180/270 orientation (one extra run on a
+# small image). Otherwise OSD only runs when the text looks vertical.
+OCR_ORIENTATION_OSD = os.environ.get("OCR_ORIENTATION_OSD", "false").lower() == "true"
+DESKEW_MAX_SIDE = 800  # Skew is estimated on a copy no larger than this
+OSD_MIN_CONFIDENCE = 0.3  # OSD orientation answers below this are ignored (wrong ones score ~0.1)
+DESKEW_MAX_ANGLE = 10.0
+
+def _border_background(dark: np.ndarray) -> np.ndarray:
+    """Dark pixels reached in an unbroken run from an image edge (background around a rotated receipt)."""
+    background = np.logical_and.accumulate(dark, axis=1)
+    background |= np.logical_and.accumulate(dark[:, ::-1], axis=1)[:, ::-1]
+    background |= np.logical_and.accumulate(dark, axis=0)
+    background |= np.logical_and.accumulate(dark[::-1], axis=0)[::-1]
+    return background
+
+def _ink_coordinates(image: Image.Image, max_side: int = DESKEW_MAX_SIDE) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Preprocess image to improve OCR accuracy:
-    - Convert to grayscale
-    - Enhance contrast
-    - Sharpen
-    - Apply thresholding for better text recognition
+    Return (x, y) coordinates of dark (ink) pixels of a downsampled copy of the
+    image. Background wedges left in the corners of a crop are dark too; they
+    touch the edges and would outweigh the text lines, so they are dropped.
     """
-    # Convert to grayscale if needed
-    if image.mode != 'L':
-        image = image.convert('L')
-    
-    # Resize if image is too small (Tesseract works better on larger images)
-    width, height = image.size
+    small = image.convert('L')
+    scale = max_side / max(small.size)
+    if scale < 1.0:
+        small = small.resize((max(1, int(small.width * scale)), max(1, int(small.height * scale))), Image.BILINEAR)
+    gray = np.asarray(small)
+    if CV2_AVAILABLE:
+        _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    else:
+        ink = gray < gray.mean() - gray.std()
+    ink = ink.astype(bool)
+    ink &= ~_border_background(ink)
+    ys, xs = np.nonzero(ink)
+    return xs.astype(np.float32), ys.astype(np.float32)
+
+def _profile_score(xs: np.ndarray, ys: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """
+    Projection-profile sharpness for each candidate angle (degrees): ink is
+    projected onto lines of that slope and the variance of the histogram is
+    highest when the projection lines follow the text lines.
+    """
+    scores = np.empty(len(angles))
+    for i, angle in enumerate(np.radians(angles)):
+        proj = ys * np.cos(angle) - xs * np.sin(angle)
+        hist = np.bincount((proj - proj.min()).astype(np.int32))
+        scores[i] = hist.var()
+    return scores
+
+def _best_skew(xs: np.ndarray, ys: np.ndarray, max_angle: float) -> Tuple[float, float]:
+    """Coarse-to-fine search for the skew angle; returns (angle, profile score)."""
+    coarse = np.arange(-max_angle, max_angle + 0.5, 1.0)
+    best = coarse[np.argmax(_profile_score(xs, ys, coarse))]
+    fine = np.arange(best - 1.0, best + 1.01, 0.1)
+    scores = _profile_score(xs, ys, fine)
+    return float(fine[np.argmax(scores)]), float(scores.max())
+
+def _sampled_ink(image: Image.Image) -> Tuple[np.ndarray, np.ndarray]:
+    xs, ys = _ink_coordinates(image)
+    # Subsample ink pixels; the profile shape needs far fewer than a full page
+    if len(xs) > 40000:
+        step = len(xs) // 40000 + 1
+        xs, ys = xs[::step], ys[::step]
+    return xs, ys
+
+def estimate_skew_angle(image: Image.Image, max_angle: float = DESKEW_MAX_ANGLE) -> float:
+    """
+    Estimate the text skew of an image in degrees (positive = lines descend to
+    the right) with a coarse-to-fine projection-profile search on a
+    downsampled copy. Returns 0.0 if there is too little ink to tell.
+    """
+    xs, ys = _sampled_ink(image)
+    if len(xs) < 100:
+        return 0.0
+    return _best_skew(xs, ys, max_angle)[0]
+
+def detect_orientation(image: Image.Image, use_osd: Optional[bool] = None) -> int:
+    """
+    Detect page orientation. Returns the counter-clockwise rotation in degrees
+    (0, 90, 180 or 270) that makes the text upright. Projection profiles tell
+    horizontal from vertical text for free; Tesseract OSD (on a small copy)
+    resolves 90 vs 270 and, if use_osd is set, upside-down pages. Without a
+    confident OSD answer the page is left as it is: receipt columns can make
+    upright text look vertical to the profiles.
+    """
+    xs, ys = _sampled_ink(image)
+    return _orientation(image, xs, ys, use_osd)[0]
+
+def _orientation(image: Image.Image, xs: np.ndarray, ys: np.ndarray,
+                 use_osd: Optional[bool]) -> Tuple[int, float]:
+    """Return (rotation, skew of the unrotated text) from precomputed ink coordinates."""
+    if use_osd is None:
+        use_osd = OCR_ORIENTATION_OSD
+    if len(xs) < 100:
+        return 0, 0.0
+    skew, horizontal = _best_skew(xs, ys, DESKEW_MAX_ANGLE)
+    vertical = _best_skew(ys, xs, DESKEW_MAX_ANGLE)[1]
+    looks_vertical = vertical > horizontal * 1.5
+    if not (looks_vertical or use_osd):
+        return 0, skew
+    if have_command("tesseract"):
+        try:
+            small = image.convert('L')
+            small.thumbnail((1200, 1200))
+            osd = pytesseract.image_to_osd(small, config='--psm 0 -c min_characters_to_try=5')
+            match = re.search(r'Rotate:\s*(\d+)', osd)
+            confidence = re.search(r'Orientation confidence:\s*([\d.]+)', osd)
+            if match and confidence and float(confidence.group(1)) >= OSD_MIN_CONFIDENCE:
+                # OSD reports the clockwise rotation needed; PIL rotates counter-clockwise
+                return (360 - int(match.group(1))) % 360, skew
+        except Exception:
+            pass
+    # No OSD data or no confident answer: the profiles can't tell 90 from 270, so don't guess
+    return 0, skew
+
+def deskew_image(image: Image.Image, use_osd: Optional[bool] = None) -> Image.Image:
+    """
+    Rotate the image once so its text is upright and horizontal.
+    Orientation and skew are both estimated on downsampled copies.
+    """
+    try:
+        xs, ys = _sampled_ink(image)
+        rotation, skew = _orientation(image, xs, ys, use_osd)
+        if rotation:
+            # Skew must be measured again in the upright frame
+            skew = estimate_skew_angle(image.rotate(rotation, expand=True))
+        if abs(skew) < 0.3:
+            return image.rotate(rotation, expand=True) if rotation else image
+        # Combine orientation and skew into a single resampling pass
+        return _rotate_expand(image, rotation + skew)
+    except Exception:
+        return image
+
+def _rotate_expand(image: Image.Image, angle: float) -> Image.Image:
+    """Rotate counter-clockwise by `angle` degrees, expanding the canvas with white."""
+    fill = 255 if image.mode == 'L' else (255, 255, 255)
+    if not CV2_AVAILABLE or image.mode not in ('L', 'RGB'):
+        return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+    # cv2.warpAffine is several times faster than PIL's rotate on full-size crops
+    arr = np.asarray(image)
+    h, w = arr.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_w, new_h = int(h * sin + w * cos + 0.5), int(h * cos + w * sin + 0.5)
+    matrix[0, 2] += new_w / 2 - w / 2
+    matrix[1, 2] += new_h / 2 - h / 2
+    rotated = cv2.warpAffine(arr, matrix, (new_w, new_h), flags=cv2.INTER_CUBIC,
+                             borderMode=cv2.BORDER_CONSTANT, borderValue=fill)
+    return Image.fromarray(rotated)
+
+# Binarization for the aggressive preprocessing strategy: 'fixed' (global cut
+# at 128), 'adaptive' (local mean minus an offset) or 'sauvola' (local mean and
+# standard deviation; copes with shadows and uneven lighting on camera scans)
+OCR_THRESHOLD = os.environ.get("OCR_THRESHOLD", "fixed")
+OCR_THRESHOLD_WINDOW = 31  # Local window (pixels) for adaptive/sauvola
+SAUVOLA_K = 0.2
+SAUVOLA_R = 128.0
+
+# PIL's ImageFilter.SHARPEN kernel
+_SHARPEN_KERNEL = np.array([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], dtype=np.float32) / 16
+
+def _local_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean over a window x window neighbourhood (float32, edges reflected)."""
+    if CV2_AVAILABLE:
+        return cv2.boxFilter(values, cv2.CV_32F, (window, window), borderType=cv2.BORDER_REFLECT)
+    # Integral image: each window sum is four lookups
+    pad = window // 2
+    padded = np.pad(values.astype(np.float64), pad, mode='symmetric')
+    integral = np.pad(padded.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    h, w = values.shape
+    sums = (integral[window:window + h, window:window + w] - integral[:h, window:window + w]
+            - integral[window:window + h, :w] + integral[:h, :w])
+    return (sums / (window * window)).astype(np.float32)
+
+def binarize(gray: np.ndarray, method: str = "fixed", window: int = OCR_THRESHOLD_WINDOW) -> np.ndarray:
+    """Binarize a uint8 grayscale array to 0/255, in place where possible."""
+    if method == "fixed":
+        if CV2_AVAILABLE:
+            cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY, dst=gray)
+        else:
+            np.multiply(gray > 128, 255, out=gray, casting='unsafe')
+        return gray
+    if method == "adaptive" and CV2_AVAILABLE:
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, window | 1, 10, dst=gray)
+    values = gray.astype(np.float32)
+    mean = _local_mean(values, window | 1)
+    if method == "adaptive":
+        threshold = mean - 10
+    elif method == "sauvola":
+        # T = m * (1 + k * (s / R - 1))
+        std = np.sqrt(np.maximum(_local_mean(values * values, window | 1) - mean * mean, 0))
+        threshold = mean * (1 + SAUVOLA_K * (std / SAUVOLA_R - 1))
+    else:
+        raise ValueError(f"Unknown threshold method '{method}' (choose from fixed, adaptive, sauvola)")
+    np.multiply(values > threshold, 255, out=gray, casting='unsafe')
+    return gray
+
+def preprocess_array_for_ocr(gray: np.ndarray, threshold: Optional[str] = None) -> np.ndarray:
+    """
+    Aggressive OCR preprocessing on a uint8 grayscale array: upscale small
+    images to 1000px, contrast x1.5, sharpen, binarize (OCR_THRESHOLD by
+    default). Works in place on `gray` unless it has to be upscaled; the
+    result can be passed straight to pytesseract.
+    """
+    height, width = gray.shape[:2]
     if width < 1000 or height < 1000:
         # Scale up to at least 1000px on the smaller dimension
         scale = max(1000 / width, 1000 / height)
-        new_width = int(width * scale)
-        new_height = int(height * scale)
-        image = image.resize((new_width, new_height), Image.LANCZOS)
-    
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(1.5)  # Increase contrast by 50%
+        size = (int(width * scale), int(height * scale))
+        if CV2_AVAILABLE:
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_LANCZOS4)
+        else:
+            gray = np.array(Image.fromarray(gray).resize(size, Image.LANCZOS))
     
-    # Sharpen
-    image = image.filter(ImageFilter.SHARPEN)
-    
-    # Convert to numpy for thresholding
-    img_array = np.array(image)
-    
-    # Apply adaptive thresholding (makes text more distinct from background)
-    # Simple threshold: values above 128 become 255 (white), below become 0 (black)
-    threshold = 128
-    img_array = np.where(img_array > threshold, 255, 0).astype(np.uint8)
-    
-    # Convert back to PIL Image
-    image = Image.fromarray(img_array)
+    # Contrast x1.5 around the mean (as ImageEnhance.Contrast) as a 256-entry lookup table
+    mean = int(gray.mean() + 0.5)
+    lut = np.clip(mean + 1.5 * (np.arange(256) - mean), 0, 255).astype(np.uint8)
+    if CV2_AVAILABLE:
+        cv2.LUT(gray, lut, dst=gray)
+        cv2.filter2D(gray, -1, _SHARPEN_KERNEL, dst=gray)
+    else:
+        np.take(lut, gray, out=gray)
+        # 3x3 sharpen (34 * centre - 2 * box sum) / 16 on interior pixels, box sum done separably
+        values = gray.astype(np.int16)
+        rows = values[:-2] + values[1:-1] + values[2:]
+        box = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+        sharpened = (34 * values[1:-1, 1:-1] - 2 * box + 8) >> 4
+        np.clip(sharpened, 0, 255, out=sharpened)
+        gray[1:-1, 1:-1] = sharpened
     
+    return binarize(gray, threshold or OCR_THRESHOLD)
+
+def preprocess_image_for_ocr(image: Image.Image, threshold: Optional[str] = None) -> Image.Image:
+    """
+    Preprocess image to improve OCR accuracy (grayscale, upscale, contrast,
+    sharpen, threshold). PIL wrapper around preprocess_array_for_ocr.
+    """
+    return Image.fromarray(preprocess_array_for_ocr(np.array(image.convert('L')), threshold))
+
+def prepared_receipt(ctx: ImageContext) -> Image.Image:
+    """
+    The receipt crop of a scan, straightened for OCR. Computed once per
+    ImageContext and shared by every OCR pass over the same scan.
+    """
+    if 'receipt' not in ctx.cache:
+        # First, try to detect and crop to just the receipt area
+        # This removes background noise and improves OCR accuracy
+        receipt = detect_and_crop_receipt(ctx.image)
+        # Straighten the receipt (orientation + skew) so the first strategy reads it cleanly
+        if OCR_DESKEW:
+            receipt = deskew_image(receipt)
+        ctx.cache['receipt'] = receipt
+    return ctx.cache['receipt']
+
+# OCR strategies: name -> (image variant, Tesseract psm, minimum text length)
+OCR_STRATEGIES = {
+    'cropped_psm4': ('receipt', 4, 20),  # Single column on the receipt crop - BEST for receipts
+    'cropped_psm6': ('receipt', 6, 20),  # Uniform block of text on the crop
+    'original_psm6': ('original', 6, 10),  # Fallback if cropping didn't help
+    'original_psm4': ('original', 4, 10),
+    'cropped_light_preprocess_psm4': ('receipt_light', 4, 10),  # Grayscale + light contrast boost
+    'aggressive_preprocess': ('aggressive', 6, 10),  # Binarized; only if everything else failed
+}
+
+# Named quality/latency trade-offs, see docs/OCR_PROFILES.md
+OCR_PROFILES = {
+    # One LSTM-only pass over a downscaled receipt crop (interactive scans); psm 6
+    # because psm 4 drops the amounts column on wide receipts, see the docs
+    'fast': {'strategies': ['cropped_psm6'], 'oem': 1, 'max_side': 1600,
+             'early_exit': True, 'fallback': None, 'word_passes': 0},
+    # Cascade in order of usefulness, stopping at the first clean receipt read
+    'balanced': {'strategies': ['cropped_psm4', 'cropped_psm6', 'original_psm6', 'original_psm4',
+                                'cropped_light_preprocess_psm4'],
+                 'oem': 3, 'max_side': None, 'early_exit': True, 'fallback': 'aggressive_preprocess',
+                 'word_passes': 2},
+    # Every variant, best-scored result wins (offline dataset builds)
+    'thorough': {'strategies': ['cropped_psm4', 'cropped_psm6', 'original_psm6', 'original_psm4',
+                                'cropped_light_preprocess_psm4'],
+                 'oem': 3, 'max_side': None, 'early_exit': False, 'fallback': 'aggressive_preprocess',
+                 'word_passes': 2},
+}
+OCR_PROFILE = os.environ.get("OCR_PROFILE", "balanced")
+if OCR_PROFILE not in OCR_PROFILES:
+    # Checked once here, so a typo doesn't fail every OCR call
+    print(f"Unknown OCR_PROFILE '{OCR_PROFILE}' (choose from {', '.join(OCR_PROFILES)}), using 'balanced'")
+    OCR_PROFILE = "balanced"
+
+def get_ocr_profile(profile: Optional[str] = None) -> Dict:
+    """Resolve a profile name (default: OCR_PROFILE env var) to its settings."""
+    name = profile or OCR_PROFILE
+    if name not in OCR_PROFILES:
+        raise ValueError(f"Unknown OCR profile '{name}' (choose from {', '.join(OCR_PROFILES)})")
+    return dict(OCR_PROFILES[name], name=name)
+
+# Parallel OCR. Each tesseract process starts one OpenMP thread per core by
+# default, so N concurrent processes run N x cores threads and thrash. Worker
+# processes pin OMP_THREAD_LIMIT (inherited by the tesseract subprocesses
+# pytesseract spawns) so that workers x threads stays within the cores.
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "0"))  # 0 = automatic
+OCR_THREADS_PER_WORKER = int(os.environ.get("OCR_THREADS_PER_WORKER", "0"))  # 0 = automatic
+
+def available_cores() -> int:
+    """CPU cores this process may run on (respects taskset/cgroup affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def ocr_concurrency(workers: Optional[int] = None, threads: Optional[int] = None,
+                    cores: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Resolve (workers, threads per worker) for parallel OCR. Arguments override
+    the OCR_WORKERS / OCR_THREADS_PER_WORKER environment variables. Tesseract
+    gains little from extra threads per page, so by default every core runs
+    its own single-threaded worker; a fixed worker count splits the cores.
+    A negative thread count leaves Tesseract unpinned (one worker per core
+    unless workers is given).
+    """
+    cores = cores or available_cores()
+    workers = workers or OCR_WORKERS or None
+    threads = threads or OCR_THREADS_PER_WORKER or None
+    if workers is None:
+        workers = max(1, cores // threads) if threads and threads > 0 else cores
+    if threads is None:
+        threads = max(1, cores // workers)
+    return workers, threads
+
+def set_ocr_thread_limit(threads: int) -> None:
+    """Limit OpenMP threads of tesseract runs started from this process (<= 0: Tesseract default)."""
+    if threads > 0:
+        os.environ["OMP_THREAD_LIMIT"] = str(threads)
+    else:
+        os.environ.pop("OMP_THREAD_LIMIT", None)
+
+def ocr_worker_pool(workers: Optional[int] = None, threads: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Process pool for OCR over many scans, sized by ocr_concurrency() with each
+    worker's tesseract thread count pinned (threads < 0 leaves it unpinned).
+    Submit module-level functions (e.g. extract_text_tesseract) with paths,
+    not decoded images.
+    """
+    workers, threads = ocr_concurrency(workers, threads)
+    return ProcessPoolExecutor(max_workers=workers, initializer=set_ocr_thread_limit, initargs=(threads,))
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def shared_ocr_pool() -> ProcessPoolExecutor:
+    """
+    One ocr_worker_pool() per process, started on first use and reused by
+    request-time callers (tiled OCR, scanned PDF pages), so an upload doesn't
+    start worker processes of its own and concurrent requests share them.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ocr_worker_pool()
+        return _shared_pool
+
+def reset_shared_ocr_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop `pool` if it is still the shared pool (e.g. broken by a crashed worker); the next call starts a new one."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is pool:
+            _shared_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Tile-parallel OCR: a long receipt strip keeps one core busy for the whole
+# Tesseract run. Tall images are cut at whitespace gaps between text rows into
+# tiles that are OCR'd concurrently and merged back in reading order.
+OCR_TILE_PARALLEL = os.environ.get("OCR_TILE_PARALLEL", "false").lower() == "true"
+OCR_TILE_MIN_HEIGHT = 2400  # Only images at least this tall and 2x taller than wide are tiled
+OCR_TILE_HEIGHT = 1000      # Target tile height in pixels
+OCR_TILE_OVERLAP = 24       # Pixels each tile extends past its cut into the neighbouring gap
+
+def split_tiles(image: Image.Image, tile_height: int = OCR_TILE_HEIGHT) -> List[Tuple[int, int]]:
+    """
+    Cut an image into horizontal bands of roughly `tile_height` pixels, placing
+    every cut in the middle of a whitespace gap between text rows so no line
+    is split. Returns (top, bottom) pairs covering the whole height.
+    """
+    rows = find_text_rows(image)
+    gaps = [(upper[1] + lower[0]) // 2 for upper, lower in zip(rows, rows[1:])]
+    cuts = [0]
+    previous = None
+    for gap in gaps:
+        if gap - cuts[-1] > tile_height and previous is not None:
+            cuts.append(previous)
+        previous = gap if gap > cuts[-1] else None
+    # Don't leave a sliver tile at the bottom
+    if len(cuts) > 1 and image.height - cuts[-1] < tile_height // 3:
+        cuts.pop()
+    return list(zip(cuts, cuts[1:] + [image.height]))
+
+def _ocr_tile(crop: Image.Image, crop_top: int, top: int, bottom: int, config: str) -> Tuple[str, List[Dict]]:
+    """OCR one tile crop (in a pool worker); words centred in [top, bottom) in image coordinates."""
+    data = pytesseract.image_to_data(crop, lang='eng', config=config, output_type=pytesseract.Output.DICT)
+    # Keep only words centred in this tile's own band; the overlap belongs to the neighbour
+    keep = [i for i in range(len(data['text']))
+            if top <= crop_top + data['top'][i] + data['height'][i] / 2 < bottom]
+    data = {key: [values[i] for i in keep] for key, values in data.items()}
+    return words_from_ocr_data(data, y_offset=crop_top)
+
+def ocr_tiled(image: Image.Image, config: str) -> Optional[Tuple[str, List[Dict]]]:
+    """
+    OCR a tall receipt as parallel horizontal tiles in the shared OCR pool,
+    whose workers pin the tesseract thread count. Returns (text, word_data)
+    with word boxes in `image` coordinates, or None if the image is too short
+    to be worth tiling or the pool broke (callers then OCR it in one pass).
+    """
+    if image.height < OCR_TILE_MIN_HEIGHT or image.height < 2 * image.width:
+        return None
+    tiles = split_tiles(image)
+    if len(tiles) < 2:
+        return None
+    crops = [(max(0, top - OCR_TILE_OVERLAP), min(image.height, bottom + OCR_TILE_OVERLAP)) for top, bottom in tiles]
+    pool = shared_ocr_pool()
+    try:
+        results = list(pool.map(_ocr_tile, [image.crop((0, crop_top, image.width, crop_bottom)) for crop_top, crop_bottom in crops],
+                                [crop_top for crop_top, _ in crops], [top for top, _ in tiles],
+                                [bottom for _, bottom in tiles], [config] * len(tiles)))
+    except BrokenProcessPool as e:
+        print(f"Tiled OCR failed, OCR'ing in one pass: {e}")
+        reset_shared_ocr_pool(pool)
+        return None
+    text = '\n'.join(tile_text for tile_text, _ in results if tile_text)
+    return text, [word for _, tile_words in results for word in tile_words]
+
+def _strategy_image(ctx: ImageContext, variant: str, max_side: Optional[int] = None) -> Image.Image:
+    """Build the image a strategy OCRs from the shared context."""
+    if variant == 'receipt':
+        image = prepared_receipt(ctx)
+    elif variant == 'receipt_light':
+        gray = prepared_receipt(ctx).convert('L')
+        # Resize if too small (but don't make it too large either)
+        width, height = gray.size
+        if width < 1000 or height < 1000:
+            scale = max(1000 / width, 1000 / height)
+            gray = gray.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
+        image = ImageEnhance.Contrast(gray).enhance(1.3)  # Light contrast boost
+    elif variant == 'aggressive':
+        gray = ctx.image.convert('L')
+        if max_side and max(gray.size) > max_side:
+            gray.thumbnail((max_side, max_side), Image.LANCZOS)
+        # Binarized uint8 array goes to Tesseract as-is
+        return preprocess_array_for_ocr(np.array(gray))
+    else:
+        image = ctx.image
+    if max_side and max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
     return image
 
-def extract_text_tesseract(image_path: Path) -> str:
+def _accept_result(name: str, text: str, min_length: int) -> bool:
+    """Whether a strategy's output is usable text."""
+    if not text or len(text) <= min_length:
+        return False
+    if has_reasonable_text_quality(text):
+        return True
+    # Even if the quality check fails, a receipt crop read with totals/amounts is kept
+    return name == 'cropped_psm4' and (_TOTAL_LABEL_RE.search(text) is not None or _MONEY_RE.search(text) is not None)
+
+# Receipt-structure signals used by the OCR quality score
+_TOTAL_LABEL_RE = re.compile(r'\b(?:total|balance|amount\s+due|subtotal)\b', re.IGNORECASE)
+_TAX_LABEL_RE = re.compile(r'\b(?:tax|vat)\b', re.IGNORECASE)
+_MONEY_RE = re.compile(r'\d+[.,]\d{2}\b')
+_DATE_RE = re.compile(r'\b\d{1,4}[/.-]\d{1,2}[/.-]\d{2,4}\b')
+
+# Experimental: cascades stop at the first result scoring at least this much.
+# No threshold has been calibrated yet (scripts/bench_ocr_profiles.py
+# --calibrate on a labeled reference set), so it is off unless set; cascades
+# then stop at the first usable read with a total/balance/tax label and an
+# amount (psm 4 can drop the whole amounts column and keep the labels).
+OCR_EARLY_EXIT_SCORE = float(os.environ["OCR_EARLY_EXIT_SCORE"]) if os.environ.get("OCR_EARLY_EXIT_SCORE") else None
+_STRUCTURE_RE = re.compile(r'total|balance|tax', re.IGNORECASE)
+
+def _early_exit(result: Dict) -> bool:
+    """Whether a usable result ends the cascade (score threshold if set, else labels plus amounts)."""
+    if OCR_EARLY_EXIT_SCORE is None:
+        return _STRUCTURE_RE.search(result['text']) is not None and _MONEY_RE.search(result['text']) is not None
+    return result['score'] >= OCR_EARLY_EXIT_SCORE
+
+def score_ocr_result(text: str, word_data: List[Dict]) -> float:
+    """
+    OCR quality score in [0, 1]: 60% mean Tesseract word confidence, 40%
+    receipt structure (total label, money amounts, tax label, a date), scaled
+    down for results with fewer than 20 words.
+    """
+    if not text or not word_data:
+        return 0.0
+    mean_conf = sum(w['confidence'] for w in word_data) / len(word_data) / 100.0
+    structure = 0.0
+    if _TOTAL_LABEL_RE.search(text):
+        structure += 0.4
+    if _MONEY_RE.search(text):
+        structure += 0.3
+    if _TAX_LABEL_RE.search(text):
+        structure += 0.15
+    if _DATE_RE.search(text):
+        structure += 0.15
+    size = min(1.0, len(word_data) / 20.0)
+    return round((0.6 * min(mean_conf, 1.0) + 0.4 * structure) * size, 4)
+
+def get_ocr_quality(image_path: Union[Path, ImageContext]) -> Optional[Dict]:
+    """
+    Quality of the OCR result last computed for this ImageContext:
+    {'score', 'strategy', 'tesseract_runs'}, or None if OCR has not run.
+    """
+    if not isinstance(image_path, ImageContext) or 'ocr' not in image_path.cache:
+        return None
+    result = image_path.cache['ocr']
+    return {'score': result['score'], 'strategy': result['strategy'], 'tesseract_runs': result['runs']}
+
+def extract_text_tesseract(image_path: Union[Path, ImageContext], profile: Optional[str] = None) -> str:
+    """
+    Best-effort receipt OCR over several Tesseract strategies.
+    image_path may be an ImageContext so the scan is decoded only once; the
+    winning result (score, strategy, word boxes) is then kept in its cache.
+    profile selects the quality/latency trade-off ('fast', 'balanced',
+    'thorough'); defaults to the OCR_PROFILE environment variable.
+    """
     if not have_command("tesseract"):
         return ""
     
-    # Try multiple OCR strategies and pick the best result
+    settings = get_ocr_profile(profile)
+    # Try multiple OCR strategies and pick the best-scored result
     results = []
+    raw_results = []
+    ctx = as_image_context(image_path)
+    runs = 0
+    
+    def finish(best: Optional[Dict]) -> str:
+        if best is None:
+            return ""
+        ctx.cache['ocr'] = dict(best, runs=runs, candidates=results if not settings['early_exit'] else [])
+        return best['text']
     
     try:
-        image = Image.open(image_path)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # First, try to detect and crop to just the receipt area
-        # This removes background noise and improves OCR accuracy
-        cropped_image = detect_and_crop_receipt(image)
-        
-        # Strategy 1: Cropped image with PSM 4 (single column) - BEST for receipts
-        try:
-            text1b = pytesseract.image_to_string(cropped_image, lang='eng', config=r'--oem 3 --psm 4').strip()
-            if text1b and len(text1b) > 20:  # Need more text
-                if has_reasonable_text_quality(text1b):
-                    results.append(('cropped_psm4', text1b))
-                # Even if quality check fails, if it has numbers/keywords, use it
-                elif any(kw in text1b.lower() for kw in ['kroger', 'total', 'balance', 'tax']) or re.search(r'[\d,]+\.\d{2}', text1b):
-                    results.append(('cropped_psm4_fallback', text1b))
-        except:
-            pass
-        
-        # Strategy 1a: Cropped image with PSM 6 (uniform block of text)
-        try:
-            text1 = pytesseract.image_to_string(cropped_image, lang='eng', config=r'--oem 3 --psm 6').strip()
-            if text1 and len(text1) > 20:
-                if has_reasonable_text_quality(text1):
-                    results.append(('cropped_psm6', text1))
-        except:
-            pass
-        
-        # Strategy 2: Original image with PSM 6 (fallback if cropping didn't help)
-        try:
-            text2 = pytesseract.image_to_string(image, lang='eng', config=r'--oem 3 --psm 6').strip()
-            if text2 and len(text2) > 10 and has_reasonable_text_quality(text2):
-                results.append(('original_psm6', text2))
-        except:
-            pass
-        
-        # Strategy 3: Original image with PSM 4 (single column)
-        try:
-            text3 = pytesseract.image_to_string(image, lang='eng', config=r'--oem 3 --psm 4').strip()
-            if text3 and len(text3) > 10 and has_reasonable_text_quality(text3):
-                results.append(('original_psm4', text3))
-        except:
-            pass
-        
-        # Strategy 4: Light preprocessing on cropped image (just grayscale and contrast)
-        try:
-            gray = cropped_image.convert('L')
-            # Resize if too small (but don't make it too large either)
-            width, height = gray.size
-            if width < 1000 or height < 1000:
-                scale = max(1000 / width, 1000 / height)
-                new_width = int(width * scale)
-                new_height = int(height * scale)
-                gray = gray.resize((new_width, new_height), Image.LANCZOS)
-            enhancer = ImageEnhance.Contrast(gray)
-            enhanced = enhancer.enhance(1.3)  # Light contrast boost
-            text4 = pytesseract.image_to_string(enhanced, lang='eng', config=r'--oem 3 --psm 4').strip()
-            if text4 and len(text4) > 10 and has_reasonable_text_quality(text4):
-                results.append(('cropped_light_preprocess_psm4', text4))
-        except:
-            pass
-        
-        # Strategy 4: Aggressive preprocessing (only if others failed)
-        if not results:
+        strategies = list(settings['strategies'])
+        if settings['fallback']:
+            strategies.append(settings['fallback'])
+        for name in strategies:
+            if name == settings['fallback'] and results:
+                break  # Fallback only runs if every other strategy failed
+            variant, psm, min_length = OCR_STRATEGIES[name]
             try:
-                preprocessed = preprocess_image_for_ocr(image.convert('L'))
-                text4 = pytesseract.image_to_string(preprocessed, lang='eng', config=r'--oem 3 --psm 6').strip()
-                if text4 and len(text4) > 10 and has_reasonable_text_quality(text4):
-                    results.append(('aggressive_preprocess', text4))
-            except:
-                pass
+                image = _strategy_image(ctx, variant, settings['max_side'])
+                config = f"--oem {settings['oem']} --psm {psm}"
+                runs += 1
+                tiled = ocr_tiled(image, config) if OCR_TILE_PARALLEL and variant.startswith('receipt') else None
+                if tiled:
+                    text, words = tiled
+                else:
+                    data = pytesseract.image_to_data(image, lang='eng', config=config, output_type=pytesseract.Output.DICT)
+                    text, words = words_from_ocr_data(data)
+            except Exception:
+                continue
+            result = {'strategy': name, 'text': text, 'words': words, 'score': score_ocr_result(text, words), 'run': runs}
+            if len(text) > 10:
+                raw_results.append(result)
+            if _accept_result(name, text, min_length):
+                # Clean read with receipt structure: skip the remaining strategies
+                if settings['early_exit'] and _early_exit(result):
+                    return finish(result)
+                results.append(result)
         
-        # Pick the best result (prioritize quality over length)
+        # Pick the best-scored usable result, else the best raw text
         if results:
-            # Sort by quality (has receipt keywords) then length
-            def score_result(x):
-                text_lower = x[1].lower()
-                quality_score = 0
-                receipt_keywords = ['kroger', 'total', 'balance', 'tax', 'subtotal', 'amount', 'receipt', 'invoice']
-                if any(keyword in text_lower for keyword in receipt_keywords):
-                    quality_score = 1000  # Big boost for having receipt keywords
-                return (quality_score, len(x[1]), count_letters(x[1]))
-            
-            results.sort(key=score_result, reverse=True)
-            return results[0][1]
-        
-        # Fallback: return longest text even if quality is questionable
-        # But prefer text with receipt keywords or numbers
-        candidates = []
-        if text1 and len(text1) > 10:
-            candidates.append(text1)
-        if text2 and len(text2) > 10:
-            candidates.append(text2)
-        if 'text2b' in locals() and text2b and len(text2b) > 10:
-            candidates.append(text2b)
-        if 'text2c' in locals() and text2c and len(text2c) > 10:
-            candidates.append(text2c)
-        if 'text3b' in locals() and text3b and len(text3b) > 10:
-            candidates.append(text3b)
-        
-        if candidates:
-            # Prefer candidate with receipt keywords or numbers (dollar amounts)
-            import re
-            for candidate in candidates:
-                text_lower = candidate.lower()
-                # Check for receipt keywords
-                if any(kw in text_lower for kw in ['kroger', 'total', 'balance', 'tax', 'amount']):
-                    return candidate
-                # Check for dollar amounts (has numbers with .XX pattern)
-                if re.search(r'[\d,]+\.\d{2}', candidate):
-                    return candidate
-            # If no keywords/numbers, return longest
-            return max(candidates, key=len)
-        
-        return ""
+            return finish(max(results, key=lambda r: (r['score'], count_letters(r['text']))))
+        return finish(max(raw_results, key=lambda r: (r['score'], len(r['text']))) if raw_results else None)
     except Exception as e:
         # Final fallback
         try:
-            image = Image.open(image_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            return pytesseract.image_to_string(image, lang='eng', config=r'--oem 3 --psm 6').strip()
+            return pytesseract.image_to_string(ctx.image, lang='eng', config=r'--oem 3 --psm 6').strip()
         except:
             return ""
 
@@ -384,82 +885,55 @@ def has_reasonable_text_quality(text: str) -> bool:
     if len(words) < 2:  # Need at least a couple words (lowered threshold)
         return False
     
-    # Check for common receipt words (Kroger, total, balance, tax, etc.)
-    text_lower = text.lower()
-    receipt_keywords = ['kroger', 'total', 'balance', 'tax', 'subtotal', 'amount', 'receipt', 'invoice', 'date', 'cashier']
-    if any(keyword in text_lower for keyword in receipt_keywords):
-        return True  # If it has receipt keywords, it's probably real text
-    
     return True
 
 def count_letters(text: str) -> int:
     """Count alphabetic characters in text"""
     return sum(1 for c in text if c.isalpha())
 
-def extract_text_with_details(image_path: Path) -> Tuple[str, List[Dict]]:
+def extract_text_with_details(image_path: Union[Path, ImageContext], profile: Optional[str] = None) -> Tuple[str, List[Dict]]:
     """
     Extract text with detailed OCR data (bounding boxes, confidence scores).
+    image_path may be an ImageContext so the scan is decoded only once.
     Returns: (full_text, word_data_list)
     word_data_list contains: {'text': str, 'confidence': int, 'left': int, 'top': int, 'width': int, 'height': int}
     """
     if not have_command("tesseract"):
         return "", []
     
+    settings = get_ocr_profile(profile)
+    ctx = as_image_context(image_path)
     # First get the best text using the improved extraction
-    text = extract_text_tesseract(image_path)
+    text = extract_text_tesseract(ctx, profile)
+    
+    # The winning strategy already produced word boxes alongside the text
+    best = ctx.cache.get('ocr')
+    if best and len(best['words']) >= 10 or not settings['word_passes']:
+        return text, best['words'] if best else []
     
-    # Now get detailed data using the same strategy that worked
+    # Otherwise get detailed data from the original image (at most word_passes more runs)
     word_data = []
     try:
-        image = Image.open(image_path)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        image = ctx.image
         
         # Try original image first (usually best)
         try:
             data = pytesseract.image_to_data(image, lang='eng', config=r'--oem 3 --psm 6', output_type=pytesseract.Output.DICT)
-            extracted_text = pytesseract.image_to_string(image, lang='eng', config=r'--oem 3 --psm 6').strip()
-            
+            extracted_text, word_data = words_from_ocr_data(data)
             # Only use this if the text quality is reasonable
-            if has_reasonable_text_quality(extracted_text) or not text:
-                # Build word data list
-                n_boxes = len(data['text'])
-                for i in range(n_boxes):
-                    conf = int(data['conf'][i])
-                    word_text = data['text'][i].strip()
-                    if conf > 0 and word_text:  # Only include words with confidence > 0 and non-empty text
-                        word_data.append({
-                            'text': word_text,
-                            'confidence': conf,
-                            'left': data['left'][i],
-                            'top': data['top'][i],
-                            'width': data['width'][i],
-                            'height': data['height'][i]
-                        })
+            if not (has_reasonable_text_quality(extracted_text) or not text):
+                word_data = []
         except:
             pass
         
         # If we didn't get good word data, try with light preprocessing
-        if not word_data or len(word_data) < 10:
+        if settings['word_passes'] > 1 and (not word_data or len(word_data) < 10):
             try:
                 gray = image.convert('L')
                 enhancer = ImageEnhance.Contrast(gray)
                 enhanced = enhancer.enhance(1.3)
                 data = pytesseract.image_to_data(enhanced, lang='eng', config=r'--oem 3 --psm 6', output_type=pytesseract.Output.DICT)
-                
-                n_boxes = len(data['text'])
-                for i in range(n_boxes):
-                    conf = int(data['conf'][i])
-                    word_text = data['text'][i].strip()
-                    if conf > 0 and word_text:
-                        word_data.append({
-                            'text': word_text,
-                            'confidence': conf,
-                            'left': data['left'][i],
-                            'top': data['top'][i],
-                            'width': data['width'][i],
-                            'height': data['height'][i]
-                        })
+                word_data = word_data + words_from_ocr_data(data)[1]
             except:
                 pass
         
@@ -467,41 +941,179 @@ def extract_text_with_details(image_path: Path) -> Tuple[str, List[Dict]]:
     except:
         # Fallback
         try:
-            image = Image.open(image_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            text = pytesseract.image_to_string(image, lang='eng', config=r'--oem 3 --psm 6').strip()
+            text = pytesseract.image_to_string(ctx.image, lang='eng', config=r'--oem 3 --psm 6').strip()
             return text, []
         except:
             return "", []
 
+def words_from_ocr_data(data: Dict, scale: float = 1.0, x_offset: int = 0, y_offset: int = 0) -> Tuple[str, List[Dict]]:
+    """
+    Convert pytesseract image_to_data output into (text, word_data).
+    Word boxes are divided by `scale` and shifted by the offsets so they are in
+    the coordinates of the image the OCR'd region was cut from. Text lines are
+    rebuilt from Tesseract's block/paragraph/line numbering.
+    """
+    word_data = []
+    lines = []
+    current_line = None
+    for i in range(len(data['text'])):
+        word_text = data['text'][i].strip()
+        conf = int(float(data['conf'][i]))
+        if conf <= 0 or not word_text:
+            continue
+        line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        if line_key != current_line:
+            lines.append([])
+            current_line = line_key
+        lines[-1].append(word_text)
+        word_data.append({
+            'text': word_text,
+            'confidence': conf,
+            'left': int(data['left'][i] / scale) + x_offset,
+            'top': int(data['top'][i] / scale) + y_offset,
+            'width': int(data['width'][i] / scale),
+            'height': int(data['height'][i] / scale)
+        })
+    return '\n'.join(' '.join(line) for line in lines), word_data
+
+# Region-of-interest OCR: the vendor is in the first few text lines and the
+# totals/tax in the bottom part of a receipt
+ROI_HEADER_LINES = 6
+ROI_FOOTER_FRACTION = 0.45
+ROI_TARGET_LINE_HEIGHT = 48  # Header text is upscaled towards this height (max 2x)
+
+def find_text_rows(image: Image.Image, max_height: int = 1000) -> List[Tuple[int, int]]:
+    """
+    Cheap layout pass: find horizontal text rows as runs of ink in the row
+    profile of a downsampled, binarized copy. Returns (top, bottom) pairs in
+    the coordinates of `image`.
+    """
+    gray = image.convert('L')
+    scale = min(1.0, max_height / gray.height)
+    if scale < 1.0:
+        gray = gray.resize((max(1, int(gray.width * scale)), max_height), Image.BILINEAR)
+    arr = np.asarray(gray)
+    if CV2_AVAILABLE:
+        _, ink = cv2.threshold(arr, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    else:
+        ink = (arr < arr.mean() - arr.std()).astype(np.uint8)
+    # Ignore the outer columns: crop padding and paper edges would mark every row as ink
+    margin = ink.shape[1] // 20
+    has_ink = ink[:, margin:ink.shape[1] - margin].mean(axis=1) > 0.015
+    
+    # Run-length encode the ink rows
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], has_ink.astype(np.int8), [0]))))
+    rows = []
+    for top, bottom in zip(edges[::2], edges[1::2]):
+        if rows and top - rows[-1][1] <= 1:
+            rows[-1] = (rows[-1][0], bottom)  # Bridge 1px gaps inside a line
+        elif bottom - top >= 2:
+            rows.append((top, bottom))
+    return [(int(top / scale), min(image.height, int(np.ceil(bottom / scale)))) for top, bottom in rows]
+
+def _ocr_band(image: Image.Image, top: int, bottom: int, scale: float, psm: int) -> Tuple[str, List[Dict]]:
+    band = image.crop((0, top, image.width, bottom))
+    if scale > 1.0:
+        band = band.resize((int(band.width * scale), int(band.height * scale)), Image.LANCZOS)
+    data = pytesseract.image_to_data(band, lang='eng', config=f'--oem 3 --psm {psm}',
+                                     output_type=pytesseract.Output.DICT)
+    return words_from_ocr_data(data, scale=scale, y_offset=top)
+
+def extract_receipt_fields_ocr(image_path: Union[Path, ImageContext]) -> Tuple[str, List[Dict]]:
+    """
+    Targeted OCR for receipt fields only (vendor, totals, tax) when the body
+    text is not needed. After a cheap layout pass, only the header band is
+    OCR'd (upscaled for small fonts) for the vendor and the bottom band for the
+    amounts. Returns (text, word_data) like extract_text_with_details, with
+    the header lines first; short receipts are OCR'd in one pass.
+    """
+    if not have_command("tesseract"):
+        return "", []
+    ctx = as_image_context(image_path)
+    
+    def finish(strategy: str, runs: int, text: str, words: List[Dict]) -> Tuple[str, List[Dict]]:
+        ctx.cache['ocr'] = {'strategy': strategy, 'text': text, 'words': words,
+                            'score': score_ocr_result(text, words), 'runs': runs, 'candidates': []}
+        return text, words
+    
+    try:
+        receipt = prepared_receipt(ctx)
+        
+        rows = find_text_rows(receipt)
+        if len(rows) < ROI_HEADER_LINES * 2:
+            # Too few lines for the bands to save anything
+            return finish('fields_full', 1, *_ocr_band(receipt, 0, receipt.height, 1.0, 4))
+        
+        # Header band: the first text lines, upscaled so small fonts get enough pixels
+        header = rows[:ROI_HEADER_LINES]
+        header_top = max(0, header[0][0] - 10)
+        header_bottom = min(receipt.height, header[-1][1] + 10)
+        line_height = float(np.median([bottom - top for top, bottom in header]))
+        header_scale = min(2.0, max(1.0, ROI_TARGET_LINE_HEIGHT / max(line_height, 1.0)))
+        
+        # Footer band: the bottom part of the text area, starting at a row boundary
+        text_top, text_bottom = rows[0][0], rows[-1][1]
+        footer_start = text_bottom - (text_bottom - text_top) * ROI_FOOTER_FRACTION
+        footer_top = next(top for top, _ in rows if top >= footer_start)
+        footer_top = max(header_bottom, footer_top - 10)
+        footer_bottom = min(receipt.height, text_bottom + 10)
+        
+        header_text, header_words = _ocr_band(receipt, header_top, header_bottom, header_scale, 6)
+        footer_text, footer_words = _ocr_band(receipt, footer_top, footer_bottom, 1.0, 4)
+        return finish('fields_roi', 2, '\n'.join(t for t in (header_text, footer_text) if t), header_words + footer_words)
+    except Exception:
+        return "", []
+
 def extract_text_ocrmypdf(pdf_path: Path) -> Optional[str]:
-    if not have_command("pdftotext"):
-        return None
+    """Text layer of a PDF (pdftotext, or pdfminer/pypdf without poppler), None if it has none."""
+    from .pdf_extract import pdf_text_and_words
     try:
-        result = subprocess.run(["pdftotext", str(pdf_path), "-"], capture_output=True, text=True, check=True, timeout=30)
-        return result.stdout.strip() or None
-    except:
+        return pdf_text_and_words(pdf_path, ocr_missing=False)[0].strip() or None
+    except Exception:
         return None
 
-def extract_text_from_invoice(image_path: Path, pdf_path: Optional[Path] = None) -> str:
-    text = ""
+def extract_text_from_invoice(image_path: Union[Path, ImageContext], pdf_path: Optional[Path] = None,
+                              profile: Optional[str] = None) -> str:
+    return extract_text_with_details_from_invoice(image_path, pdf_path, profile)[0]
+
+def extract_fields_from_invoice(image_path: Union[Path, ImageContext], pdf_path: Optional[Path] = None) -> Tuple[str, List[Dict]]:
+    """
+    Extract just enough text for receipt field parsing (vendor, date, totals).
+    PDFs with a text layer are cheap to read in full; images use region-of-interest OCR.
+    Returns: (text, word_data_list)
+    """
     if pdf_path and pdf_path.exists():
-        text = extract_text_ocrmypdf(pdf_path) or ""
-    if not text and image_path.exists():
-        text = extract_text_tesseract(image_path)
-    return text if text else ""
+        text, word_data = _pdf_text_and_words(pdf_path, image_path, None)
+        if text:
+            return text, word_data
+    if image_path.exists():
+        return extract_receipt_fields_ocr(image_path)
+    return "", []
+
+def _pdf_text_and_words(pdf_path: Path, image_path: Union[Path, ImageContext],
+                        profile: Optional[str]) -> Tuple[str, List[Dict]]:
+    """
+    PDF text and word boxes. Scanned pages are only OCR'd from the PDF when
+    there is no JPG of the scan to OCR instead.
+    """
+    from .pdf_extract import pdf_text_and_words
+    try:
+        return pdf_text_and_words(pdf_path, ocr_missing=not image_path.exists(), profile=profile)
+    except Exception:
+        return "", []
 
-def extract_text_with_details_from_invoice(image_path: Path, pdf_path: Optional[Path] = None) -> Tuple[str, List[Dict]]:
+def extract_text_with_details_from_invoice(image_path: Union[Path, ImageContext], pdf_path: Optional[Path] = None,
+                                           profile: Optional[str] = None) -> Tuple[str, List[Dict]]:
     """
     Extract text with detailed OCR data for better vendor extraction.
+    Multi-page PDFs are read page by page (see pdf_extract); their word boxes
+    are stacked vertically in page order.
     Returns: (full_text, word_data_list)
     """
     text = ""
     word_data = []
     if pdf_path and pdf_path.exists():
-        text = extract_text_ocrmypdf(pdf_path) or ""
-        # PDF text doesn't have bounding boxes, so word_data will be empty
+        text, word_data = _pdf_text_and_words(pdf_path, image_path, profile)
     if not text and image_path.exists():
-        text, word_data = extract_text_with_details(image_path)
+        text, word_data = extract_text_with_details(image_path, profile)
     return text if text else "", word_data
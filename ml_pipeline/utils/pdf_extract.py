@@ -0,0 +1,300 @@
+"""
+Page-by-page PDF text extraction with word boxes.
+
+Text layers are read with poppler's pdftotext in batches of pages
+(-bbox-layout gives word boxes), or in-process with pdfminer.six / pypdf when
+poppler is not installed (or for the rest of a document pdftotext times
+out on). Pages without a text layer (scanned statements,
+img2pdf output) are rasterized and OCR'd in parallel while later pages are
+still being read. Pages are yielded in order as dicts:
+
+    {'page': 1, 'text': str, 'words': [word_data], 'width': px, 'height': px, 'source': 'pdftotext'}
+
+Word boxes use the same keys as OCR word_data, in pixels at PDF_RASTER_DPI,
+so text-layer and OCR'd pages share one coordinate system.
+"""
+import html
+import re
+import subprocess
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from .ocr_extract import (extract_text_with_details, ocr_concurrency, ocr_worker_pool, available_cores,
+                          shared_ocr_pool, reset_shared_ocr_pool)
+from .tools import have_command
+
+try:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTChar, LTTextContainer, LTTextLine
+    PDFMINER_AVAILABLE = True
+except ImportError:
+    PDFMINER_AVAILABLE = False
+
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+PDF_PAGE_BATCH = 8        # Pages per pdftotext run
+PDF_BATCH_TIMEOUT = 30    # Seconds per pdftotext batch
+PDF_RASTER_DPI = 300      # Rasterization DPI for OCR; text-layer boxes are scaled to match
+PDF_MIN_PAGE_TEXT = 20    # Pages with less text than this are treated as scans and OCR'd
+
+_PAGE_RE = re.compile(r'<page width="([\d.]+)" height="([\d.]+)">')
+_WORD_RE = re.compile(r'<word xMin="([\d.]+)" yMin="([\d.]+)" xMax="([\d.]+)" yMax="([\d.]+)">(.*?)</word>')
+
+
+def _word(text: str, x0: float, y0: float, x1: float, y1: float, scale: float, confidence: int = 100) -> Dict:
+    return {
+        'text': text,
+        'confidence': confidence,
+        'left': int(x0 * scale),
+        'top': int(y0 * scale),
+        'width': int((x1 - x0) * scale),
+        'height': int((y1 - y0) * scale)
+    }
+
+
+def parse_bbox_layout(output: str, first_page: int, dpi: int = PDF_RASTER_DPI) -> List[Dict]:
+    """Parse `pdftotext -bbox-layout` XHTML into page dicts (lines from <line> elements)."""
+    scale = dpi / 72.0
+    pages = []
+    for line in output.splitlines():
+        line = line.strip()
+        page = _PAGE_RE.match(line)
+        if page:
+            pages.append({'page': first_page + len(pages), 'lines': [], 'words': [],
+                          'width': int(float(page.group(1)) * scale), 'height': int(float(page.group(2)) * scale),
+                          'source': 'pdftotext'})
+        elif not pages:
+            continue
+        elif line.startswith('<line'):
+            pages[-1]['lines'].append([])
+        else:
+            word = _WORD_RE.match(line)
+            if word:
+                text = html.unescape(word.group(5))
+                x0, y0, x1, y1 = (float(v) for v in word.groups()[:4])
+                pages[-1]['words'].append(_word(text, x0, y0, x1, y1, scale))
+                if not pages[-1]['lines']:
+                    pages[-1]['lines'].append([])
+                pages[-1]['lines'][-1].append(text)
+    for page in pages:
+        page['text'] = '\n'.join(' '.join(words) for words in page.pop('lines') if words)
+    return pages
+
+
+def _pdftotext_pages(pdf_path: Path, dpi: int) -> Iterator[Dict]:
+    """Text layer via pdftotext, PDF_PAGE_BATCH pages per run."""
+    first = 1
+    while True:
+        last = first + PDF_PAGE_BATCH - 1
+        try:
+            result = subprocess.run(["pdftotext", "-bbox-layout", "-f", str(first), "-l", str(last), str(pdf_path), "-"],
+                                    capture_output=True, text=True, timeout=PDF_BATCH_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            print(f"pdftotext timed out on pages {first}-{last} of {pdf_path}; reading the rest without it")
+            yield from _fallback_pages(pdf_path, dpi, first)
+            return
+        # pdftotext exits non-zero once the range starts past the last page
+        pages = parse_bbox_layout(result.stdout, first, dpi) if result.returncode == 0 else []
+        yield from pages
+        if len(pages) < PDF_PAGE_BATCH:
+            return
+        first = last + 1
+
+
+def _pdfminer_pages(pdf_path: Path, dpi: int, first: int = 1) -> Iterator[Dict]:
+    """Text layer via pdfminer.six from page `first` on; words are built from character boxes."""
+    scale = dpi / 72.0
+    page_numbers = range(first - 1, sys.maxsize) if first > 1 else None  # 0-based; other pages aren't laid out
+    for number, layout in enumerate(extract_pages(str(pdf_path), page_numbers=page_numbers), start=first):
+        lines, words = [], []
+        for element in layout:
+            if not isinstance(element, LTTextContainer):
+                continue
+            for text_line in element:
+                if not isinstance(text_line, LTTextLine):
+                    continue
+                line_words, chars = [], []
+                # Split the line into words at non-character (space) elements
+                for item in list(text_line) + [None]:
+                    if isinstance(item, LTChar) and item.get_text().strip():
+                        chars.append(item)
+                        continue
+                    if chars:
+                        text = ''.join(c.get_text() for c in chars)
+                        x0, x1 = min(c.x0 for c in chars), max(c.x1 for c in chars)
+                        # PDF y axis points up; word boxes use top-left origin
+                        top, bottom = layout.height - max(c.y1 for c in chars), layout.height - min(c.y0 for c in chars)
+                        words.append(_word(text, x0, top, x1, bottom, scale))
+                        line_words.append(text)
+                        chars = []
+                if line_words:
+                    lines.append(' '.join(line_words))
+        yield {'page': number, 'text': '\n'.join(lines), 'words': words,
+               'width': int(layout.width * scale), 'height': int(layout.height * scale), 'source': 'pdfminer'}
+
+
+def _pypdf_pages(pdf_path: Path, dpi: int, first: int = 1) -> Iterator[Dict]:
+    """Text layer via pypdf from page `first` on (text only, no word boxes)."""
+    scale = dpi / 72.0
+    for number, page in enumerate(PdfReader(str(pdf_path)).pages[first - 1:], start=first):
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        yield {'page': number, 'text': text.strip(), 'words': [],
+               'width': int(float(page.mediabox.width) * scale), 'height': int(float(page.mediabox.height) * scale),
+               'source': 'pypdf'}
+
+
+def pdf_page_count(pdf_path: Path) -> int:
+    """Number of pages according to poppler's pdfinfo (0 if it can't tell)."""
+    try:
+        result = subprocess.run(["pdfinfo", str(pdf_path)], capture_output=True, text=True, timeout=PDF_BATCH_TIMEOUT)
+        match = re.search(r'^Pages:\s*(\d+)', result.stdout, re.MULTILINE)
+        return int(match.group(1)) if match else 0
+    except Exception:
+        return 0
+
+
+def _fallback_pages(pdf_path: Path, dpi: int, first: int) -> Iterator[Dict]:
+    """
+    Pages `first`.. when pdftotext gave up on them: read in-process if
+    pdfminer / pypdf is installed, else yielded without text so that
+    iter_pdf_pages OCRs them.
+    """
+    if PDFMINER_AVAILABLE:
+        yield from _pdfminer_pages(pdf_path, dpi, first)
+    elif PYPDF_AVAILABLE:
+        yield from _pypdf_pages(pdf_path, dpi, first)
+    else:
+        for number in range(first, pdf_page_count(pdf_path) + 1):
+            yield {'page': number, 'text': '', 'words': [], 'width': 0, 'height': 0, 'source': 'pdftotext'}
+
+
+def text_layer_pages(pdf_path: Path, dpi: int = PDF_RASTER_DPI) -> Iterator[Dict]:
+    """Text layer of each page, from the first available backend (pdftotext, pdfminer, pypdf)."""
+    if have_command("pdftotext"):
+        return _pdftotext_pages(pdf_path, dpi)
+    if PDFMINER_AVAILABLE:
+        return _pdfminer_pages(pdf_path, dpi)
+    if PYPDF_AVAILABLE:
+        return _pypdf_pages(pdf_path, dpi)
+    return iter(())
+
+
+def rasterize_page(pdf_path: Path, page: int, dpi: int = PDF_RASTER_DPI) -> Optional[Image.Image]:
+    """
+    Render one page for OCR with pdftoppm. Without poppler, the page's
+    embedded scan image is extracted with pypdf (img2pdf-style PDFs).
+    """
+    if have_command("pdftoppm"):
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = Path(tmp) / "page"
+            try:
+                subprocess.run(["pdftoppm", "-r", str(dpi), "-f", str(page), "-l", str(page), "-singlefile",
+                                "-png", str(pdf_path), str(prefix)], check=True, capture_output=True, timeout=60)
+                image = Image.open(prefix.with_suffix(".png"))
+                image.load()
+                return image.convert('RGB')
+            except Exception:
+                return None
+    if PYPDF_AVAILABLE:
+        try:
+            images = PdfReader(str(pdf_path)).pages[page - 1].images
+            return max((i.image for i in images), key=lambda im: im.width * im.height).convert('RGB') if images else None
+        except Exception:
+            return None
+    return None
+
+
+def ocr_page(pdf_path: Path, page: Dict, dpi: int = PDF_RASTER_DPI, profile: Optional[str] = None) -> Dict:
+    """OCR a page without a text layer; keeps the text-layer result if rasterizing fails."""
+    image = rasterize_page(pdf_path, page['page'], dpi)
+    if image is None:
+        return page
+    text, words = extract_text_with_details(image, profile)
+    return dict(page, text=text, words=words, width=image.width, height=image.height, source='ocr')
+
+
+def iter_pdf_pages(pdf_path: Path, ocr_missing: bool = True, profile: Optional[str] = None,
+                   workers: Optional[int] = None, dpi: int = PDF_RASTER_DPI) -> Iterator[Dict]:
+    """
+    Stream a PDF page by page (see module docstring for the page dict).
+    With ocr_missing, pages with less than PDF_MIN_PAGE_TEXT characters of
+    text are OCR'd in worker processes while later pages are read; pages are
+    still yielded in order. The workers are the process's shared OCR pool
+    (shared_ocr_pool), or a pool of its own when `workers` is given.
+    """
+    pdf_path = Path(pdf_path)
+    pages = text_layer_pages(pdf_path, dpi)
+    if not ocr_missing:
+        yield from pages
+        return
+    own_pool = workers is not None
+    workers = workers or ocr_concurrency()[0]
+    pending = deque()  # (page, OCR future or None), in page order
+    # Worker processes pin their own OMP_THREAD_LIMIT; the pool is fetched on the first scanned page
+    pool = None
+
+    def finished(page: Dict, future) -> Dict:
+        if future is None:
+            return page
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            print(f"OCR of page {page['page']} of {pdf_path} failed: {e}")
+            if not own_pool:
+                reset_shared_ocr_pool(pool)
+            return page
+
+    try:
+        for page in pages:
+            future = None
+            if len(page['text']) < PDF_MIN_PAGE_TEXT:
+                if pool is None:
+                    pool = ocr_worker_pool(workers, max(1, available_cores() // workers)) if own_pool else shared_ocr_pool()
+                future = pool.submit(ocr_page, pdf_path, page, dpi, profile)
+            pending.append((page, future))
+            # Yield finished pages in order; bound the OCR backlog to keep memory flat
+            while pending and (pending[0][1] is None or pending[0][1].done() or len(pending) > 2 * workers):
+                yield finished(*pending.popleft())
+        while pending:
+            yield finished(*pending.popleft())
+    finally:
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+        if own_pool and pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_pdf_pages(pdf_path: Path, ocr_missing: bool = True, profile: Optional[str] = None,
+                      workers: Optional[int] = None) -> List[Dict]:
+    """All pages of a PDF (see iter_pdf_pages)."""
+    return list(iter_pdf_pages(pdf_path, ocr_missing, profile, workers))
+
+
+def pdf_text_and_words(pdf_path: Path, ocr_missing: bool = True, profile: Optional[str] = None) -> Tuple[str, List[Dict]]:
+    """
+    Whole-document (text, word_data) in the OCR contract. Pages are stacked
+    vertically: word tops are offset by the height of the preceding pages, and
+    each word carries its 'page' number.
+    """
+    texts, words = [], []
+    y_offset = 0
+    for page in iter_pdf_pages(pdf_path, ocr_missing, profile):
+        if page['text']:
+            texts.append(page['text'])
+        words.extend(dict(word, top=word['top'] + y_offset, page=page['page']) for word in page['words'])
+        y_offset += page['height']
+    return '\n\n'.join(texts), words
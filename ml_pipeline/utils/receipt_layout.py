@@ -0,0 +1,248 @@
+"""
+Array-backed layout of OCR words for geometry-aware receipt parsing.
+
+A WordLayout is built once from Tesseract word_data. It stores the box
+columns (left/top/width/height/confidence) as NumPy arrays, clusters the
+words into visual lines, and answers the queries the parsers need: the
+text lines in reading order, the top band of the receipt (vendor) and the
+amount printed to the right of a label (TOTAL, TAX, ...).
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# A printed money amount as one OCR token: $12.50, 1,234.00, -3.00 / 3.00- (credits)
+MONEY_TOKEN_RE = re.compile(r'^[\$]?(-?)(\d{1,3}(?:,\d{3})+|\d+)\.(\d{2})(-?)$')
+
+# Receipt labels per amount field, most specific first. Subtotal is matched
+# before total so "SUB TOTAL" lines are never read as the total.
+AMOUNT_LABELS = {
+    'subtotal': [('subtotal',), ('sub', 'total')],
+    'total': [('grand', 'total'), ('balance', 'due'), ('amount', 'due'), ('total',), ('balance',)],
+    'tax': [('sales', 'tax'), ('tax',), ('vat',)],
+    'discount': [('discount',), ('coupon',), ('savings',)],
+}
+# Tokens allowed between a label and its amount ("TOTAL : $ 12.50", "TOTAL USD 12.50")
+_FILLER_RE = re.compile(r'^(?:[:=\-\$#*.]+|usd|eur|gbp)$')
+
+# Line items: quantity tokens ("2", "2x", "x2", "2@") and words that mark
+# summary/payment lines rather than items
+_QUANTITY_RE = re.compile(r'^(?:x)?(\d{1,3})(?:x|@|pc|pcs|ea)?$')
+_QUANTITY_MARKERS = {'@', 'x', '*'}
+_NON_ITEM_TOKENS = {'total', 'subtotal', 'sub', 'tax', 'vat', 'balance', 'due', 'change', 'cash', 'credit', 'debit',
+                    'visa', 'mastercard', 'amex', 'discover', 'tender', 'savings', 'saved', 'discount', 'coupon',
+                    'cpn', 'payment', 'amount'}
+ITEMS_SUM_TOLERANCE = 0.02  # Dollars the items may differ from the subtotal by
+
+
+def cluster_1d(values: np.ndarray, gap: float) -> np.ndarray:
+    """Cluster ids for 1-D values: sorted, a new cluster starts wherever consecutive values are more than `gap` apart."""
+    if not len(values):
+        return np.zeros(0, dtype=np.int32)
+    order = np.argsort(values, kind='stable')
+    ids = np.empty(len(values), dtype=np.int32)
+    ids[order] = np.concatenate(([0], np.cumsum(np.diff(values[order]) > gap)))
+    return ids
+
+
+def parse_money(token: str) -> Optional[float]:
+    """Value of a money token (negative for credits, "-3.00" or "3.00-"), or None if the token is not an amount."""
+    match = MONEY_TOKEN_RE.match(token)
+    if not match:
+        return None
+    value = float(match.group(2).replace(',', '') + '.' + match.group(3))
+    return -value if match.group(1) or match.group(4) else value
+
+
+class WordLayout:
+    """OCR words as NumPy columns, clustered into lines."""
+
+    def __init__(self, word_data: Sequence[Dict], min_confidence: int = 10):
+        words = [w for w in word_data if w['text'].strip() and w['confidence'] >= min_confidence]
+        self.texts: List[str] = [w['text'].strip() for w in words]
+        self.tokens: List[str] = [t.lower().strip(':') or t for t in self.texts]
+        columns = np.array([[w['left'], w['top'], w['width'], w['height'], w['confidence']] for w in words],
+                           dtype=np.int32).reshape(-1, 5)
+        self.left, self.top, self.width, self.height, self.confidence = columns.T
+        self.right = self.left + self.width
+        self.bottom = self.top + self.height
+        self.money = np.array([parse_money(t) if any(c.isdigit() for c in t) else None for t in self.texts],
+                              dtype=float)  # NaN where the word is not an amount
+        self.lines: List[np.ndarray] = self._cluster_lines()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _cluster_lines(self) -> List[np.ndarray]:
+        """
+        Group words into lines: sorted by vertical centre, a new line starts
+        where the gap to the previous word exceeds half the median word height.
+        Returns word indices per line, lines top to bottom, words left to right.
+        """
+        if not len(self):
+            return []
+        center = self.top + self.height / 2.0
+        line_ids = cluster_1d(center, max(2.0, float(np.median(self.height)) * 0.5))
+        # Words of each line, left to right
+        order = np.lexsort((self.left, line_ids))
+        bounds = np.flatnonzero(np.diff(line_ids[order])) + 1
+        return np.split(order, bounds)
+
+    @property
+    def page_height(self) -> int:
+        return int(self.bottom.max()) if len(self) else 0
+
+    def line_text(self, line: int) -> str:
+        return ' '.join(self.texts[i] for i in self.lines[line])
+
+    def line_top(self, line: int) -> int:
+        return int(self.top[self.lines[line]].min())
+
+    def line_height(self, line: int) -> float:
+        """Mean word height of a line (a proxy for font size)."""
+        return float(self.height[self.lines[line]].mean())
+
+    def text_lines(self) -> List[str]:
+        return [self.line_text(i) for i in range(len(self.lines))]
+
+    def top_lines(self, fraction: float = 0.4, minimum: int = 15) -> List[int]:
+        """The first lines of the receipt: max(`minimum`, `fraction` of all lines)."""
+        return list(range(min(len(self.lines), max(minimum, int(len(self.lines) * fraction)))))
+
+    def value_right_of(self, label: Tuple[str, ...]) -> List[Tuple[int, float]]:
+        """
+        Amounts printed to the right of `label` (a token sequence such as
+        ('balance', 'due')) on the same line. Only filler tokens (':', '$',
+        currency codes) may sit between label and amount, so "TOTAL SAVINGS
+        3.00" is not read as a total. Returns (line, value) pairs, top to bottom.
+        """
+        found = []
+        size = len(label)
+        for line_no, line in enumerate(self.lines):
+            tokens = [self.tokens[i] for i in line]
+            for start in range(len(tokens) - size + 1):
+                if tuple(tokens[start:start + size]) != label:
+                    continue
+                for i in line[start + size:]:
+                    value = parse_money(self.texts[i])
+                    if value is not None:
+                        found.append((line_no, value))
+                        break
+                    if not _FILLER_RE.match(self.tokens[i]):
+                        break
+                break
+        return found
+
+    def labeled_amounts(self) -> Dict[str, Optional[float]]:
+        """
+        Subtotal, total, tax and discount read from label/amount pairs on the
+        same line. Labels are tried most specific first, and the first line
+        carrying a label wins; lines used for the subtotal are not reused.
+        Values are magnitudes: a discount printed as "1.00-" is 1.00.
+        """
+        amounts = {'total': None, 'subtotal': None, 'tax': None, 'discount': None}
+        used_lines = set()
+        for key, labels in AMOUNT_LABELS.items():
+            for label in labels:
+                matches = [(line, value) for line, value in self.value_right_of(label) if line not in used_lines]
+                if matches:
+                    line, value = matches[0]
+                    amounts[key] = abs(value)
+                    used_lines.add(line)
+                    break
+        return amounts
+
+    def line_items(self, max_items: int = 50) -> List[Dict]:
+        """
+        Line items from a table-column model of the receipt. Right edges of
+        the amounts on item lines are clustered into columns: the rightmost
+        column holds line amounts, the next one (if any) unit prices. A
+        quantity is an integer token at the start of the line or before the
+        unit price / '@'. Quantity-only lines ("2 @ 1.99") belong to the item
+        above them. Returns dicts with description, quantity, unit_price and
+        amount (prices as strings, as extract_items).
+        """
+        rows = []
+        for line in self.lines:
+            tokens = [self.tokens[i] for i in line]
+            if any(t in _NON_ITEM_TOKENS for t in tokens):
+                continue
+            money = [i for i in line if not np.isnan(self.money[i])]
+            if money and money[-1] == line[-1]:
+                rows.append((line, money))
+        if not rows:
+            return []
+        
+        # Columns from the right edges of every amount on an item line
+        edges = np.array([self.right[i] for _, money in rows for i in money], dtype=float)
+        column = cluster_1d(edges, max(8.0, 1.5 * float(np.median(self.height))))
+        centers = np.array([edges[column == c].mean() for c in range(column.max() + 1)])
+        by_position = np.argsort(-centers)  # Columns right to left
+        amount_column = by_position[0]
+        price_column = by_position[1] if len(by_position) > 1 else None
+        
+        items = []
+        position = 0
+        for line, money in rows:
+            columns = column[position:position + len(money)]
+            position += len(money)
+            if columns[-1] != amount_column:
+                continue  # Stray number that doesn't line up with the amounts
+            amount = self.money[money[-1]]
+            unit_price = next((self.money[i] for i, c in zip(money[:-1], columns[:-1]) if c == price_column), None)
+            first_number = money[0] if unit_price is not None else money[-1]
+            
+            quantity = None
+            description = []
+            for k, i in enumerate(line):
+                if i == first_number:
+                    break
+                token = self.tokens[i]
+                qty = _QUANTITY_RE.match(token)
+                if qty and (k == 0 or k + 1 < len(line) and (line[k + 1] == first_number or self.tokens[line[k + 1]] in _QUANTITY_MARKERS)):
+                    quantity = int(qty.group(1))
+                elif token not in _QUANTITY_MARKERS or description:
+                    description.append(self.texts[i])
+            description = ' '.join(description).strip()
+            
+            if len(description) < 3 or not any(c.isalpha() for c in description):
+                # "2 @ 1.99  3.98" detail line: quantity and price of the item above
+                if items and quantity and items[-1]['quantity'] is None:
+                    items[-1].update(quantity=quantity, unit_price=f"{unit_price or amount / quantity:.2f}",
+                                     amount=f"{amount:.2f}")
+                continue
+            if quantity is None and unit_price:
+                ratio = amount / unit_price
+                quantity = int(round(ratio)) if abs(ratio - round(ratio)) < 0.01 and round(ratio) >= 1 else None
+            if unit_price is None and quantity:
+                unit_price = amount / quantity
+            items.append({
+                'description': description,
+                'quantity': quantity,
+                'unit_price': f"{unit_price:.2f}" if unit_price is not None else None,
+                'amount': f"{amount:.2f}"
+            })
+            if len(items) == max_items:
+                break
+        return items
+
+
+def check_items_total(items: List[Dict], amounts: Dict[str, Optional[float]]) -> Optional[Dict]:
+    """
+    Compare the sum of item amounts with the subtotal (or total minus tax).
+    Credit lines count negative. When only the sum less the receipt's
+    discount (coupon, savings) matches, that net sum is reported instead.
+    Returns {'items_sum', 'expected', 'matches'}, or None without a reference.
+    """
+    expected = amounts.get('subtotal')
+    if expected is None and amounts.get('total') is not None:
+        expected = amounts['total'] - (amounts.get('tax') or 0)
+    if expected is None or not items:
+        return None
+    items_sum = round(sum(float(item['amount']) for item in items), 2)
+    discount = amounts.get('discount')
+    if discount and abs(items_sum - expected) > ITEMS_SUM_TOLERANCE >= abs(items_sum - discount - expected):
+        items_sum = round(items_sum - discount, 2)
+    return {'items_sum': items_sum, 'expected': round(expected, 2),
+            'matches': abs(items_sum - expected) <= ITEMS_SUM_TOLERANCE}
@@ -1,28 +1,58 @@
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-def extract_amounts(text: str) -> Dict[str, Optional[float]]:
+from .locale_norm import DEFAULT_LOCALE, LOCALES, detect_locale, normalize_text, parse_date
+from .receipt_layout import WordLayout, check_items_total
+from .receipt_totals import select_amounts
+
+# Amount labels per field, in priority order: the first pattern that matches
+# anywhere wins, at its leftmost match. Patterns are compiled once, and each
+# starts with a literal anchor ("total", "$", ...) so a plain substring check
+# skips the ones that cannot match before the regex engine runs.
+AMOUNT_PATTERNS = {
+    'total': [
+        r'total[:\s]+[\$]?([\d,]+\.?\d*)',
+        r'amount[:\s]+[\$]?([\d,]+\.?\d*)',
+        r'[\$]([\d,]+\.?\d*)\s*(?:total|due|amount)',
+        r'grand\s+total[:\s]+[\$]?([\d,]+\.?\d*)',
+        r'balance[:\s]+due[:\s]+[\$]?([\d,]+\.?\d*)',
+        r'balance[:\s]+[\$]?([\d,]+\.?\d*)',  # BALANCE: 10.53 (without "due")
+        r'amount\s+due[:\s]+[\$]?([\d,]+\.?\d*)',
+        r'[\$]([\d,]+\.\d{2})\s*(?:\n|$|total)',
+    ],
+    'subtotal': [r'subtotal[:\s]+[\$]?([\d,]+\.?\d*)', r'sub\s+total[:\s]+[\$]?([\d,]+\.?\d*)'],
+    'tax': [r'tax[:\s]+[\$]?([\d,]+\.?\d*)', r'vat[:\s]+[\$]?([\d,]+\.?\d*)', r'sales\s+tax[:\s]+[\$]?([\d,]+\.?\d*)'],
+    'discount': [r'discount[:\s]+[\$]?([\d,]+\.?\d*)', r'discount\s+amount[:\s]+[\$]?([\d,]+\.?\d*)']
+}
+INVOICE_NUMBER_PATTERNS = [r'invoice[#:\s]+([A-Z0-9\-]+)', r'receipt[#:\s]+([A-Z0-9\-]+)', r'#[:\s]+([A-Z0-9\-]{4,})']
+
+def _anchor(pattern: str) -> str:
+    """Literal text every match of a label pattern starts with."""
+    return '$' if pattern.startswith(r'[\$]') else re.match(r'#|[a-z]+', pattern).group(0)
+
+_AMOUNT_RES = {key: [(_anchor(p), re.compile(p, re.IGNORECASE | re.MULTILINE)) for p in patterns]
+               for key, patterns in AMOUNT_PATTERNS.items()}
+_INVOICE_NUMBER_RES = [(_anchor(p), re.compile(p, re.IGNORECASE)) for p in INVOICE_NUMBER_PATTERNS]
+# Fallbacks when no total label is found
+_ANY_AMOUNT_RE = re.compile(r'[\$]?\s*([\d,]+\.\d{2})')
+_AMOUNT_BEFORE_LABEL_RE = re.compile(r'[\$]?\s*([\d,]+)(?:\.\d{0,2})?\s*(?:total|due|amount)', re.IGNORECASE)
+_ITEM_AMOUNT_RE = re.compile(r'[\$]?([\d,]+\.\d{2})')
+_NON_ITEM_LABELS = {'total', 'subtotal', 'tax', 'discount'}
+
+def _label_search(anchor: str, pattern: re.Pattern, text: str, text_lower: str, ascii_text: bool) -> Optional[re.Match]:
+    """pattern.search(text), skipped when the anchor is absent. Only trusted for
+    ASCII text (ascii_text = text_lower.isascii(), computed once per text):
+    IGNORECASE also matches e.g. the long s for 's'."""
+    if anchor not in text_lower and ascii_text:
+        return None
+    return pattern.search(text)
+
+def _amounts(text: str, text_lower: str, ascii_text: bool) -> Dict[str, Optional[float]]:
     amounts = {'total': None, 'subtotal': None, 'tax': None, 'discount': None}
-    patterns = {
-        'total': [
-            r'total[:\s]+[\$]?([\d,]+\.?\d*)',
-            r'amount[:\s]+[\$]?([\d,]+\.?\d*)',
-            r'[\$]([\d,]+\.?\d*)\s*(?:total|due|amount)',
-            r'grand\s+total[:\s]+[\$]?([\d,]+\.?\d*)',
-            r'balance[:\s]+due[:\s]+[\$]?([\d,]+\.?\d*)',
-            r'balance[:\s]+[\$]?([\d,]+\.?\d*)',  # BALANCE: 10.53 (without "due")
-            r'amount\s+due[:\s]+[\$]?([\d,]+\.?\d*)',
-            r'[\$]([\d,]+\.\d{2})\s*(?:\n|$|total)',
-        ],
-        'subtotal': [r'subtotal[:\s]+[\$]?([\d,]+\.?\d*)', r'sub\s+total[:\s]+[\$]?([\d,]+\.?\d*)'],
-        'tax': [r'tax[:\s]+[\$]?([\d,]+\.?\d*)', r'vat[:\s]+[\$]?([\d,]+\.?\d*)', r'sales\s+tax[:\s]+[\$]?([\d,]+\.?\d*)'],
-        'discount': [r'discount[:\s]+[\$]?([\d,]+\.?\d*)', r'discount\s+amount[:\s]+[\$]?([\d,]+\.?\d*)']
-    }
-    text_lower = text.lower()
     # First, try to extract explicit subtotal / tax / discount / total using label-based patterns
-    for key, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            match = re.search(pattern, text_lower, re.IGNORECASE | re.MULTILINE)
+    for key, pattern_list in _AMOUNT_RES.items():
+        for anchor, pattern in pattern_list:
+            match = _label_search(anchor, pattern, text_lower, text_lower, ascii_text)
             if match:
                 try:
                     amounts[key] = float(match.group(1).replace(',', ''))
@@ -35,7 +65,7 @@ def extract_amounts(text: str) -> Dict[str, Optional[float]]:
         # Find all dollar amounts in the text
         # Pattern: $XX.XX or XX.XX (with optional commas)
         all_amounts = []
-        for match in re.finditer(r'[\$]?\s*([\d,]+\.\d{2})', text):
+        for match in _ANY_AMOUNT_RE.finditer(text):
             try:
                 val = float(match.group(1).replace(',', ''))
                 if 0.01 <= val <= 999999:  # Reasonable range
@@ -44,7 +74,7 @@ def extract_amounts(text: str) -> Dict[str, Optional[float]]:
                 continue
         
         # Also try patterns without .XX (like $50 or 50)
-        for match in re.finditer(r'[\$]?\s*([\d,]+)(?:\.\d{0,2})?\s*(?:total|due|amount)', text, re.IGNORECASE):
+        for match in _AMOUNT_BEFORE_LABEL_RE.finditer(text):
             try:
                 val = float(match.group(1).replace(',', ''))
                 if 0.01 <= val <= 999999:
@@ -64,24 +94,50 @@ def extract_amounts(text: str) -> Dict[str, Optional[float]]:
     
     return amounts
 
-def extract_date(text: str) -> Optional[str]:
-    for pattern in [r'(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})', r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})']:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            try:
-                groups = match.groups()
-                if len(groups[0]) == 4:
-                    year, month, day = groups
-                else:
-                    month, day, year = groups
-                month, day, year = int(month), int(day), int(year)
-                if year < 100:
-                    year += 2000 if year < 50 else 1900
-                if 1 <= month <= 12 and 1 <= day <= 31:
-                    return f"{year:04d}-{month:02d}-{day:02d}"
-            except:
-                continue
+def _invoice_number(text: str, text_lower: str, ascii_text: bool) -> Optional[str]:
+    for anchor, pattern in _INVOICE_NUMBER_RES:
+        match = _label_search(anchor, pattern, text, text_lower, ascii_text)
+        if match:
+            return match.group(1).strip()
     return None
 
+def extract_fields(text: str, locale: Optional[str] = None) -> Dict:
+    """
+    Amounts, date, invoice number and line items in one call, sharing the
+    lowercased text. Same results as the individual extract_* functions.
+    The locale (see locale_norm) is detected from the text unless given;
+    amounts and items are read from the text normalized to US format.
+    """
+    return _extract_fields(text, locale)[0]
+
+def _extract_fields(text: str, locale: Optional[str] = None) -> Tuple[Dict, str]:
+    """extract_fields() plus the normalized text, so callers don't normalize again."""
+    locale = locale or detect_locale(text)
+    normalized = normalize_text(text, locale)
+    normalized_lower = normalized.lower()
+    normalized_ascii = normalized_lower.isascii()
+    if normalized is text:
+        text_lower, text_ascii = normalized_lower, normalized_ascii
+    else:
+        text_lower = text.lower()
+        text_ascii = text_lower.isascii()
+    return {
+        'amounts': _amounts(normalized, normalized_lower, normalized_ascii),
+        'date': parse_date(text, locale),
+        'invoice_number': _invoice_number(text, text_lower, text_ascii),
+        'items': extract_items(normalized),
+        'locale': locale
+    }, normalized
+
+def extract_amounts(text: str, locale: Optional[str] = None) -> Dict[str, Optional[float]]:
+    normalized = normalize_text(text, locale or detect_locale(text))
+    normalized_lower = normalized.lower()
+    return _amounts(normalized, normalized_lower, normalized_lower.isascii())
+
+def extract_date(text: str, locale: Optional[str] = None) -> Optional[str]:
+    """First date in the text as YYYY-MM-DD, read in the (detected) locale's day/month order."""
+    return parse_date(text, locale or detect_locale(text))
+
 def clean_vendor_name(vendor_text: str) -> str:
     """Clean up OCR noise from vendor names"""
     if not vendor_text:
@@ -110,17 +166,19 @@ def clean_vendor_name(vendor_text: str) -> str:
     
     return vendor_text.strip()
 
-def extract_vendor(text: str, word_data: Optional[List[Dict]] = None) -> Optional[str]:
+def extract_vendor(text: str, word_data: Optional[List[Dict]] = None,
+                   layout: Optional[WordLayout] = None) -> Optional[str]:
     """
     Extract vendor name by finding the largest/most prominent text in the top portion.
     Vendor names are typically the largest text at the top of receipts/invoices.
     
     If word_data (OCR bounding boxes) is provided, uses font size (bounding box area)
     to find the largest text block. Otherwise falls back to text-based heuristics.
+    A prebuilt WordLayout of word_data can be passed to avoid rebuilding it.
     """
     # If we have OCR bounding box data, use it to find the largest text block
-    if word_data:
-        vendor = extract_vendor_from_ocr_data(text, word_data)
+    if word_data or layout:
+        vendor = extract_vendor_from_ocr_data(text, word_data, layout)
     else:
         # Fallback to text-based extraction
         vendor = extract_vendor_from_text(text)
@@ -131,35 +189,20 @@ def extract_vendor(text: str, word_data: Optional[List[Dict]] = None) -> Optiona
     
     return vendor
 
-def extract_vendor_from_ocr_data(text: str, word_data: List[Dict]) -> Optional[str]:
+def extract_vendor_from_ocr_data(text: str, word_data: Optional[List[Dict]],
+                                 layout: Optional[WordLayout] = None) -> Optional[str]:
     """
     Extract vendor by finding the LARGEST text on the page.
     Simple approach: vendor names are almost always the biggest text.
     """
-    if not word_data:
+    layout = layout or WordLayout(word_data or [])
+    if not len(layout):
         return None
     
-    # Group words by line (words with similar Y coordinates)
-    lines = {}
-    for word in word_data:
-        if not word['text'].strip() or word['confidence'] < 10:
-            continue
-        y = word['top']
-        # Group words within 20 pixels vertically
-        line_key = (y // 20) * 20
-        if line_key not in lines:
-            lines[line_key] = []
-        lines[line_key].append(word)
-    
-    # Only look at top 40% of document (vendor is always at top)
-    sorted_lines = sorted(lines.items())
-    top_portion = sorted_lines[:max(15, len(sorted_lines) * 2 // 5)]
-    
     candidates = []
-    for y_pos, words in top_portion:
-        # Combine words on this line
-        line_text = ' '.join(w['text'].strip() for w in words if w['text'].strip())
-        line_text = line_text.strip()
+    # Only look at top 40% of document (vendor is always at top)
+    for line in layout.top_lines():
+        line_text = layout.line_text(line)
         
         # Very basic filters - just skip obvious non-vendor text
         if not line_text or len(line_text) < 3:
@@ -191,15 +234,12 @@ def extract_vendor_from_ocr_data(text: str, word_data: List[Dict]) -> Optional[s
         if word_count > 5:  # Skip very long lines (likely addresses or descriptions)
             continue
         
-        # Calculate average font size (height) for this line
-        avg_height = sum(w['height'] for w in words) / len(words) if words else 0
-        
-        # Store candidate with its size and word count
+        # Store candidate with its average font size (height) and word count
         candidates.append({
             'text': line_text,
-            'height': avg_height,
+            'height': layout.line_height(line),
             'word_count': word_count,
-            'y_pos': y_pos
+            'y_pos': layout.line_top(line)
         })
     
     if not candidates:
@@ -284,25 +324,27 @@ def extract_vendor_from_text(text: str) -> Optional[str]:
     return None
 
 def extract_invoice_number(text: str) -> Optional[str]:
-    for pattern in [r'invoice[#:\s]+([A-Z0-9\-]+)', r'receipt[#:\s]+([A-Z0-9\-]+)', r'#[:\s]+([A-Z0-9\-]{4,})']:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-    return None
+    text_lower = text.lower()
+    return _invoice_number(text, text_lower, text_lower.isascii())
 
 def extract_items(text: str) -> List[Dict[str, str]]:
     items = []
     for line in text.split('\n'):
+        # Every item amount has a decimal point; skip the regex on other lines
+        if '.' not in line:
+            continue
         line = line.strip()
-        if not line or len(line) < 5:
+        if len(line) < 5:
             continue
-        amount_match = re.search(r'[\$]?([\d,]+\.\d{2})', line)
+        amount_match = _ITEM_AMOUNT_RE.search(line)
         if amount_match:
             amount = amount_match.group(1).replace(',', '')
             description = line[:amount_match.start()].strip()
-            if len(description) >= 3 and description.lower() not in ['total', 'subtotal', 'tax', 'discount']:
+            if len(description) >= 3 and description.lower() not in _NON_ITEM_LABELS:
                 items.append({'description': description, 'amount': amount})
-    return items[:20]
+                if len(items) == 20:
+                    break
+    return items
 
 def parse_receipt(text: str, word_data: Optional[List[Dict]] = None) -> Dict:
     """
@@ -310,11 +352,33 @@ def parse_receipt(text: str, word_data: Optional[List[Dict]] = None) -> Dict:
     word_data: Optional OCR bounding box data for better vendor extraction.
     """
     if not text or not text.strip():
-        return {'amounts': {}, 'date': None, 'vendor': None, 'invoice_number': None, 'items': []}
+        return {'amounts': {}, 'date': None, 'vendor': None, 'invoice_number': None, 'items': [], 'items_check': None,
+                'amounts_check': None, 'locale': DEFAULT_LOCALE}
+    fields, normalized = _extract_fields(text)
+    amounts = fields['amounts']
+    items = fields['items']
+    item_amounts = None
+    layout = WordLayout(word_data) if word_data else None
+    # The layout model reads amounts as printed, so only for locales with a decimal point
+    if layout and LOCALES[fields['locale']]['decimal'] == '.':
+        # Label/amount pairs on the same printed line beat text regexes, which can
+        # read "SUBTOTAL" as a total or pair a label with the next line's number
+        amounts = dict(amounts, **{key: value for key, value in layout.labeled_amounts().items() if value is not None})
+        # Column model over the word boxes (quantity, unit price, amount)
+        layout_items = layout.line_items()
+        if layout_items:
+            items = layout_items
+            item_amounts = [float(item['amount']) for item in items]
+    # Cross-check total / subtotal / tax / discount against each other and what was paid
+    selection = select_amounts(normalized, amounts, item_amounts)
+    amounts = selection.pop('amounts')
     return {
-        'amounts': extract_amounts(text),
-        'date': extract_date(text),
-        'vendor': extract_vendor(text, word_data),
-        'invoice_number': extract_invoice_number(text),
-        'items': extract_items(text)
+        'amounts': amounts,
+        'date': fields['date'],
+        'vendor': extract_vendor(text, word_data, layout),
+        'invoice_number': fields['invoice_number'],
+        'items': items,
+        'items_check': check_items_total(items, amounts),
+        'amounts_check': selection,
+        'locale': fields['locale']
     }
@@ -0,0 +1,213 @@
+"""
+Typed receipt and classification records shared by the API, the expense
+CSV and the batch scripts.
+
+Records are slotted dataclasses (on Python 3.10+) with to_dict()/from_dict()
+for the JSON shape the API has always returned, plus SCHEMA_VERSION so
+clients can tell formats apart. Amounts stay floats end to end: the expense
+CSV stores plain numbers; expense_from_row() also reads rows written in the
+old "$12.40" / "85.00%" format, and migrate_expense_row() rewrites them.
+OCR word boxes stay plain dicts (WordLayout turns them into arrays at once)
+and the API keeps serializing through Flask's jsonify.
+"""
+import sys
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+SCHEMA_VERSION = 1
+
+# Columns of expenses.csv, in file order (unchanged, so old files can be appended to)
+EXPENSE_COLUMNS = ['timestamp', 'scan_date', 'filename', 'category', 'confidence', 'amount', 'amount_value',
+                   'vendor', 'invoice_number', 'subtotal', 'tax']
+_EXPENSE_NUMBERS = ('confidence', 'amount', 'amount_value', 'subtotal', 'tax')
+
+# __slots__ cut per-instance memory and attribute lookups; dataclass(slots=...) needs 3.10
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class Amounts:
+    total: Optional[float] = None
+    subtotal: Optional[float] = None
+    tax: Optional[float] = None
+    discount: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> 'Amounts':
+        data = data or {}
+        return cls(data.get('total'), data.get('subtotal'), data.get('tax'), data.get('discount'))
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        return {'total': self.total, 'subtotal': self.subtotal, 'tax': self.tax, 'discount': self.discount}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class ReceiptData:
+    """Fields parsed from a receipt (see receipt_parser.parse_receipt)."""
+    amounts: Amounts = field(default_factory=Amounts)
+    date: Optional[str] = None
+    vendor: Optional[str] = None
+    vendor_id: Optional[str] = None
+    invoice_number: Optional[str] = None
+    items: List[Dict] = field(default_factory=list)
+    items_check: Optional[Dict] = None
+    amounts_check: Optional[Dict] = None
+    locale: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> 'ReceiptData':
+        data = data or {}
+        return cls(Amounts.from_dict(data.get('amounts')), data.get('date'), data.get('vendor'), data.get('vendor_id'),
+                   data.get('invoice_number'), list(data.get('items') or []), data.get('items_check'),
+                   data.get('amounts_check'), data.get('locale'))
+
+    def to_dict(self) -> Dict:
+        data = {
+            'amounts': self.amounts.to_dict(),
+            'date': self.date,
+            'vendor': self.vendor,
+            'invoice_number': self.invoice_number,
+            'items': self.items,
+            'items_check': self.items_check,
+            'amounts_check': self.amounts_check,
+            'locale': self.locale
+        }
+        if self.vendor_id:
+            data['vendor_id'] = self.vendor_id
+        return data
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class ClassificationResult:
+    """Category prediction plus parsed receipt for one scan."""
+    category: str
+    confidence: float
+    top_predictions: List[Dict] = field(default_factory=list)
+    text_extracted: bool = False
+    text_length: int = 0
+    receipt_data: ReceiptData = field(default_factory=ReceiptData)
+    ocr_score: Optional[float] = None
+    ocr_strategy: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict, receipt_data: Optional[Dict] = None) -> 'ClassificationResult':
+        receipt = receipt_data if receipt_data is not None else data.get('receipt_data')
+        return cls(data.get('category', 'Unknown'), float(data.get('confidence') or 0), list(data.get('top_predictions') or []),
+                   bool(data.get('text_extracted', False)), int(data.get('text_length') or 0),
+                   receipt if isinstance(receipt, ReceiptData) else ReceiptData.from_dict(receipt),
+                   data.get('ocr_score'), data.get('ocr_strategy'))
+
+    def to_dict(self) -> Dict:
+        """API response shape (ocr_score / ocr_strategy only when OCR ran)."""
+        data = {
+            'schema_version': SCHEMA_VERSION,
+            'category': self.category,
+            'confidence': self.confidence,
+            'top_predictions': self.top_predictions,
+            'text_extracted': self.text_extracted,
+            'text_length': self.text_length,
+            'receipt_data': self.receipt_data.to_dict()
+        }
+        if self.ocr_score is not None:
+            data['ocr_score'] = self.ocr_score
+            data['ocr_strategy'] = self.ocr_strategy
+        return data
+
+    def expense_row(self, filename: str, timestamp: Optional[datetime] = None) -> Dict[str, Any]:
+        """Row for expenses.csv (EXPENSE_COLUMNS); numbers are written as plain numbers."""
+        timestamp = timestamp or datetime.now()
+        receipt = self.receipt_data
+        amounts = receipt.amounts
+        return {
+            'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'scan_date': receipt.date or timestamp.strftime('%Y-%m-%d'),
+            'filename': filename,
+            'category': self.category,
+            'confidence': round(self.confidence, 4),
+            'amount': _money(amounts.total),
+            'amount_value': amounts.total if amounts.total else '',
+            'vendor': receipt.vendor or '',
+            'invoice_number': receipt.invoice_number or '',
+            'subtotal': _money(amounts.subtotal),
+            'tax': _money(amounts.tax),
+        }
+
+
+def _money(value: Optional[float]) -> str:
+    return f"{value:.2f}" if value else ''
+
+
+def _number(value: Any) -> Optional[float]:
+    """Float from a CSV cell: plain numbers, or the old "$1,234.50" / "85.00%" strings."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace('$', '').replace(',', '')
+    try:
+        return float(text[:-1]) / 100 if text.endswith('%') else float(text)
+    except ValueError:
+        return None
+
+
+def expense_from_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """An expenses.csv row with typed numbers (None where empty), whichever format it was written in."""
+    record = dict(row)
+    for column in _EXPENSE_NUMBERS:
+        if column in record:
+            record[column] = _number(record[column])
+    if record.get('amount_value') is None:
+        record['amount_value'] = record.get('amount')
+    return record
+
+
+def migrate_expense_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """An expenses.csv row rewritten with plain numbers, as ClassificationResult.expense_row writes them."""
+    record = expense_from_row(row)
+    migrated = dict(row)
+    if 'confidence' in row:
+        migrated['confidence'] = round(record['confidence'], 4) if record['confidence'] is not None else ''
+    for column in ('amount', 'subtotal', 'tax'):
+        if column in row:
+            migrated[column] = _money(record[column])
+    if 'amount_value' in row:
+        migrated['amount_value'] = record['amount_value'] if record['amount_value'] else ''
+    return migrated
+
+
+_JSON_TYPES = {str: 'string', int: 'integer', float: 'number', bool: 'boolean'}
+
+
+def json_schema() -> Dict:
+    """JSON Schema of the records (draft 2020-12), generated from the dataclasses."""
+    import typing
+
+    def type_schema(hint) -> Dict:
+        origin = typing.get_origin(hint)
+        if origin is typing.Union:
+            options = [type_schema(arg) for arg in typing.get_args(hint) if arg is not type(None)]
+            return {'anyOf': options + [{'type': 'null'}]}
+        if origin in (list, List):
+            return {'type': 'array', 'items': type_schema(typing.get_args(hint)[0])}
+        if hint in _JSON_TYPES:
+            return {'type': _JSON_TYPES[hint]}
+        if isinstance(hint, type) and hint.__name__ in records:
+            return {'$ref': f'#/$defs/{hint.__name__}'}
+        return {'type': 'object'}
+
+    records = {cls.__name__: cls for cls in (Amounts, ReceiptData, ClassificationResult)}
+    definitions = {}
+    for name, cls in records.items():
+        hints = typing.get_type_hints(cls)
+        definitions[name] = {
+            'type': 'object',
+            'properties': {f.name: type_schema(hints[f.name]) for f in fields(cls)},
+        }
+    definitions['ClassificationResult']['properties']['schema_version'] = {'const': SCHEMA_VERSION}
+    return {
+        '$schema': 'https://json-schema.org/draft/2020-12/schema',
+        '$id': f'receipt-schema/v{SCHEMA_VERSION}',
+        '$ref': '#/$defs/ClassificationResult',
+        '$defs': definitions,
+    }
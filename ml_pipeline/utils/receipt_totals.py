@@ -0,0 +1,198 @@
+"""
+Best-total selection for receipts by arithmetic cross-validation.
+
+Every amount with cents in the text becomes a candidate, tagged with its
+line and the role its line's label suggests (total, subtotal, tax,
+discount, tender, change, or none). The selector then looks for the
+assignment that satisfies
+
+    subtotal + tax - discount = total    (and tender - change = total)
+
+within TOTAL_TOLERANCE, searching only the MAX_ROLE_CANDIDATES best
+candidates per role so the cost stays bounded on long receipts. The
+result carries a confidence, and receipts below REVIEW_CONFIDENCE are
+flagged for review.
+"""
+import re
+from bisect import bisect_right
+from itertools import product
+from typing import Dict, List, Optional
+
+TOTAL_TOLERANCE = 0.02     # Rounding slack in the arithmetic checks
+MAX_ROLE_CANDIDATES = 6    # Candidates kept per role for the combination search
+REVIEW_CONFIDENCE = 0.6    # Below this, the receipt is flagged for review
+MAX_AMOUNT = 999999
+
+# Line labels -> role, most specific first ("TOTAL SAVINGS" is a discount, "SUBTOTAL" not a total)
+ROLE_PATTERNS = [
+    ('subtotal', r'sub\s*-?\s*total|merchandise'),
+    ('discount', r'discount|savings|coupon|you\s+saved'),
+    ('tax', r'\b(?:sales\s+)?tax\b|\bvat\b|\bgst\b|\bhst\b'),
+    ('change', r'\bchange\b'),
+    ('tender', r'\b(?:cash|tender(?:ed)?|visa|mastercard|amex|discover|debit|credit|card|paid|payment)\b'),
+    ('total', r'grand\s+total|balance\s+due|amount\s+due|\btotal\b|\bbalance\b|\bamount\b|\bdue\b'),
+]
+_ROLE_PRIORITY = {name: rank for rank, (name, _) in enumerate(ROLE_PATTERNS)}
+# All labels in one scan; the line's role is the most specific label found on it. Labels
+# start a word, and checking that first lets the scan skip most positions cheaply.
+_ROLE_RE = re.compile(r'(?<![a-z])(?=[a-z])(?:'
+                      + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in ROLE_PATTERNS) + ')')
+# Labels that name the final amount explicitly
+_STRONG_TOTAL_RE = re.compile(r'grand\s+total|balance\s+due|amount\s+due')
+# A printed amount with cents ($12.50, 1,234.00, 3.00- for discounts); long digit runs
+# (card and loyalty numbers) and percentages are not amounts
+_MONEY_RE = re.compile(r'(?<![\d,.])\$?[ \t]?(\d{1,3}(?:,\d{3})+|\d{1,6})\.(\d{2})-?(?![\d%])')
+
+# Confidence per way the total was established
+CONFIDENCE = {
+    'arithmetic_labeled': 0.95,   # Labeled total that the other amounts add up to
+    'arithmetic': 0.8,            # Unlabeled amount that the other amounts add up to
+    'paid': 0.75,                 # No total printed: tender - change
+    'labeled': 0.7,               # Labeled total, nothing to check it against
+    'computed': 0.5,              # No total printed: subtotal + tax - discount
+    'contradicted': 0.4,          # Labeled total, but subtotal/tax add up to something else
+    'fallback': 0.3,              # No label: largest amount that is not a payment line
+    'none': 0.0,
+}
+
+
+def _cents(value: float) -> int:
+    return int(round(value * 100))
+
+
+def money_candidates(text: str) -> List[Dict]:
+    """Every amount with cents: {'value', 'line', 'role', 'strong'} in text order."""
+    # One scan each for labels and amounts over the whole text; positions map to lines
+    line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
+    text_lower = text.lower()
+    roles: Dict[int, str] = {}
+    strong = set()
+    for label in _ROLE_RE.finditer(text_lower):
+        line_no = bisect_right(line_starts, label.start()) - 1
+        role = roles.get(line_no)
+        if role is None or _ROLE_PRIORITY[label.lastgroup] < _ROLE_PRIORITY[role]:
+            roles[line_no] = label.lastgroup
+        if _STRONG_TOTAL_RE.match(text_lower, label.start()):
+            strong.add(line_no)
+    candidates = []
+    for match in _MONEY_RE.finditer(text):
+        value = float(match.group(1).replace(',', '') + '.' + match.group(2))
+        if not 0.01 <= value <= MAX_AMOUNT:
+            continue
+        line_no = bisect_right(line_starts, match.start()) - 1
+        role = roles.get(line_no, 'none')
+        candidates.append({'value': value, 'line': line_no, 'role': role,
+                           'strong': role == 'total' and line_no in strong})
+    return candidates
+
+
+def _top(candidates: List[Dict], key) -> List[Dict]:
+    return sorted(candidates, key=key, reverse=True)[:MAX_ROLE_CANDIDATES]
+
+
+def select_amounts(text: str, amounts: Optional[Dict[str, Optional[float]]] = None,
+                   item_amounts: Optional[List[float]] = None) -> Dict:
+    """
+    Pick total / subtotal / tax / discount from the candidates in `text`.
+    `amounts` (the label-pattern result) breaks ties towards the values it
+    found; the sum of `item_amounts` (line items, two or more) counts as an
+    unlabeled subtotal. The item lines' own amounts are not totals for that
+    sum, and it only confirms a labeled total when the receipt prints one.
+
+    Returns {'amounts', 'confidence', 'method', 'needs_review'}; 'method' is
+    a key of CONFIDENCE.
+    """
+    amounts = dict(amounts or {})
+    candidates = money_candidates(text)
+    by_role: Dict[str, List[Dict]] = {}
+    for candidate in candidates:
+        by_role.setdefault(candidate['role'], []).append(candidate)
+    hinted = {_cents(v) for v in amounts.values() if v is not None}
+    last_line = max((c['line'] for c in candidates), default=0) or 1
+
+    def prior(candidate: Dict) -> float:
+        """How much a candidate looks like the total on its own."""
+        score = 0.0
+        if candidate['role'] == 'total':
+            score += 1.5 if candidate['strong'] else 1.0
+        score += 0.3 * candidate['line'] / last_line  # Totals sit near the bottom
+        if _cents(candidate['value']) in hinted:
+            score += 0.2
+        return score
+
+    # Total: labeled totals, or unlabeled amounts that are not payments, tax or discounts
+    totals = _top(by_role.get('total', []) + by_role.get('none', []), prior)
+    subtotals = _top(by_role.get('subtotal', []), lambda c: c['line'])
+    item_cents = set()
+    if item_amounts and len(item_amounts) >= 2:
+        subtotals.append({'value': round(sum(item_amounts), 2), 'line': -1, 'role': 'items', 'strong': False})
+        item_cents = {_cents(value) for value in item_amounts}
+    taxes = _top(by_role.get('tax', []), lambda c: c['line']) + [None]
+    discounts = _top(by_role.get('discount', []), lambda c: c['line']) + [None]
+    tenders = _top(by_role.get('tender', []), lambda c: c['value'])
+    changes = _top(by_role.get('change', []), lambda c: c['line']) + [None]
+
+    # Totals by cents, for O(1) lookups of the sum each combination predicts
+    totals_by_cents: Dict[int, List[Dict]] = {}
+    for candidate in totals:
+        totals_by_cents.setdefault(_cents(candidate['value']), []).append(candidate)
+    slack = _cents(TOTAL_TOLERANCE)
+
+    def totals_near(value: float) -> List[Dict]:
+        cents = _cents(value)
+        return [c for offset in range(-slack, slack + 1) for c in totals_by_cents.get(cents + offset, ())]
+
+    best, best_score, best_parts = None, float('-inf'), {}
+    for subtotal, tax, discount in product(subtotals, taxes, discounts):
+        expected = subtotal['value'] + (tax['value'] if tax else 0) - (discount['value'] if discount else 0)
+        for total in totals_near(expected):
+            if subtotal['role'] == 'items' and total['role'] != 'total' and (
+                    'total' in by_role or _cents(total['value']) in item_cents):
+                continue  # An item line adding up to itself, or a guess against a printed total
+            score = prior(total) + 2.0 + (0.5 if subtotal['role'] == 'subtotal' else 0) + (0.3 if tax else 0)
+            if score > best_score:
+                best, best_score = total, score
+                best_parts = {'subtotal': subtotal['value'] if subtotal['role'] == 'subtotal' else None,
+                              'tax': tax['value'] if tax else None,
+                              'discount': discount['value'] if discount else None}
+    for tender, change in product(tenders, changes):
+        paid = tender['value'] - (change['value'] if change else 0)
+        for total in totals_near(paid):
+            score = prior(total) + (1.5 if change else 0.5)
+            if score > best_score:
+                best, best_score, best_parts = total, score, {}
+
+    result = dict(amounts)
+    if best is not None:
+        # Consistent with the other amounts (or with what was paid)
+        result['total'] = best['value']
+        result.update({key: value for key, value in best_parts.items() if value is not None})
+        method = 'arithmetic_labeled' if best['role'] == 'total' else 'arithmetic'
+    elif by_role.get('change') and tenders and tenders[0]['value'] > by_role['change'][0]['value']:
+        # Cash receipts without a printed total: what was handed over minus the change
+        result['total'] = round(tenders[0]['value'] - by_role['change'][0]['value'], 2)
+        method = 'paid'
+    elif by_role.get('total'):
+        labeled = max(by_role['total'], key=lambda c: (c['strong'], c['line']))
+        result['total'] = labeled['value']
+        # Subtotal and tax are on the receipt but don't add up to the labeled total
+        method = 'contradicted' if by_role.get('subtotal') and by_role.get('tax') else 'labeled'
+    elif by_role.get('subtotal'):
+        result['total'] = round(sum(by_role[key][0]['value'] * sign for key, sign in
+                                    (('subtotal', 1), ('tax', 1), ('discount', -1)) if by_role.get(key)), 2)
+        method = 'computed'
+    elif totals:
+        # No label at all: the largest amount that is not a payment, change, tax or discount line
+        result['total'] = max(c['value'] for c in totals)
+        method = 'fallback'
+    else:
+        method = 'fallback' if result.get('total') is not None else 'none'
+    for key in ('subtotal', 'tax', 'discount'):
+        if result.get(key) is None and by_role.get(key):
+            result[key] = by_role[key][0]['value']
+    return {
+        'amounts': result,
+        'confidence': CONFIDENCE[method],
+        'method': method,
+        'needs_review': CONFIDENCE[method] < REVIEW_CONFIDENCE
+    }
@@ -0,0 +1,65 @@
+"""
+External tool discovery (tesseract, poppler, ImageMagick, camera utilities).
+
+Lookups go through shutil.which and are cached for the life of the process,
+so batch runs over thousands of scans don't fork `which` per file. Versions
+are only probed when asked for (diagnostics), once per tool.
+"""
+import shutil
+import subprocess
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+# Tools the pipeline can use, with the argument that prints their version
+KNOWN_TOOLS = {
+    "tesseract": ["--version"],
+    "pdftotext": ["-v"],
+    "pdftoppm": ["-v"],
+    "ocrmypdf": ["--version"],
+    "mogrify": ["-version"],
+    "img2pdf": ["--version"],
+    "rpicam-still": ["--version"],
+    "libcamera-still": ["--version"],
+    "raspistill": None,  # No version flag
+    "fswebcam": ["--version"],
+}
+
+
+@lru_cache(maxsize=None)
+def find_tool(name: str) -> Optional[str]:
+    """Absolute path of an executable on PATH, or None (cached per process)."""
+    return shutil.which(name)
+
+
+def have_command(cmd: str) -> bool:
+    return find_tool(cmd) is not None
+
+
+@lru_cache(maxsize=None)
+def tool_version(name: str) -> Optional[str]:
+    """First line of the tool's version output, or None if unknown (cached per process)."""
+    path = find_tool(name)
+    version_args = KNOWN_TOOLS.get(name, ["--version"])
+    if not path or version_args is None:
+        return None
+    try:
+        result = subprocess.run([path] + version_args, capture_output=True, text=True, timeout=5)
+        # Some tools (poppler, older tesseract) print their version on stderr
+        output = (result.stdout or "") + "\n" + (result.stderr or "")
+        return next((line.strip() for line in output.splitlines() if line.strip()), None)
+    except Exception:
+        return None
+
+
+def tool_diagnostics(names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+    """{tool: {'available', 'path', 'version'}} for the known (or given) tools."""
+    return {
+        name: {"available": find_tool(name) is not None, "path": find_tool(name), "version": tool_version(name)}
+        for name in (names or KNOWN_TOOLS)
+    }
+
+
+def refresh_tools() -> None:
+    """Forget cached lookups (e.g. after installing a tool into a running service)."""
+    find_tool.cache_clear()
+    tool_version.cache_clear()
@@ -0,0 +1,298 @@
+"""
+Vendor gazetteer: canonical vendor names and their OCR spellings.
+
+Known vendors come from the `vendor` column of expenses.csv (spellings seen
+at least VENDOR_MIN_OCCURRENCES times, including scans saved since the
+gazetteer was built) and from user corrections stored in vendors.json next
+to it (only corrections are saved there). All aliases are compiled into one
+Aho-Corasick automaton, so the top lines of a receipt are matched against
+every alias in a single pass over the text. Lines are normalized first (lowercase, common
+OCR confusions such as 0/o and 1/l folded), and lines without an exact hit
+are matched fuzzily through a character-trigram index.
+"""
+import csv
+import difflib
+import json
+import re
+import threading
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+VENDOR_MIN_OCCURRENCES = 2   # Spellings seen less often in expenses.csv are treated as OCR noise
+VENDOR_SEARCH_LINES = 5      # Header lines searched: vendors are printed at the top of the receipt
+VENDOR_FUZZY_THRESHOLD = 0.85
+VENDORS_FILE = "vendors.json"
+
+# Characters OCR confuses with letters, folded on both the aliases and the text
+_OCR_FOLD = str.maketrans({'0': 'o', '1': 'l', '|': 'l', '5': 's', '$': 's', '@': 'a'})
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_vendor(text: str) -> str:
+    """Lowercase, fold OCR confusions, collapse punctuation/whitespace to single spaces."""
+    return _NON_ALNUM_RE.sub(' ', text.lower().translate(_OCR_FOLD)).strip()
+
+
+def vendor_id(name: str) -> str:
+    """Stable id for a canonical vendor name ("Kroger Co." -> "kroger-co")."""
+    return _NON_ALNUM_RE.sub('-', name.lower()).strip('-')
+
+
+class AhoCorasick:
+    """Multi-pattern exact matcher. Patterns can be added at any time; the
+    failure links are rebuilt lazily before the next search."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def add(self, pattern: str) -> None:
+        with self._lock:
+            self._add(pattern)
+
+    def _add(self, pattern: str) -> None:
+        node = 0
+        for char in pattern:
+            if char not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][char] = len(self._goto) - 1
+            node = self._goto[node][char]
+        if pattern not in self._out[node]:
+            self._out[node].append(pattern)
+            self._dirty = True
+
+    def _build(self) -> None:
+        """Breadth-first failure links; each node's outputs include those of its failure node."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                for pattern in self._out[self._fail[child]]:
+                    if pattern not in self._out[child]:
+                        self._out[child].append(pattern)
+                queue.append(child)
+        self._dirty = False
+
+    def search(self, text: str) -> Iterable[Tuple[int, str]]:
+        """Yield (end index, pattern) for every occurrence, in text order."""
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._build()
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for pattern in self._out[node]:
+                yield index + 1, pattern
+
+
+class VendorGazetteer:
+    """Canonical vendors with aliases, matched against OCR text."""
+
+    def __init__(self):
+        self.vendors: Dict[str, Dict] = {}       # id -> {'name': str, 'aliases': [str]}
+        self._alias_vendor: Dict[str, str] = {}  # normalized alias -> id
+        self._automaton = AhoCorasick()
+        self._trigrams: Dict[str, set] = {}      # trigram -> normalized aliases
+        self.corrections: Dict[str, Dict] = {}   # id -> {'name', 'aliases'} from users (what save() writes)
+        self._spellings: Dict[str, Counter] = {}  # normalized vendor -> expenses.csv spellings and counts
+        self._lock = threading.RLock()           # Shared by request threads; add/match/save hold it
+
+    def __len__(self) -> int:
+        return len(self.vendors)
+
+    def add(self, name: str, aliases: Iterable[str] = ()) -> str:
+        """Add a vendor (or aliases of an existing one); returns its id."""
+        with self._lock:
+            return self._add(name, aliases)
+
+    def _add(self, name: str, aliases: Iterable[str]) -> str:
+        vid = vendor_id(name)
+        if not vid:
+            return vid
+        vendor = self.vendors.setdefault(vid, {'name': name, 'aliases': []})
+        for alias in [name, *aliases]:
+            key = normalize_vendor(alias)
+            if len(key) < 3 or self._alias_vendor.get(key) == vid:
+                continue
+            self._alias_vendor[key] = vid
+            if alias not in vendor['aliases']:
+                vendor['aliases'].append(alias)
+            # Padded with spaces so hits only count at word boundaries
+            self._automaton.add(f" {key} ")
+            for gram in _trigrams(key):
+                self._trigrams.setdefault(gram, set()).add(key)
+        return vid
+
+    def correct(self, ocr_vendor: str, canonical: str) -> str:
+        """Record a user correction: `ocr_vendor` is an alias of `canonical`."""
+        with self._lock:
+            existing = self._alias_vendor.get(normalize_vendor(canonical))
+            name = self.vendors[existing]['name'] if existing else canonical
+            return self.add_correction(name, [ocr_vendor] if ocr_vendor else [])
+
+    def add_correction(self, name: str, aliases: Iterable[str] = ()) -> str:
+        """Add a user-confirmed vendor (kept in `corrections`, so save() persists it)."""
+        aliases = list(aliases)
+        with self._lock:
+            vid = self._add(name, aliases)
+            if vid:
+                correction = self.corrections.setdefault(vid, {'name': self.vendors[vid]['name'], 'aliases': []})
+                correction['aliases'].extend(a for a in aliases if a not in correction['aliases'])
+            return vid
+
+    def add_expense_vendors(self, spellings: Dict[str, int]) -> None:
+        """
+        Count vendor spellings from expenses.csv. Spellings that normalize the
+        same are grouped; a group becomes a vendor, named after its most common
+        spelling, once seen VENDOR_MIN_OCCURRENCES times (unless a correction
+        already covers it).
+        """
+        with self._lock:
+            keys = set()
+            for spelling, count in spellings.items():
+                key = normalize_vendor(spelling)
+                self._spellings.setdefault(key, Counter())[spelling] += count
+                keys.add(key)
+            for key in keys:
+                group = self._spellings[key]
+                if sum(group.values()) >= VENDOR_MIN_OCCURRENCES and key not in self._alias_vendor:
+                    self._add(group.most_common(1)[0][0], list(group))
+
+    def match_line(self, line: str) -> Optional[Dict]:
+        """Best vendor in one text line: the longest exact alias hit, else a fuzzy hit."""
+        key = normalize_vendor(line)
+        if not key:
+            return None
+        hits = [pattern.strip() for _, pattern in self._automaton.search(f" {key} ")]
+        if hits:
+            alias = max(hits, key=len)
+            return self._result(alias, line, 1.0)
+        return self._fuzzy(key, line)
+
+    def _fuzzy(self, key: str, line: str) -> Optional[Dict]:
+        """Aliases sharing at least half their trigrams with the line, verified with difflib."""
+        counts = Counter(alias for gram in _trigrams(key) for alias in self._trigrams.get(gram, ()))
+        best, best_score = None, VENDOR_FUZZY_THRESHOLD
+        tokens = key.split()
+        for alias, shared in counts.most_common(10):
+            if shared < len(_trigrams(alias)) / 2:
+                continue  # Sorted by shared count, not ratio: a shorter alias further down can still qualify
+            # Compare with every window of the line with as many words as the alias
+            size = len(alias.split())
+            for start in range(max(1, len(tokens) - size + 1)):
+                score = difflib.SequenceMatcher(None, alias, ' '.join(tokens[start:start + size])).ratio()
+                if score >= best_score:
+                    best, best_score = alias, score
+        return self._result(best, line, round(best_score, 3)) if best else None
+
+    def _result(self, alias: str, line: str, score: float) -> Dict:
+        vid = self._alias_vendor[alias]
+        return {'vendor_id': vid, 'name': self.vendors[vid]['name'], 'alias': alias, 'line': line, 'score': score}
+
+    def match(self, text: str, vendor_hint: Optional[str] = None, max_lines: int = VENDOR_SEARCH_LINES) -> Optional[Dict]:
+        """
+        Canonical vendor for a receipt: the parsed vendor string (if any) is
+        tried first, then the header (first `max_lines` non-empty lines of
+        the text). Exact hits beat fuzzy ones; among equals the earliest line
+        wins. The result's 'source' is 'hint' or 'header'.
+        """
+        if not self.vendors:
+            return None
+        header = [l for l in text.split('\n') if l.strip()][:max_lines]
+        lines = ([('hint', vendor_hint)] if vendor_hint else []) + [('header', l) for l in header]
+        best = None
+        with self._lock:
+            for source, line in lines:
+                result = self.match_line(line)
+                if result and (best is None or result['score'] > best['score']):
+                    best = dict(result, source=source)
+                    if best['score'] == 1.0:
+                        break
+        return best
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {vid: dict(v, aliases=list(v['aliases'])) for vid, v in self.vendors.items()}
+
+    def save(self, path: Path) -> None:
+        """Write the user corrections to `path`; vendors derived from expenses.csv are rebuilt on load."""
+        with self._lock:
+            Path(path).write_text(json.dumps(self.corrections, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+def _trigrams(key: str) -> set:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_gazetteer(workdir: Path) -> VendorGazetteer:
+    """Gazetteer from vendors.json (user corrections) and the vendor column of expenses.csv."""
+    gazetteer = VendorGazetteer()
+    vendors_file = Path(workdir) / VENDORS_FILE
+    if vendors_file.exists():
+        try:
+            for vendor in json.loads(vendors_file.read_text(encoding='utf-8')).values():
+                gazetteer.add_correction(vendor['name'], vendor.get('aliases', []))
+        except Exception as e:
+            print(f"Error reading {vendors_file}: {e}")
+    expense_file = Path(workdir) / "expenses.csv"
+    if expense_file.exists():
+        spellings = Counter()
+        try:
+            with open(expense_file, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    vendor = (row.get('vendor') or '').strip()
+                    if vendor:
+                        spellings[vendor] += 1
+        except Exception as e:
+            print(f"Error reading {expense_file}: {e}")
+        gazetteer.add_expense_vendors(spellings)
+    return gazetteer
+
+
+_gazetteers: Dict[str, VendorGazetteer] = {}
+_gazetteers_lock = threading.Lock()
+
+
+def get_gazetteer(workdir: Path) -> VendorGazetteer:
+    """The gazetteer for a scans directory, built once per process (thread-safe)."""
+    key = str(Path(workdir).resolve())
+    with _gazetteers_lock:
+        if key not in _gazetteers:
+            _gazetteers[key] = build_gazetteer(Path(workdir))
+        return _gazetteers[key]
+
+
+def record_vendor_correction(workdir: Path, ocr_vendor: str, canonical: str) -> str:
+    """Apply a user's vendor correction to the cached gazetteer and persist it to vendors.json."""
+    gazetteer = get_gazetteer(workdir)
+    with gazetteer._lock:
+        vid = gazetteer.correct(ocr_vendor, canonical)
+        gazetteer.save(Path(workdir) / VENDORS_FILE)
+    return vid
+
+
+def record_expense_vendor(workdir: Path, vendor: Optional[str]) -> None:
+    """Count a vendor just saved to expenses.csv in the cached gazetteer, as a rebuild would."""
+    vendor = (vendor or '').strip()
+    with _gazetteers_lock:
+        gazetteer = _gazetteers.get(str(Path(workdir).resolve()))
+    # Not built yet: build_gazetteer will read the row from expenses.csv
+    if gazetteer is not None and vendor:
+        gazetteer.add_expense_vendors({vendor: 1})
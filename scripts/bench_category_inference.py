@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Throughput of keyword category inference (archive dataset preparation) against the original substring scan"""
+
+import sys
+import csv
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Add project root to path (parent of scripts directory)
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from ml_pipeline.data.prepare_archive_dataset import (
+    CATEGORY_KEYWORDS, infer_category_from_text, infer_category_from_seller
+)
+
+
+# ---- Original implementation (substring checks per keyword per category) ----
+
+def legacy_infer_category_from_text(text, items=None):
+    all_text = (text or "").lower()
+    if items:
+        for item in items:
+            if isinstance(item, dict) and "description" in item:
+                all_text += " " + str(item["description"]).lower()
+    category_scores = {}
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in all_text)
+        if score > 0:
+            category_scores[category] = score
+    if category_scores:
+        return max(category_scores.items(), key=lambda x: x[1])[0]
+    return "Other"
+
+
+def legacy_infer_category_from_seller(seller_name):
+    if not seller_name:
+        return None
+    seller_lower = seller_name.lower()
+    if any(kw in seller_lower for kw in ["hotel", "inn", "lodge", "resort"]):
+        return "Travel"
+    if any(kw in seller_lower for kw in ["restaurant", "cafe", "dining", "grill"]):
+        return "Meals & Entertainment"
+    if any(kw in seller_lower for kw in ["office", "supply", "stationery"]):
+        return "Office Supplies"
+    if any(kw in seller_lower for kw in ["software", "tech", "cloud", "saas"]):
+        return "Software & Subscriptions"
+    if any(kw in seller_lower for kw in ["legal", "law", "attorney"]):
+        return "Legal & Compliance"
+    if any(kw in seller_lower for kw in ["consulting", "advisory", "services"]):
+        return "Professional Services"
+    return None
+
+
+def infer(text, items, seller, text_func, seller_func):
+    """What prepare_dataset does per row: seller name first, then text and items"""
+    return seller_func(seller) or text_func(text, items)
+
+
+# ---- Corpus ----
+
+KEYWORDS = sorted({keyword for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords})
+# Invoice words that contain keywords as substrings ("ad" in "address", "inn" in "dinner")
+FILLER = ["Invoice", "Date", "Qty", "Unit price", "Total", "Address", "Street", "Bill to", "Ship to", "Seller",
+          "Client", "Tax id", "IBAN", "Payment", "Description", "Gross worth", "Dinner", "Happiness", "Carpet",
+          "Topen", "Brand", "Spend", "Gasket", "Shadow", "Application", "Pending", "Summary", "VAT"]
+SELLERS = ["Smith, Johnson and Lee", "Grand Hotel", "Innovate LLC", "Lawson Group", "Techne Ltd", "Blue Cafe",
+           "Office Depot", "Dinner Bell", "Cloudy Farms", "Harris Consulting Services", "Miller PLC"]
+# Seller names that both matchers agree on (whole-word hit or no hit at all)
+PLAIN_SELLERS = ["Smith, Johnson and Lee", "Grand Hotel", "Blue Cafe", "Office Depot", "Harris Consulting Services",
+                 "Miller PLC", "Garcia and Sons", "Nguyen Ltd"]
+
+
+def synthetic_corpus(count: int, seed: int = 0, sellers=SELLERS):
+    """(text, items, seller) rows shaped like the archive's OCR text and JSON metadata"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = [rng.choice(KEYWORDS if rng.random() < 0.05 else FILLER) for _ in range(rng.randint(40, 400))]
+        for i in range(0, len(words), rng.randint(5, 12)):
+            words[i] += f" {rng.randint(1, 999)}.{rng.randint(0, 99):02d}\n"
+        items = [{"description": " ".join(rng.choice(FILLER + KEYWORDS) for _ in range(rng.randint(2, 6)))}
+                 for _ in range(rng.randint(0, 8))]
+        yield " ".join(words), items, rng.choice(sellers)
+
+
+def load_corpus(path: Path):
+    """Rows from a prepared dataset CSV ('text' and optional 'seller' columns)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield row.get("text", ""), None, row.get("seller", "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyword category inference against the original")
+    parser.add_argument("--corpus", help="Dataset CSV with text (and seller) columns (default: synthetic)")
+    parser.add_argument("--synthetic", type=int, default=5000, help="Synthetic rows to generate without --corpus")
+    parser.add_argument("--plain-sellers", action="store_true",
+                        help="Synthetic sellers without substring false positives ('Innovate', 'Lawson')")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    parser.add_argument("--verbose", action="store_true", help="Print rows where the categories differ")
+    args = parser.parse_args()
+
+    sellers = PLAIN_SELLERS if args.plain_sellers else SELLERS
+    rows = list(load_corpus(Path(args.corpus)) if args.corpus else synthetic_corpus(args.synthetic, sellers=sellers))
+    if not rows:
+        print("Empty corpus")
+        sys.exit(1)
+
+    legacy = (legacy_infer_category_from_text, legacy_infer_category_from_seller)
+    current = (infer_category_from_text, infer_category_from_seller)
+    differ = 0
+    for text, items, seller in rows:
+        before, after = infer(text, items, seller, *legacy), infer(text, items, seller, *current)
+        if before != after:
+            differ += 1
+            if args.verbose and differ <= 10:
+                print(f"DIFF seller={seller!r} text={text[:60]!r}...\n  substring: {before}\n  words:     {after}")
+    print(f"Corpus: {len(rows)} rows, {sum(len(text) for text, _, _ in rows) / len(rows):.0f} chars on average")
+    print(f"Same category: {len(rows) - differ}/{len(rows)} (differences are substring hits such as 'ad' in 'address')")
+    seller_hits = [sum(1 for _, _, seller in rows if funcs[1](seller)) / len(rows) for funcs in (legacy, current)]
+    print(f"Seller decides the category: substring {seller_hits[0]:.0%}, whole words {seller_hits[1]:.0%} of rows")
+
+    # Text and seller inference on their own, then per row as prepare_dataset runs them: a seller
+    # hit skips the text, so rows cost more when fewer sellers match (as with whole words)
+    steps = (
+        ("text", lambda funcs: [funcs[0](text, items) for text, items, _ in rows]),
+        ("seller", lambda funcs: [funcs[1](seller) for _, _, seller in rows]),
+        ("row", lambda funcs: [infer(text, items, seller, *funcs) for text, items, seller in rows]),
+    )
+    for step, run in steps:
+        timings = {}
+        for name, funcs in (("substring", legacy), ("indexed", current)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                run(funcs)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        print(f"{step:>7}: substring {timings['substring'] / len(rows) * 1e6:7.1f} us ({len(rows) / timings['substring']:8.0f}/s)"
+              f"  indexed {timings['indexed'] / len(rows) * 1e6:7.1f} us ({len(rows) / timings['indexed']:8.0f}/s)"
+              f"  {timings['substring'] / timings['indexed']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Accuracy of locale detection and locale-aware amount/date parsing on labeled receipts, and its cost"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path (parent of scripts directory)
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from ml_pipeline.utils.locale_norm import detect_locale, normalize_text
+from ml_pipeline.utils.receipt_parser import extract_fields, parse_receipt
+
+# Labeled receipts: text, locale, total and date as printed
+FIXTURES = [
+    {"text": "KROGER\n05/23/2024\nMILK 3.49\nBREAD 2.99\nTOTAL $12.40", "locale": "en_US", "total": 12.40, "date": "2024-05-23"},
+    {"text": "Office Depot\nInvoice #A-2211\n3/4/2024\nPaper 1,204.00\nAmount Due $1,289.50", "locale": "en_US", "total": 1289.50, "date": "2024-03-04"},
+    {"text": "Invoice\nMarch 5, 2024\nConsulting\nAmount due $1,234.56", "locale": "en_US", "total": 1234.56, "date": "2024-03-05"},
+    # US receipts with a word that is also a foreign month name or label ("mart": March in Turkish)
+    {"text": "FAMILY MART\n03/04/2024\nTOTAL 12.50", "locale": "en_US", "total": 12.50, "date": "2024-03-04"},
+    {"text": "Kwik Mart\n03/04/2024\nValor 12.50", "locale": "en_US", "total": 12.50, "date": "2024-03-04"},
+    {"text": "TESCO\n23/05/2024\nMILK £1.20\nBREAD £0.95\nTOTAL £12.40", "locale": "en_GB", "total": 12.40, "date": "2024-05-23"},
+    {"text": "Boots\n03/04/2024\nVAT 2.00\nTOTAL £14.99", "locale": "en_GB", "total": 14.99, "date": "2024-04-03"},
+    {"text": "REWE Markt GmbH\nRechnung Nr. 4711\nDatum: 03.02.2024\nBrot 2,49\nKäse 1.234,50\nSumme EUR 1.236,99\nMwSt 19% 197,50",
+     "locale": "de_DE", "total": 1236.99, "date": "2024-02-03"},
+    {"text": "Bäckerei Schmidt\nQuittung\n14. März 2024\nBrezel 0,85 €\nGesamt 4,25 €", "locale": "de_DE", "total": 4.25, "date": "2024-03-14"},
+    {"text": "Carrefour\nFacture 2024-118\nle 15 mars 2024\nBaguette 1,20 €\nTVA 2,00 €\nTotal TTC 12,00 €",
+     "locale": "fr_FR", "total": 12.00, "date": "2024-03-15"},
+    {"text": "FNAC\n02/07/2024\nCasque 1 299,00 €\nMontant 1 299,00 €", "locale": "fr_FR", "total": 1299.00, "date": "2024-07-02"},
+    {"text": "Mercadona\nFactura simplificada\n13/04/2024\nPan 1,10\nIVA 0,21\nTOTAL 5,30 €", "locale": "es_ES", "total": 5.30, "date": "2024-04-13"},
+    {"text": "El Corte Inglés\n5 de junio de 2024\nImporte 89,90 €", "locale": "es_ES", "total": 89.90, "date": "2024-06-05"},
+    {"text": "Esselunga\nScontrino\n14 aprile 2024\nTotale 18,30 €\nIVA 1,66", "locale": "it_IT", "total": 18.30, "date": "2024-04-14"},
+    {"text": "Albert Heijn\nKassabon\n7 mei 2024\nTotaal 23,45\nBTW 1,94", "locale": "nl_NL", "total": 23.45, "date": "2024-05-07"},
+    {"text": "Pão de Açúcar\nNota Fiscal\n05/06/2024\nValor total R$ 45,90", "locale": "pt_BR", "total": 45.90, "date": "2024-06-05"},
+    {"text": "MIGROS\nFİŞ NO: 0012\n12.03.2024\nEKMEK 12,50\nKDV 1,25\nTOPLAM ₺137,50", "locale": "tr_TR", "total": 137.50, "date": "2024-03-12"},
+    {"text": "A101\n28 Şubat 2024\nGenel Toplam 1.045,75 TL", "locale": "tr_TR", "total": 1045.75, "date": "2024-02-28"},
+]
+
+
+def score(fixtures, locale=None):
+    """(locale hits, total hits, date hits) for extract_fields with a fixed or detected locale"""
+    hits = {"locale": 0, "total": 0, "date": 0}
+    failures = []
+    for fixture in fixtures:
+        fields = extract_fields(fixture["text"], locale)
+        total = fields["amounts"]["total"]
+        ok = {
+            "locale": fields["locale"] == fixture["locale"],
+            "total": total is not None and abs(total - fixture["total"]) < 0.005,
+            "date": fields["date"] == fixture["date"],
+        }
+        for key, value in ok.items():
+            hits[key] += value
+        if not ok["total"] or not ok["date"]:
+            failures.append((fixture, fields))
+    return hits, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark locale-aware receipt normalization")
+    parser.add_argument("--fixtures", help="JSON list of {text, locale, total, date} (default: built-in fixtures)")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions over the fixtures")
+    parser.add_argument("--verbose", action="store_true", help="Print fixtures that fail")
+    args = parser.parse_args()
+
+    fixtures = json.loads(Path(args.fixtures).read_text(encoding="utf-8")) if args.fixtures else FIXTURES
+    count = len(fixtures)
+
+    us_hits, _ = score(fixtures, "en_US")
+    hits, failures = score(fixtures)
+    print(f"Fixtures: {count}")
+    print(f"  locale detected:  {hits['locale']}/{count}")
+    print(f"  total  (US-only -> locale-aware): {us_hits['total']}/{count} -> {hits['total']}/{count}")
+    print(f"  date   (US-only -> locale-aware): {us_hits['date']}/{count} -> {hits['date']}/{count}")
+    if args.verbose:
+        for fixture, fields in failures:
+            print(f"FAIL {fixture['text'][:60]!r}\n  expected total={fixture['total']} date={fixture['date']}"
+                  f"\n  got      total={fields['amounts']['total']} date={fields['date']} locale={fields['locale']}")
+
+    texts = [fixture["text"] for fixture in fixtures]
+    steps = (
+        ("detect_locale", detect_locale),
+        ("normalize_text", lambda text: normalize_text(text, detect_locale(text))),
+        ("extract_fields (en_US)", lambda text: extract_fields(text, "en_US")),
+        ("extract_fields (auto)", extract_fields),
+        ("parse_receipt (auto)", parse_receipt),
+    )
+    for name, func in steps:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for text in texts:
+                func(text)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>24}: {elapsed / (args.repeat * count) * 1e6:7.1f} us/receipt")
+    sys.exit(0 if hits["locale"] == count else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Measure latency and accuracy of each OCR profile on a labeled reference set"""
+
+import sys
+import csv
+import time
+import argparse
+import difflib
+from pathlib import Path
+
+# Add project root to path (parent of scripts directory)
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    import numpy as np
+    from ml_pipeline.utils import ocr_extract
+    from ml_pipeline.utils.ocr_extract import extract_text_with_details, extract_text_tesseract, have_command, OCR_PROFILES
+    from ml_pipeline.utils.image_context import ImageContext
+    from ml_pipeline.utils.receipt_parser import parse_receipt
+except ImportError as e:
+    print(f"Error: ML pipeline not available: {e}")
+    print("Install dependencies: pip install -r requirements.txt")
+    sys.exit(1)
+
+
+class TesseractCallCounter:
+    """Count pytesseract calls made while the context is active"""
+
+    def __init__(self):
+        self.calls = 0
+        self._originals = {}
+
+    def __enter__(self):
+        for name in ("image_to_string", "image_to_data", "image_to_osd"):
+            original = getattr(ocr_extract.pytesseract, name)
+            self._originals[name] = original
+
+            def counted(*args, _original=original, **kwargs):
+                self.calls += 1
+                return _original(*args, **kwargs)
+            setattr(ocr_extract.pytesseract, name, counted)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(ocr_extract.pytesseract, name, original)
+
+
+def load_reference(images_dir: Path, labels_csv: Path):
+    """Rows of the labels CSV: filename, and optionally total, vendor, text"""
+    with open(labels_csv, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            path = images_dir / row["filename"]
+            if path.exists():
+                yield path, row
+
+
+def total_matches(text: str, word_data, row) -> bool:
+    """Whether the parsed total matches the labeled total within $0.01"""
+    found = (parse_receipt(text, word_data).get("amounts") or {}).get("total")
+    return found is not None and abs(found - float(row["total"])) < 0.01
+
+
+def calibrate(reference, thresholds):
+    """
+    Pick the OCR_EARLY_EXIT_SCORE threshold: run every strategy once per scan
+    (thorough profile), then replay the balanced cascade offline for each
+    threshold and report Tesseract runs and total accuracy.
+    """
+    scans = []
+    for path, row in reference:
+        if not row.get("total"):
+            continue
+        ctx = ImageContext(path)
+        extract_text_tesseract(ctx, "thorough")
+        best = ctx.cache.get("ocr")
+        if not best:
+            continue
+        candidates = [(c["run"], c["score"], total_matches(c["text"], c["words"], row)) for c in best["candidates"]]
+        scans.append((candidates, best["runs"], total_matches(best["text"], best["words"], row)))
+    if not scans:
+        print("No labeled totals to calibrate on")
+        return
+
+    print(f"Calibration set: {len(scans)} scans with labeled totals\n")
+    print(f"{'threshold':>10} {'tess/scan':>10} {'total acc':>10} {'early exit':>11}")
+    for threshold in thresholds:
+        runs, correct, early = [], [], []
+        for candidates, all_runs, best_correct in scans:
+            hit = next((c for c in candidates if c[1] >= threshold), None)
+            runs.append(hit[0] if hit else all_runs)
+            correct.append(hit[2] if hit else best_correct)
+            early.append(hit is not None)
+        print(f"{threshold:>10.2f} {np.mean(runs):>10.1f} {np.mean(correct):>10.1%} {np.mean(early):>11.1%}")
+    print("\nChoose the lowest threshold whose accuracy matches the thorough profile, then set OCR_EARLY_EXIT_SCORE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR profiles (latency and accuracy)")
+    parser.add_argument("--images", required=True, help="Directory with reference scans")
+    parser.add_argument("--labels", help="CSV with filename,total,vendor[,text] (default: <images>/labels.csv)")
+    parser.add_argument("--profiles", default=",".join(OCR_PROFILES), help="Profiles to compare")
+    parser.add_argument("--limit", type=int, default=0, help="Maximum number of scans")
+    parser.add_argument("--calibrate", action="store_true", help="Sweep OCR_EARLY_EXIT_SCORE thresholds instead of comparing profiles")
+    parser.add_argument("--thresholds", default="0.5,0.6,0.65,0.7,0.75,0.8,0.85,0.9", help="Thresholds for --calibrate")
+    args = parser.parse_args()
+
+    if not have_command("tesseract"):
+        print("Error: tesseract not installed")
+        sys.exit(1)
+
+    images_dir = Path(args.images)
+    labels = Path(args.labels) if args.labels else images_dir / "labels.csv"
+    reference = list(load_reference(images_dir, labels))
+    if args.limit:
+        reference = reference[:args.limit]
+    if not reference:
+        print(f"No labeled scans found ({labels})")
+        sys.exit(1)
+
+    if args.calibrate:
+        calibrate(reference, [float(t) for t in args.thresholds.split(",")])
+        return
+
+    print(f"Reference set: {len(reference)} scans\n")
+    print(f"{'profile':>10} {'mean s':>8} {'p95 s':>7} {'tess/scan':>10} {'total acc':>10} {'vendor acc':>11} {'text sim':>9}")
+    for profile in args.profiles.split(","):
+        latencies, calls, totals, vendors, similarity = [], [], [], [], []
+        for path, row in reference:
+            with TesseractCallCounter() as counter:
+                start = time.perf_counter()
+                text, word_data = extract_text_with_details(ImageContext(path), profile)
+                latencies.append(time.perf_counter() - start)
+            calls.append(counter.calls)
+            if row.get("total"):
+                totals.append(total_matches(text, word_data, row))
+            if row.get("vendor"):
+                receipt = parse_receipt(text, word_data)
+                vendors.append(row["vendor"].lower() in (receipt.get("vendor") or "").lower())
+            if row.get("text"):
+                similarity.append(difflib.SequenceMatcher(None, row["text"], text).ratio())
+
+        def fmt(values):
+            return f"{np.mean(values):.1%}" if values else "-"
+        print(f"{profile:>10} {np.mean(latencies):>8.2f} {np.percentile(latencies, 95):>7.2f} "
+              f"{np.mean(calls):>10.1f} {fmt(totals):>10} {fmt(vendors):>11} {fmt(similarity):>9}")
+
+
+if __name__ == "__main__":
+    main()
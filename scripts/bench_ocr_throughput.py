@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Measure aggregate OCR throughput (pages/sec) for different workers x OMP threads splits"""
+
+import sys
+import time
+import argparse
+import platform
+from pathlib import Path
+
+# Add project root to path (parent of scripts directory)
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    import pytesseract
+    from ml_pipeline.utils.ocr_extract import (
+        extract_text_tesseract, have_command, available_cores, ocr_worker_pool
+    )
+except ImportError as e:
+    print(f"Error: ML pipeline not available: {e}")
+    print("Install dependencies: pip install -r requirements.txt")
+    sys.exit(1)
+
+
+def ocr_page(path: str, profile: str) -> int:
+    """Worker task: OCR one scan, return the text length"""
+    return len(extract_text_tesseract(Path(path), profile))
+
+
+def default_splits(cores: int):
+    """
+    Every workers x threads split that uses all cores, plus two baselines with
+    Tesseract's default thread count (threads=0): one worker, and one worker
+    per core (oversubscribed)
+    """
+    splits = [(1, 0)]
+    splits += [(cores // t, t) for t in range(1, cores + 1) if cores % t == 0]
+    splits.append((cores, 0))
+    return list(dict.fromkeys(splits))
+
+
+def parse_splits(value: str):
+    """'4x1,2x2,1x4' -> [(4, 1), (2, 2), (1, 4)]"""
+    return [tuple(int(n) for n in split.split("x")) for split in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel OCR throughput")
+    parser.add_argument("--images", required=True, help="Directory of scans")
+    parser.add_argument("--limit", type=int, default=0, help="Maximum number of scans")
+    parser.add_argument("--profile", default="balanced", help="OCR profile to run")
+    parser.add_argument("--splits", help="workers x threads splits, e.g. 4x1,2x2,1x4 (0 threads = Tesseract default; "
+                                         "default: all splits that use every core)")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the scans per split")
+    args = parser.parse_args()
+
+    if not have_command("tesseract"):
+        print("Error: tesseract not installed")
+        sys.exit(1)
+
+    paths = sorted(str(p) for ext in ("*.jpg", "*.jpeg", "*.png") for p in Path(args.images).glob(ext))
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        print(f"No scans found in {args.images}")
+        sys.exit(1)
+
+    cores = available_cores()
+    splits = parse_splits(args.splits) if args.splits else default_splits(cores)
+    print(f"Host: {platform.node()} ({platform.machine()}), {cores} cores, tesseract {pytesseract.get_tesseract_version()}")
+    print(f"Scans: {len(paths)} x {args.repeat}, profile {args.profile}\n")
+    print(f"{'workers':>8} {'threads':>8} {'pages/s':>9} {'s/page':>8} {'vs 1x':>7}")
+
+    baseline = None
+    for workers, threads in splits:
+        work = paths * args.repeat
+        with ocr_worker_pool(workers, threads or -1) as pool:
+            # Start the workers before timing so process startup is not counted
+            list(pool.map(time.sleep, [0] * workers))
+            start = time.perf_counter()
+            list(pool.map(ocr_page, work, [args.profile] * len(work)))
+            elapsed = time.perf_counter() - start
+        rate = len(work) / elapsed
+        baseline = baseline or rate
+        label = str(threads) if threads else "default"
+        print(f"{workers:>8} {label:>8} {rate:>9.2f} {elapsed / len(work):>8.2f} {rate / baseline:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Benchmark receipt detection settings (detection scale, segmentation mode) against the full-resolution threshold sweep"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Add project root to path (parent of scripts directory)
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    import cv2
+    from ml_pipeline.utils.ocr_extract import find_receipt_box, detect_and_crop_receipt
+except ImportError as e:
+    print(f"Error: OpenCV / ML pipeline not available: {e}")
+    print("Install dependencies: pip install -r requirements.txt")
+    sys.exit(1)
+
+
+def iou(a, b) -> float:
+    """Intersection over union of two (x, y, w, h) boxes"""
+    if a is None or b is None:
+        return 1.0 if a is None and b is None else 0.0
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def synthetic_scans(count: int, size=(2592, 1944), seed: int = 0):
+    """Generate camera-like scans: a bright tilted sheet with text lines on a dark desk"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    for i in range(count):
+        img = rng.normal(70, 12, (height, width)).clip(0, 255).astype(np.uint8)
+        pw, ph = int(width * rng.uniform(0.3, 0.6)), int(height * rng.uniform(0.6, 0.95))
+        cx, cy = width // 2 + int(rng.integers(-200, 200)), height // 2 + int(rng.integers(-50, 50))
+        box = cv2.boxPoints(((cx, cy), (pw, ph), float(rng.uniform(-6, 6)))).astype(np.int32)
+        cv2.fillPoly(img, [box], int(rng.integers(205, 245)))
+        for y in range(cy - ph // 2 + 40, cy + ph // 2 - 40, 38):
+            cv2.line(img, (cx - pw // 3, y), (cx + int(rng.integers(0, pw // 3)), y), 30, 6)
+        yield f"synthetic_{i:03d}", Image.fromarray(img).convert('RGB')
+
+
+def load_scans(image_dir: Path, limit: int):
+    paths = sorted(p for ext in ("*.jpg", "*.jpeg", "*.png") for p in image_dir.glob(ext))
+    for path in paths[:limit] if limit else paths:
+        yield path.name, Image.open(path).convert('RGB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare crop IoU and time of receipt detection settings")
+    parser.add_argument("--images", help="Directory of scans (default: synthetic scans)")
+    parser.add_argument("--limit", type=int, default=0, help="Maximum number of images")
+    parser.add_argument("--synthetic", type=int, default=10, help="Synthetic scans to generate without --images")
+    parser.add_argument("--scales", default="1.0,0.25,0.125", help="Detection scales to compare")
+    parser.add_argument("--segmentation", default="sweep,otsu", help="Segmentation modes to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per image")
+    args = parser.parse_args()
+
+    # Reference: full-resolution 200/180/160 threshold sweep (the original detector)
+    reference_config = ("sweep", 1.0)
+    configs = [(seg, float(scale)) for seg in args.segmentation.split(",") for scale in args.scales.split(",")]
+    if reference_config not in configs:
+        configs.insert(0, reference_config)
+    scans = load_scans(Path(args.images), args.limit) if args.images else synthetic_scans(args.synthetic)
+
+    timings = {c: [] for c in configs}
+    ious = {c: [] for c in configs}
+    for name, image in scans:
+        gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+        reference = find_receipt_box(gray, 1.0, "sweep")
+        for seg, scale in configs:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                detect_and_crop_receipt(image, detect_scale=scale, segmentation=seg, perspective=False)
+            timings[(seg, scale)].append((time.perf_counter() - start) / args.repeat)
+            ious[(seg, scale)].append(iou(reference, find_receipt_box(gray, scale, seg)))
+        print(f"  {name}: " + ", ".join(f"{seg}@{scale:g} IoU={ious[(seg, scale)][-1]:.3f}" for seg, scale in configs))
+
+    if not timings[reference_config]:
+        print("No images found")
+        return
+
+    base = np.mean(timings[reference_config]) * 1000
+    print(f"\n{'segmentation':>12} {'scale':>6} {'ms/image':>10} {'speedup':>8} {'mean IoU':>9} {'min IoU':>8}")
+    for seg, scale in configs:
+        ms = np.mean(timings[(seg, scale)]) * 1000
+        print(f"{seg:>12} {scale:>6g} {ms:>10.1f} {base / ms:>8.2f} "
+              f"{np.mean(ious[(seg, scale)]):>9.3f} {np.min(ious[(seg, scale)]):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
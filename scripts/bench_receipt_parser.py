@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Check the precompiled receipt field extractor against the original regex cascade and time both"""
+
+import sys
+import csv
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Add project root to path (parent of scripts directory)
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import re
+from ml_pipeline.utils.receipt_parser import extract_fields
+from ml_pipeline.utils.receipt_totals import select_amounts
+
+
+# ---- Original implementation (reference for identical output) ----
+
+def legacy_extract_amounts(text):
+    amounts = {'total': None, 'subtotal': None, 'tax': None, 'discount': None}
+    patterns = {
+        'total': [
+            r'total[:\s]+[\$]?([\d,]+\.?\d*)',
+            r'amount[:\s]+[\$]?([\d,]+\.?\d*)',
+            r'[\$]([\d,]+\.?\d*)\s*(?:total|due|amount)',
+            r'grand\s+total[:\s]+[\$]?([\d,]+\.?\d*)',
+            r'balance[:\s]+due[:\s]+[\$]?([\d,]+\.?\d*)',
+            r'balance[:\s]+[\$]?([\d,]+\.?\d*)',
+            r'amount\s+due[:\s]+[\$]?([\d,]+\.?\d*)',
+            r'[\$]([\d,]+\.\d{2})\s*(?:\n|$|total)',
+        ],
+        'subtotal': [r'subtotal[:\s]+[\$]?([\d,]+\.?\d*)', r'sub\s+total[:\s]+[\$]?([\d,]+\.?\d*)'],
+        'tax': [r'tax[:\s]+[\$]?([\d,]+\.?\d*)', r'vat[:\s]+[\$]?([\d,]+\.?\d*)', r'sales\s+tax[:\s]+[\$]?([\d,]+\.?\d*)'],
+        'discount': [r'discount[:\s]+[\$]?([\d,]+\.?\d*)', r'discount\s+amount[:\s]+[\$]?([\d,]+\.?\d*)']
+    }
+    text_lower = text.lower()
+    for key, pattern_list in patterns.items():
+        for pattern in pattern_list:
+            match = re.search(pattern, text_lower, re.IGNORECASE | re.MULTILINE)
+            if match:
+                try:
+                    amounts[key] = float(match.group(1).replace(',', ''))
+                    break
+                except Exception:
+                    continue
+    if amounts['total'] is None:
+        all_amounts = []
+        for match in re.finditer(r'[\$]?\s*([\d,]+\.\d{2})', text):
+            try:
+                val = float(match.group(1).replace(',', ''))
+                if 0.01 <= val <= 999999:
+                    all_amounts.append(val)
+            except Exception:
+                continue
+        for match in re.finditer(r'[\$]?\s*([\d,]+)(?:\.\d{0,2})?\s*(?:total|due|amount)', text, re.IGNORECASE):
+            try:
+                val = float(match.group(1).replace(',', ''))
+                if 0.01 <= val <= 999999:
+                    all_amounts.append(val)
+            except Exception:
+                continue
+        if all_amounts:
+            amounts['total'] = max(all_amounts)
+    if amounts['total'] is None and amounts['subtotal']:
+        amounts['total'] = amounts['subtotal']
+        if amounts['tax']:
+            amounts['total'] += amounts['tax']
+    return amounts
+
+
+def legacy_extract_date(text):
+    for pattern in [r'(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})', r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})']:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            try:
+                groups = match.groups()
+                if len(groups[0]) == 4:
+                    year, month, day = groups
+                else:
+                    month, day, year = groups
+                month, day, year = int(month), int(day), int(year)
+                if year < 100:
+                    year += 2000 if year < 50 else 1900
+                if 1 <= month <= 12 and 1 <= day <= 31:
+                    return f"{year:04d}-{month:02d}-{day:02d}"
+            except:
+                continue
+    return None
+
+
+def legacy_extract_invoice_number(text):
+    for pattern in [r'invoice[#:\s]+([A-Z0-9\-]+)', r'receipt[#:\s]+([A-Z0-9\-]+)', r'#[:\s]+([A-Z0-9\-]{4,})']:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def legacy_extract_items(text):
+    items = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or len(line) < 5:
+            continue
+        amount_match = re.search(r'[\$]?([\d,]+\.\d{2})', line)
+        if amount_match:
+            amount = amount_match.group(1).replace(',', '')
+            description = line[:amount_match.start()].strip()
+            if len(description) >= 3 and description.lower() not in ['total', 'subtotal', 'tax', 'discount']:
+                items.append({'description': description, 'amount': amount})
+    return items[:20]
+
+
+def legacy_extract_fields(text):
+    return {
+        'amounts': legacy_extract_amounts(text),
+        'date': legacy_extract_date(text),
+        'invoice_number': legacy_extract_invoice_number(text),
+        'items': legacy_extract_items(text)
+    }
+
+
+# ---- Corpus ----
+
+SEPARATORS = [' ', ': ', '  ', '\n']
+LABELS = ["TOTAL", "Total:", "SUBTOTAL", "Sub Total", "TAX", "Sales Tax", "VAT", "BALANCE DUE", "Balance",
+          "Amount Due", "GRAND TOTAL", "DISCOUNT", "Discount Amount", "AMOUNT", "CHANGE", "CASH", "VISA"]
+WORDS = ["MILK", "BREAD", "EGGS 12CT", "BANANAS", "COFFEE", "KROGER", "WALMART", "PAPER TOWELS", "Invoice #",
+         "Receipt", "#:", "Thank you", "Cashier", "Store 0412", "KILO"]
+# Case-folding edge cases (long s, dotted/dotless i, Kelvin sign), mixed into a few texts
+UNICODE_WORDS = ["ſubtotal", "İnvoice", "ıtem", "\u212aroger", "Café 3.50", "TOTAL\u00a012.00"]
+
+
+def synthetic_corpus(count: int, seed: int = 0):
+    """OCR-like receipt texts: items, labels with and without amounts, dates, ids, noise"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        lines = []
+        for _ in range(rng.randint(3, 60)):
+            kind = rng.random()
+            amount = f"{rng.choice(['', '$', '$ '])}{rng.randint(0, 2500):,}{rng.choice(['', '.', '.5', f'.{rng.randint(0, 99):02d}'])}"
+            if kind < 0.45:
+                words = UNICODE_WORDS if rng.random() < 0.01 else WORDS
+                lines.append(f"{rng.choice(words)} {amount}")
+            elif kind < 0.7:
+                lines.append(f"{rng.choice(LABELS)}{rng.choice(SEPARATORS)}{amount}")
+            elif kind < 0.8:
+                lines.append(f"{rng.randint(1, 13)}{rng.choice('/-')}{rng.randint(0, 32)}{rng.choice('/-')}{rng.randint(0, 2030)}")
+            elif kind < 0.9:
+                lines.append(f"{rng.choice(['Invoice', 'RECEIPT', '#', 'invoice#'])}{rng.choice([' ', ':', ': '])}"
+                             f"{rng.choice(['A-', '', 'inv'])}{rng.randint(0, 999999)}")
+            else:
+                lines.append(''.join(rng.choice("abcdeTOTAL$#:/-.,0123456789 \t") for _ in range(rng.randint(0, 40))))
+        text = '\n'.join(lines)
+        yield text.lower() if rng.random() < 0.2 else text
+
+
+def load_corpus(path: Path):
+    """OCR texts from a dataset CSV ('text' column) or a directory of .txt files"""
+    if path.is_dir():
+        for txt in sorted(path.glob("*.txt")):
+            yield txt.read_text(encoding='utf-8', errors='replace')
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get("text", "").strip():
+                yield row["text"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the receipt field extractor against the original")
+    parser.add_argument("--corpus", help="Dataset CSV with a text column, or a directory of .txt files (default: synthetic)")
+    parser.add_argument("--synthetic", type=int, default=2000, help="Synthetic texts to generate without --corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    texts = list(load_corpus(Path(args.corpus)) if args.corpus else synthetic_corpus(args.synthetic))
+    if not texts:
+        print("Empty corpus")
+        sys.exit(1)
+
+    mismatches = 0
+    for text in texts:
+        # The original cascade is US-only, so compare with the locale pinned
+        expected, actual = legacy_extract_fields(text), extract_fields(text, "en_US")
+        actual.pop("locale")
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH on {text[:80]!r}...\n  legacy: {expected}\n  new:    {actual}")
+    print(f"Corpus: {len(texts)} texts, {sum(map(len, texts)) / len(texts):.0f} chars on average")
+    print(f"Identical output: {len(texts) - mismatches}/{len(texts)}")
+
+    timings = {}
+    for name, func in (("legacy", legacy_extract_fields), ("compiled", lambda text: extract_fields(text, "en_US"))):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for text in texts:
+                func(text)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+        print(f"{name:>9}: {best / len(texts) * 1e6:8.1f} us/text")
+    print(f"  speedup: {timings['legacy'] / timings['compiled']:.2f}x")
+
+    # Candidate scoring / arithmetic check that parse_receipt runs on top of the fields
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for text in texts:
+            select_amounts(text)
+        best = min(best, time.perf_counter() - start)
+    print(f"selection: {best / len(texts) * 1e6:8.1f} us/text")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,9 @@ try:
     from ml_pipeline.inference import InvoiceCategorizer
     from ml_pipeline.utils.ocr_extract import extract_text_from_invoice, extract_text_with_details_from_invoice
     from ml_pipeline.utils.receipt_parser import parse_receipt
+    from ml_pipeline.utils.image_context import ImageContext
     from ml_pipeline.utils.expense_tracker import save_expense
+    from ml_pipeline.utils.receipt_schema import ClassificationResult, ReceiptData
     ML_AVAILABLE = True
 except ImportError as e:
     print(f"Error: ML pipeline not available: {e}")
@@ -31,13 +33,15 @@ def classify_file(jpg_path, pdf_path, categorizer, workdir):
     
     text = ""
     word_data = []
+    # Decode the image once for OCR and classification
+    scan = ImageContext(jpg_path) if jpg_path else None
     if extract_text_from_invoice:
         # Use enhanced OCR with bounding box data for better vendor extraction
         effective_pdf = pdf_path if (pdf_path and pdf_path.exists()) else None
         if jpg_path or effective_pdf:
             # Try to get detailed OCR data (for better vendor extraction)
             if jpg_path and jpg_path.exists():
-                text, word_data = extract_text_with_details_from_invoice(jpg_path, effective_pdf)
+                text, word_data = extract_text_with_details_from_invoice(scan, effective_pdf)
             else:
                 # Fallback to simple extraction for PDF-only
                 text = extract_text_from_invoice(effective_pdf, None)
@@ -51,10 +55,10 @@ def classify_file(jpg_path, pdf_path, categorizer, workdir):
         if not jpg_path:
             print("  ⚠️  Image model requires image file")
             return None
-        category, probs = categorizer.predict_image(str(jpg_path), return_probs=True)
+        category, probs = categorizer.predict_image(scan, return_probs=True)
     elif categorizer.model_type == "hybrid":
         if jpg_path:
-            category, probs = categorizer.predict_hybrid(text, str(jpg_path), return_probs=True) if text else categorizer.predict_image(str(jpg_path), return_probs=True)
+            category, probs = categorizer.predict_hybrid(text, scan, return_probs=True) if text else categorizer.predict_image(scan, return_probs=True)
         else:
             print("  ⚠️  Hybrid model requires image file")
             return None
@@ -65,11 +69,18 @@ def classify_file(jpg_path, pdf_path, categorizer, workdir):
         category, probs = categorizer.predict_text(text, return_probs=True)
     
     # Parse receipt (pass word_data for better vendor extraction)
-    receipt_data = parse_receipt(text, word_data) if text and parse_receipt else {}
+    receipt_data = ReceiptData.from_dict(parse_receipt(text, word_data) if text and parse_receipt else None)
+    classification = ClassificationResult(
+        category=category,
+        confidence=round(probs[category], 4),
+        text_extracted=len(text) > 0,
+        text_length=len(text),
+        receipt_data=receipt_data
+    )
     
     # Display results
     confidence = probs[category]
-    amount = receipt_data.get('amounts', {}).get('total')
+    amount = receipt_data.amounts.total
     
     # Show category and amount prominently
     if amount:
@@ -81,18 +92,14 @@ def classify_file(jpg_path, pdf_path, categorizer, workdir):
         else:
             print(f"  ⚠️  Amount not found in extracted text ({len(text)} chars)")
     
-    if receipt_data.get('vendor'):
-        print(f"  ✓ Vendor: {receipt_data['vendor']}")
-    if receipt_data.get('date'):
-        print(f"  ✓ Date: {receipt_data['date']}")
+    if receipt_data.vendor:
+        print(f"  ✓ Vendor: {receipt_data.vendor}")
+    if receipt_data.date:
+        print(f"  ✓ Date: {receipt_data.date}")
     
     # Save to expense tracker
     if save_expense and jpg_path:
-        save_expense(workdir, jpg_path.name, {
-            "category": category,
-            "confidence": confidence,
-            "receipt_data": receipt_data
-        }, receipt_data)
+        save_expense(workdir, jpg_path.name, classification)
         print(f"  ✓ Saved to expenses.csv")
         
         # Move classified files to subdirectory to avoid reclassification
@@ -113,11 +120,7 @@ def classify_file(jpg_path, pdf_path, categorizer, workdir):
         except Exception as e:
             print(f"  ⚠️  Warning: Could not move files to classified/: {e}")
     
-    return {
-        "category": category,
-        "confidence": confidence,
-        "receipt_data": receipt_data
-    }
+    return classification
 
 def main():
     parser = argparse.ArgumentParser(description="Classify invoice files")
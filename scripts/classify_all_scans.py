@@ -13,7 +13,9 @@ try:
     from ml_pipeline.inference import InvoiceCategorizer
     from ml_pipeline.utils.ocr_extract import extract_text_from_invoice, extract_text_with_details_from_invoice
     from ml_pipeline.utils.receipt_parser import parse_receipt
+    from ml_pipeline.utils.image_context import ImageContext
     from ml_pipeline.utils.expense_tracker import save_expense
+    from ml_pipeline.utils.receipt_schema import ClassificationResult, ReceiptData
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
@@ -40,11 +42,14 @@ def classify_file(file_path: Path, categorizer, workdir: Path):
         print(f"  ⚠️  No image file found for {file_path.name}")
         return None
     
+    # Decode the image once for OCR and classification
+    scan = ImageContext(jpg_path)
+    
     # Extract text with detailed OCR data for better vendor extraction
     if extract_text_with_details_from_invoice:
-        text, word_data = extract_text_with_details_from_invoice(jpg_path, pdf_path if pdf_path.exists() else None)
+        text, word_data = extract_text_with_details_from_invoice(scan, pdf_path if pdf_path.exists() else None)
     else:
-        text = extract_text_from_invoice(jpg_path, pdf_path if pdf_path.exists() else None) if extract_text_from_invoice else ""
+        text = extract_text_from_invoice(scan, pdf_path if pdf_path.exists() else None) if extract_text_from_invoice else ""
         word_data = []
     
     if not text:
@@ -53,31 +58,31 @@ def classify_file(file_path: Path, categorizer, workdir: Path):
     
     # Classify
     if categorizer.model_type == "image":
-        category, probs = categorizer.predict_image(str(jpg_path), return_probs=True)
+        category, probs = categorizer.predict_image(scan, return_probs=True)
     elif categorizer.model_type == "hybrid":
-        category, probs = categorizer.predict_hybrid(text, str(jpg_path), return_probs=True) if text else categorizer.predict_image(str(jpg_path), return_probs=True)
+        category, probs = categorizer.predict_hybrid(text, scan, return_probs=True) if text else categorizer.predict_image(scan, return_probs=True)
     else:
         category, probs = categorizer.predict_text(text, return_probs=True)
     
     # Parse receipt (pass word_data for better vendor extraction)
-    receipt_data = parse_receipt(text, word_data) if text and parse_receipt else {}
+    receipt_data = ReceiptData.from_dict(parse_receipt(text, word_data) if text and parse_receipt else None)
     
-    classification = {
-        "category": category,
-        "confidence": round(probs[category], 4),
-        "text_extracted": len(text) > 0,
-        "text_length": len(text),
-        "receipt_data": receipt_data
-    }
+    classification = ClassificationResult(
+        category=category,
+        confidence=round(probs[category], 4),
+        text_extracted=len(text) > 0,
+        text_length=len(text),
+        receipt_data=receipt_data
+    )
     
     # Save to expense tracker
     if save_expense:
-        save_expense(workdir, jpg_path.name, classification, receipt_data)
+        save_expense(workdir, jpg_path.name, classification)
         print(f"  ✓ Classified as: {category} ({probs[category]:.1%} confidence)")
-        if receipt_data.get('amounts', {}).get('total'):
-            print(f"  ✓ Amount: ${receipt_data['amounts']['total']:.2f}")
-        if receipt_data.get('vendor'):
-            print(f"  ✓ Vendor: {receipt_data['vendor']}")
+        if receipt_data.amounts.total:
+            print(f"  ✓ Amount: ${receipt_data.amounts.total:.2f}")
+        if receipt_data.vendor:
+            print(f"  ✓ Vendor: {receipt_data.vendor}")
         
         # Move classified files to subdirectory to avoid reclassification
         classified_dir = workdir / "classified"
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Render a labeled set of synthetic receipt photos for bench_ocr_profiles.py"""
+
+import sys
+import csv
+import random
+import argparse
+from pathlib import Path
+
+try:
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+except ImportError as e:
+    print(f"Error: {e}")
+    print("Install dependencies: pip install -r requirements.txt")
+    sys.exit(1)
+
+VENDORS = ["KROGER", "WALMART", "TARGET", "COSTCO", "WALGREENS", "SAFEWAY", "HOME DEPOT", "SHELL",
+           "STARBUCKS", "CVS PHARMACY", "TRADER JOES", "BEST BUY"]
+ITEMS = ["MILK 2%", "BREAD WHEAT", "EGGS LARGE", "BANANAS", "COFFEE", "CHICKEN BREAST", "RICE 5LB", "APPLES",
+         "PAPER TOWELS", "DISH SOAP", "ORANGE JUICE", "CEREAL", "BUTTER", "CHEESE", "YOGURT", "PASTA",
+         "TOMATOES", "BATTERIES", "SHAMPOO", "TOOTHPASTE"]
+FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+
+
+def receipt_lines(rng: random.Random):
+    """Lines of one receipt and its labels (vendor, total)"""
+    vendor = rng.choice(VENDORS)
+    items = [(name, rng.randint(99, 2499) / 100) for name in rng.sample(ITEMS, rng.randint(3, 12))]
+    subtotal = round(sum(price for _, price in items), 2)
+    tax = round(subtotal * rng.choice([0.0, 0.06, 0.07, 0.0825]), 2)
+    total = round(subtotal + tax, 2)
+    lines = [vendor, f"STORE #{rng.randint(100, 9999)}", f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2024", ""]
+    lines += [f"{name:<20}{price:>8.2f}" for name, price in items]
+    lines += ["", f"{'SUBTOTAL':<20}{subtotal:>8.2f}", f"{'TAX':<20}{tax:>8.2f}", f"{'TOTAL':<20}{total:>8.2f}",
+              "", f"{'VISA':<20}{total:>8.2f}", "THANK YOU"]
+    return lines, vendor, total
+
+
+def render(lines, rng: random.Random, font: ImageFont.FreeTypeFont) -> Image.Image:
+    """Receipt paper on a darker background, slightly rotated, blurred and noisy, like a phone photo"""
+    line_height = int(font.size * 1.5)
+    paper = Image.new("L", (font.size * 18, line_height * (len(lines) + 4)), rng.randint(225, 250))
+    draw = ImageDraw.Draw(paper)
+    for row, line in enumerate(lines):
+        draw.text((font.size, line_height * (row + 2)), line, fill=rng.randint(10, 60), font=font)
+    paper = paper.rotate(rng.uniform(-3, 3), resample=Image.BICUBIC, expand=True, fillcolor=0)
+
+    scene = Image.new("L", (paper.width + 300, paper.height + 300), rng.randint(40, 110))
+    mask = paper.point(lambda v: 255 if v else 0)
+    scene.paste(paper, (rng.randint(80, 220), rng.randint(80, 220)), mask)
+    scene = scene.filter(ImageFilter.GaussianBlur(rng.uniform(0.3, 1.1)))
+    pixels = np.asarray(scene, dtype=np.float32) + np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 8, scene.size[::-1])
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).convert("RGB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render synthetic receipt photos with labels.csv")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--count", type=int, default=40, help="Number of receipts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(args.seed)
+    with open(out / "labels.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["filename", "total", "vendor", "text"])
+        writer.writeheader()
+        for index in range(args.count):
+            lines, vendor, total = receipt_lines(rng)
+            font = ImageFont.truetype(FONT, rng.randint(26, 40))
+            filename = f"receipt_{index:03d}.jpg"
+            render(lines, rng, font).save(out / filename, quality=rng.randint(70, 92))
+            writer.writerow({"filename": filename, "total": f"{total:.2f}", "vendor": vendor,
+                             "text": "\n".join(line.strip() for line in lines if line.strip())})
+    print(f"Wrote {args.count} receipts to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 from pathlib import Path
+from functools import lru_cache
 import subprocess
 import argparse
+import shutil
 import sys
 
 
@@ -11,8 +13,9 @@ def run(cmd: list[str], capture_output=False):
     subprocess.run(cmd, check=True, capture_output=capture_output, text=bool(capture_output))
 
 
+@lru_cache(maxsize=None)
 def have(cmd: str) -> bool:
-    return subprocess.call(["which", cmd], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+    return shutil.which(cmd) is not None
 
 
 def capture_image_csi(jpg: Path, resolution: str, rotate: str, zoom: float = 1.0) -> bool:
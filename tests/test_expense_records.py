@@ -0,0 +1,64 @@
+"""Expense CSV rows and the migration of old-format rows (receipt_schema, expense_tracker)."""
+import csv
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ml_pipeline.utils.expense_tracker import get_expense_summary, get_expenses, migrate_expense_file, save_expense
+from ml_pipeline.utils.receipt_schema import EXPENSE_COLUMNS, ClassificationResult, migrate_expense_row
+
+LEGACY_ROW = {'timestamp': '2024-03-01 10:00:00', 'scan_date': '2024-03-01', 'filename': 'a.jpg',
+              'category': 'Groceries', 'confidence': '85.00%', 'amount': '$1,234.50', 'amount_value': '1234.5',
+              'vendor': 'KROGER', 'invoice_number': '', 'subtotal': '$1,200.00', 'tax': '$34.50'}
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_expense_row_writes_plain_numbers():
+    result = ClassificationResult.from_dict({'category': 'Dining', 'confidence': 0.91234},
+                                            {'amounts': {'total': 12.4, 'tax': 0.9}, 'vendor': 'CAFE ROMA'})
+    row = result.expense_row('b.jpg', datetime(2024, 3, 2, 9, 30))
+    assert list(row) == EXPENSE_COLUMNS
+    assert row['scan_date'] == '2024-03-02'
+    assert (row['confidence'], row['amount'], row['amount_value']) == (0.9123, '12.40', 12.4)
+    assert (row['subtotal'], row['tax'], row['vendor']) == ('', '0.90', 'CAFE ROMA')
+
+
+def test_migrate_expense_row():
+    row = migrate_expense_row(LEGACY_ROW)
+    assert (row['confidence'], row['amount'], row['subtotal'], row['tax']) == (0.85, '1234.50', '1200.00', '34.50')
+    assert row['amount_value'] == 1234.5
+    assert {k: v for k, v in row.items() if k not in ('confidence', 'amount', 'amount_value', 'subtotal', 'tax')} == \
+        {k: v for k, v in LEGACY_ROW.items() if k not in ('confidence', 'amount', 'amount_value', 'subtotal', 'tax')}
+    # Rows already in the new format come back unchanged
+    assert {k: str(v) for k, v in migrate_expense_row({k: str(v) for k, v in row.items()}).items()} == \
+        {k: str(v) for k, v in row.items()}
+
+
+def test_migrate_expense_file(tmp_path):
+    expense_file = tmp_path / 'expenses.csv'
+    with open(expense_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=EXPENSE_COLUMNS)
+        writer.writeheader()
+        writer.writerow(LEGACY_ROW)
+    assert migrate_expense_file(tmp_path) == 1
+    assert save_expense(tmp_path, 'b.jpg', {'category': 'Dining', 'confidence': 0.5}, {'amounts': {'total': 4.5}})
+
+    rows = read_rows(expense_file)
+    assert [row['amount'] for row in rows] == ['1234.50', '4.50']
+    assert [row['confidence'] for row in rows] == ['0.85', '0.5']
+    assert rows[0]['vendor'] == 'KROGER'
+    assert not (tmp_path / 'expenses.csv.tmp').exists()
+    assert migrate_expense_file(tmp_path) == 0  # Once per process
+    assert get_expense_summary(tmp_path)['total'] == 1239.0
+    assert [expense['amount'] for expense in get_expenses(tmp_path)] == [4.5, 1234.5]
+
+
+def test_migrate_missing_file(tmp_path):
+    assert migrate_expense_file(tmp_path) == 0
+    assert not (tmp_path / 'expenses.csv').exists()
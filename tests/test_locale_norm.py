@@ -0,0 +1,23 @@
+"""Locale detection and locale-aware dates (ml_pipeline/utils/locale_norm.py)."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ml_pipeline.utils.locale_norm import detect_locale
+from ml_pipeline.utils.receipt_parser import parse_receipt
+
+
+def test_month_like_word_does_not_outweigh_us_amounts():
+    # "mart" is Turkish for March, "valor" a Portuguese label
+    assert detect_locale("FAMILY MART\n03/04/2024\nTOTAL 12.50") == "en_US"
+    assert detect_locale("Kwik Mart\n03/04/2024\nValor 12.50") == "en_US"
+    receipt = parse_receipt("FAMILY MART\n03/04/2024\nTOTAL 12.50")
+    assert receipt['date'] == "2024-03-04"
+    assert receipt['amounts']['total'] == 12.5
+
+
+def test_foreign_evidence_still_wins():
+    assert detect_locale("Summe 12,50") == "de_DE"
+    assert detect_locale("Pão de Açúcar\nValor total R$ 45,90") == "pt_BR"
+    assert detect_locale("Boots\n03/04/2024\nTOTAL £14.99") == "en_GB"
@@ -0,0 +1,85 @@
+"""Archive dataset preparation: the metadata CSV index and resuming an interrupted output CSV."""
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("torch")  # ml_pipeline.data imports the torch datasets
+pytest.importorskip("tqdm")
+
+from ml_pipeline.data.prepare_archive_dataset import DATASET_FIELDS, CsvMetadataIndex, resume_output
+
+
+def dataset_csv(path, rows, tail=b''):
+    """Dataset CSV with a header, `rows` (image_path, text) and raw bytes appended after them."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=DATASET_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for image_path, text in rows:
+            writer.writerow({'image_path': image_path, 'category': 'Travel', 'text': text, 'filename': image_path})
+    complete = path.read_bytes()
+    with open(path, 'ab') as f:
+        f.write(tail)
+    return complete
+
+
+def test_resume_truncates_torn_last_row(tmp_path):
+    output = tmp_path / 'dataset.csv'
+    complete = dataset_csv(output, [('archive/a.jpg', 'hotel'), ('archive/b.jpg', 'line one\nline two')],
+                           tail=b'archive/c.jpg,Travel,"cut off in the mid')
+    assert resume_output(output) == {'archive/a.jpg', 'archive/b.jpg'}
+    assert output.read_bytes() == complete
+
+
+def test_resume_keeps_complete_file(tmp_path):
+    output = tmp_path / 'dataset.csv'
+    complete = dataset_csv(output, [('archive/a.jpg', 'hotel')])
+    assert resume_output(output) == {'archive/a.jpg'}
+    assert output.read_bytes() == complete
+
+
+def test_resume_without_dataset_starts_over(tmp_path):
+    assert resume_output(tmp_path / 'missing.csv') is None
+    other = tmp_path / 'other.csv'
+    other.write_text('a,b\n1,2\n', encoding='utf-8')
+    assert resume_output(other) is None
+    assert other.read_text(encoding='utf-8') == 'a,b\n1,2\n'
+
+
+def metadata_index(path, content):
+    path.write_bytes(content)
+    index = CsvMetadataIndex()
+    return index, index.add_csv(path)
+
+
+def test_index_quoted_newlines(tmp_path):
+    index, count = metadata_index(tmp_path / 'meta.csv', (
+        b'File Name,Json Data,OCRed Text\n'
+        b'a.jpg,"{""invoice"": {""seller_name"": ""Grand Hotel""}}","line one\nline two\r\nline three"\n'
+        b'b.jpg,,after the multi-line row\n'))
+    assert count == 2
+    assert index.get('a.jpg')['ocr_text'] == 'line one\nline two\r\nline three'
+    assert index.get('b.jpg')['ocr_text'] == 'after the multi-line row'
+
+
+def test_index_escaped_quotes(tmp_path):
+    index, _ = metadata_index(tmp_path / 'meta.csv', (
+        b'File Name,Json Data,OCRed Text\n'
+        b'a.jpg,"{""invoice"": {""seller_name"": ""Joe\'s Diner""}}","say ""hi""\nthen leave"\n'
+        b'b.jpg,,plain\n'))
+    assert index.get('a.jpg')['json_data'] == {'invoice': {'seller_name': "Joe's Diner"}}
+    assert index.get('a.jpg')['ocr_text'] == 'say "hi"\nthen leave'
+    assert index.get('b.jpg')['ocr_text'] == 'plain'
+
+
+def test_index_unterminated_last_row(tmp_path):
+    index, count = metadata_index(tmp_path / 'meta.csv', (
+        b'File Name,Json Data,OCRed Text\n'
+        b'a.jpg,,first\n'
+        b'b.jpg,,"last row, no newline"'))
+    assert count == 2
+    assert index.get('b.jpg')['ocr_text'] == 'last row, no newline'
+    assert index.get('missing.jpg', {}) == {}
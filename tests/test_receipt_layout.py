@@ -0,0 +1,81 @@
+"""Line items and totals from OCR word boxes (ml_pipeline/utils/receipt_layout.py)."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ml_pipeline.utils.receipt_layout import WordLayout, check_items_total, parse_money
+from ml_pipeline.utils.receipt_parser import parse_receipt
+
+
+def word_boxes(lines):
+    """word_data for receipt lines given as (description words, amount): description from the left, amount right-aligned at x=400."""
+    words = []
+    for row, (description, amount) in enumerate(lines):
+        top = 20 + 30 * row
+        left = 10
+        for text in description.split():
+            words.append({'text': text, 'confidence': 95, 'left': left, 'top': top, 'width': 10 * len(text), 'height': 20})
+            left += 10 * len(text) + 10
+        if amount:
+            words.append({'text': amount, 'confidence': 95, 'left': 400 - 10 * len(amount), 'top': top,
+                          'width': 10 * len(amount), 'height': 20})
+    return words
+
+
+DISCOUNT_RECEIPT = [
+    ('FAMILY MART', None),
+    ('MILK', '2.50'),
+    ('BREAD', '3.00'),
+    ('COUPON', '1.00-'),
+    ('SUBTOTAL', '4.50'),
+    ('TOTAL', '4.50'),
+]
+
+
+def test_parse_money_credits():
+    assert parse_money('12.50') == 12.5
+    assert parse_money('$1,234.00') == 1234.0
+    assert parse_money('1.00-') == -1.0
+    assert parse_money('-1.00') == -1.0
+    assert parse_money('1.00.') is None
+
+
+def test_discount_line_is_not_an_item():
+    layout = WordLayout(word_boxes(DISCOUNT_RECEIPT))
+    items = layout.line_items()
+    assert [item['description'] for item in items] == ['MILK', 'BREAD']
+    amounts = layout.labeled_amounts()
+    assert amounts['discount'] == 1.0
+    assert check_items_total(items, amounts) == {'items_sum': 4.5, 'expected': 4.5, 'matches': True}
+
+
+def test_credit_item_counts_negative():
+    layout = WordLayout(word_boxes([('MILK', '2.50'), ('RETURN BREAD', '3.00-'), ('EGGS', '4.00'), ('SUBTOTAL', '3.50')]))
+    items = layout.line_items()
+    assert [item['amount'] for item in items] == ['2.50', '-3.00', '4.00']
+    assert check_items_total(items, layout.labeled_amounts())['matches']
+
+
+def test_parse_receipt_with_discount():
+    text = '\n'.join(f"{description} {amount or ''}".strip() for description, amount in DISCOUNT_RECEIPT)
+    receipt = parse_receipt(text, word_boxes(DISCOUNT_RECEIPT))
+    assert receipt['amounts']['total'] == 4.5
+    assert receipt['items_check']['items_sum'] == 4.5
+    assert receipt['items_check']['matches']
+
+
+def test_single_item_does_not_override_labeled_total():
+    lines = [('CAFE ROMA', None), ('LATTE', '4.00'), ('TOTAL', '4.50')]
+    text = '\n'.join(f"{description} {amount or ''}".strip() for description, amount in lines)
+    receipt = parse_receipt(text, word_boxes(lines))
+    assert receipt['amounts']['total'] == 4.5
+    assert receipt['amounts_check']['method'] == 'labeled'
+    assert receipt['amounts']['total'] == parse_receipt(text)['amounts']['total']
+
+
+def test_items_confirm_labeled_total():
+    lines = [('CAFE ROMA', None), ('LATTE', '4.00'), ('MUFFIN', '3.00'), ('TOTAL', '7.00')]
+    text = '\n'.join(f"{description} {amount or ''}".strip() for description, amount in lines)
+    selection = parse_receipt(text, word_boxes(lines))['amounts_check']
+    assert selection['method'] == 'arithmetic_labeled'
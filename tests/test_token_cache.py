@@ -0,0 +1,99 @@
+"""Token cache keys (<settings>-<content>) and which stale caches a rebuild evicts."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("torch")  # ml_pipeline.data imports the torch datasets
+
+from ml_pipeline.data.token_cache import cache_dir_for, load_token_cache
+
+
+class WordTokenizer:
+    """Whitespace tokenizer with the attributes the cache reads from a Hugging Face tokenizer."""
+    padding_side = 'right'
+    truncation_side = 'right'
+    pad_token_id = 0
+    name_or_path = 'words'
+
+    def __init__(self, vocab):
+        self.vocab = {word: index + 1 for index, word in enumerate(vocab)}
+
+    def get_vocab(self):
+        return self.vocab
+
+    def __len__(self):
+        return len(self.vocab) + 1
+
+    def __call__(self, texts, truncation, padding, max_length, return_tensors):
+        ids = np.zeros((len(texts), max_length), dtype=np.int64)
+        for row, text in enumerate(texts):
+            tokens = [self.vocab.get(word, 0) for word in text.split()][:max_length]
+            ids[row, :len(tokens)] = tokens
+        return {'input_ids': ids, 'attention_mask': (ids > 0).astype(np.int64)}
+
+
+TOKENIZER = WordTokenizer(['hotel', 'lunch', 'taxi'])
+
+
+def build(source, texts, max_length=4, text_rules='text'):
+    calls = []
+    arrays = load_token_cache(source, lambda: calls.append(texts) or texts, lambda: [0] * len(texts),
+                              TOKENIZER, max_length, text_rules)
+    return arrays, len(calls)
+
+
+def cache_names(source):
+    return sorted(path.name for path in (source.parent / (source.name + '.token_cache')).iterdir())
+
+
+def test_key_is_settings_then_content(tmp_path):
+    source = tmp_path / 'dataset.csv'
+    source.write_text('text\nhotel taxi\n')
+    settings, content = cache_dir_for(source, TOKENIZER, 4, 'text').name.split('-')
+    # Other settings, same content: only the settings half changes
+    for max_length, text_rules in ((8, 'text'), (4, 'hybrid')):
+        assert cache_dir_for(source, TOKENIZER, max_length, text_rules).name.split('-')[1] == content
+        assert cache_dir_for(source, TOKENIZER, max_length, text_rules).name.split('-')[0] != settings
+    # Same settings, new content: only the content half changes
+    source.write_text('text\nlunch\n')
+    new_settings, new_content = cache_dir_for(source, TOKENIZER, 4, 'text').name.split('-')
+    assert new_settings == settings and new_content != content
+
+
+def test_cache_is_reused(tmp_path):
+    source = tmp_path / 'dataset.csv'
+    source.write_text('text\nhotel taxi\n')
+    arrays, calls = build(source, ['hotel taxi'])
+    assert calls == 1
+    assert arrays['input_ids'].tolist() == [[1, 3, 0, 0]]
+    assert arrays['lengths'].tolist() == [2]
+    _, calls = build(source, ['hotel taxi'])
+    assert calls == 0
+
+
+def test_rebuild_keeps_caches_with_other_settings(tmp_path):
+    source = tmp_path / 'dataset.csv'
+    source.write_text('text\nhotel taxi\n')
+    build(source, ['hotel taxi'], text_rules='text')
+    build(source, ['hotel taxi'], text_rules='hybrid')
+    hybrid = cache_dir_for(source, TOKENIZER, 4, 'hybrid').name
+    assert len(cache_names(source)) == 2
+
+    # The dataset changes: the text cache is rebuilt and its stale copy evicted, the hybrid cache is kept
+    source.write_text('text\nlunch\n')
+    build(source, ['lunch'], text_rules='text')
+    assert cache_names(source) == sorted([cache_dir_for(source, TOKENIZER, 4, 'text').name, hybrid])
+
+
+def test_rebuild_leaves_builds_in_progress(tmp_path):
+    source = tmp_path / 'dataset.csv'
+    source.write_text('text\nhotel taxi\n')
+    cache_dir = cache_dir_for(source, TOKENIZER, 4, 'text')
+    in_progress = cache_dir.with_name(cache_dir.name + '.tmp999999')
+    in_progress.mkdir(parents=True)
+    build(source, ['hotel taxi'])
+    assert in_progress.exists()
@@ -0,0 +1,79 @@
+"""Vendor gazetteer: Aho-Corasick matching, the trigram fuzzy fallback and what gets persisted."""
+import csv
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ml_pipeline.utils import vendor_gazetteer
+from ml_pipeline.utils.vendor_gazetteer import (
+    AhoCorasick, VendorGazetteer, build_gazetteer, get_gazetteer, record_expense_vendor, record_vendor_correction
+)
+
+
+def write_expenses(workdir, vendors):
+    with open(workdir / 'expenses.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['filename', 'vendor'])
+        writer.writeheader()
+        for index, vendor in enumerate(vendors):
+            writer.writerow({'filename': f'{index}.jpg', 'vendor': vendor})
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick()
+    for pattern in ('he', 'she', 'his', 'hers'):
+        automaton.add(pattern)
+    assert sorted(automaton.search('ushers')) == [(4, 'he'), (4, 'she'), (6, 'hers')]
+    # Patterns added after a search are found by the next one
+    automaton.add('us')
+    assert (2, 'us') in list(automaton.search('ushers'))
+
+
+def test_match_exact_alias_in_header():
+    gazetteer = VendorGazetteer()
+    gazetteer.add('Kroger', ['KROGER CO'])
+    gazetteer.add('Shell')
+    result = gazetteer.match('Welcome to\nKR0GER C0.\nStore 123\nSHELL GIFT CARD 5.00')
+    # OCR confusions are folded (0 -> o) and the earliest exact line wins
+    assert result['vendor_id'] == 'kroger' and result['score'] == 1.0 and result['source'] == 'header'
+    # Aliases only match at word boundaries
+    assert gazetteer.match_line('SHELL #4411')['vendor_id'] == 'shell'
+    assert gazetteer.match_line('SHELLFISH PLATTER') is None
+
+
+def test_match_fuzzy_fallback():
+    gazetteer = VendorGazetteer()
+    gazetteer.add('Trader Joes')
+    gazetteer.add('Target')
+    result = gazetteer.match_line('TRADER JOFS #552')
+    assert result['vendor_id'] == 'trader-joes'
+    assert vendor_gazetteer.VENDOR_FUZZY_THRESHOLD <= result['score'] < 1.0
+    assert gazetteer.match_line('THANK YOU FOR SHOPPING') is None
+
+
+def test_save_writes_only_corrections(tmp_path):
+    write_expenses(tmp_path, ['KROGER', 'KROGER', 'Shell', 'Shell'])
+    gazetteer = build_gazetteer(tmp_path)
+    assert set(gazetteer.vendors) == {'kroger', 'shell'}
+    vid = record_vendor_correction(tmp_path, 'KRGR', 'KROGER')
+    assert vid == 'kroger'
+    saved = json.loads((tmp_path / 'vendors.json').read_text(encoding='utf-8'))
+    assert saved == {'kroger': {'name': 'KROGER', 'aliases': ['KRGR']}}
+    # Reloaded: the correction comes from vendors.json, the rest from expenses.csv again
+    reloaded = build_gazetteer(tmp_path)
+    assert reloaded.match_line('KRGR')['vendor_id'] == 'kroger'
+    assert set(reloaded.vendors) == {'kroger', 'shell'}
+
+
+def test_saved_expense_vendors_join_the_cached_gazetteer(tmp_path):
+    write_expenses(tmp_path, ['KROGER', 'KROGER'])
+    gazetteer = get_gazetteer(tmp_path)
+    assert gazetteer.match_line('COSTCO WHOLESALE') is None
+    # Seen VENDOR_MIN_OCCURRENCES times since the build: matched without a rebuild
+    record_expense_vendor(tmp_path, 'COSTCO WHOLESALE')
+    assert 'costco-wholesale' not in gazetteer.vendors
+    record_expense_vendor(tmp_path, 'COSTCO WHOLESALE')
+    assert gazetteer.match_line('COSTCO WHOLESALE')['vendor_id'] == 'costco-wholesale'
+    # Only corrections are persisted
+    assert not (tmp_path / 'vendors.json').exists()